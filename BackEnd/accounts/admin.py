@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from marketplace.pagination import EstimatedCountPaginator
 from .models import User
 
 
@@ -8,9 +9,16 @@ class UserAdmin(BaseUserAdmin):
     """Admin interface for User model."""
     
     list_display = ['phone', 'full_name', 'email', 'role', 'is_active', 'created_at']
-    list_filter = ['role', 'is_active', 'is_staff', 'created_at']
-    search_fields = ['phone', 'email', 'full_name']
+    list_filter = ['role', 'is_active', 'is_staff']
+    date_hierarchy = 'created_at'
+    change_list_template = 'admin/indexed_change_list.html'
+    # See get_search_results
+    search_fields = ['^phone', '^email', '^full_name']
+    search_help_text = 'Beginning of the phone number, email or full name'
     ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['activate_selected', 'deactivate_selected']
     
     fieldsets = (
         (None, {'fields': ('phone', 'password')}),
@@ -27,4 +35,24 @@ class UserAdmin(BaseUserAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at', 'last_login']
-
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Prefix search on the one indexed column the term is meant for."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term[0] == '+' or term[0].isdigit():
+            return queryset.filter(phone__startswith=term), False
+        if '@' in term:
+            return queryset.filter(email__istartswith=term), False
+        return queryset.filter(full_name__istartswith=term), False
+    
+    @admin.action(description='Activate selected users')
+    def activate_selected(self, request, queryset):
+        updated = queryset.filter(is_active=False).update(is_active=True)
+        self.message_user(request, f'{updated} users activated.')
+    
+    @admin.action(description='Deactivate selected users')
+    def deactivate_selected(self, request, queryset):
+        updated = queryset.filter(is_active=True).exclude(pk=request.user.pk).update(is_active=False)
+        self.message_user(request, f'{updated} users deactivated.')
@@ -60,6 +60,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Admin changelist: date hierarchy and prefix search
+            models.Index(fields=['created_at']),
+            models.Index(fields=['email']),
+            models.Index(fields=['full_name']),
+        ]
     
     def __str__(self):
         return f"{self.full_name} ({self.phone})"
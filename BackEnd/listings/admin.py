@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Listing, ListingImage, CarDetails, PropertyDetails
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from marketplace.pagination import EstimatedCountPaginator
+from .duplicates import describe_duplicates
+from .image_hashes import find_image_matches
+from .models import ArchivedListing, Listing, ListingImage, CarDetails, PropertyDetails, ExchangeRate, SavedSearch
+from .signals import sync_status_change
+
+User = get_user_model()
 
 
 class ListingImageInline(admin.TabularInline):
@@ -13,22 +23,103 @@ class ListingAdmin(admin.ModelAdmin):
     """Admin interface for Listing model."""
     
     list_display = ['title', 'type', 'purpose', 'price', 'status', 'ad_type', 'user', 'created_at']
-    list_filter = ['type', 'purpose', 'status', 'ad_type', 'created_at']
-    search_fields = ['title', 'description', 'location', 'user__phone', 'user__full_name']
-    readonly_fields = ['created_at', 'updated_at']
+    list_filter = ['type', 'purpose', 'status', 'ad_type']
+    list_select_related = ['user']
+    date_hierarchy = 'created_at'
+    change_list_template = 'admin/indexed_change_list.html'
+    # See get_search_results
+    search_fields = ['=id', '^title', '^user__phone']
+    search_help_text = 'Listing id, beginning of the title, or owner phone starting with +'
+    raw_id_fields = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['approve_selected', 'reject_selected', 'mark_sold_selected']
+    readonly_fields = [
+        'price_base', 'city', 'district', 'latitude', 'longitude',
+        'possible_duplicates', 'reused_photos', 'created_at', 'updated_at',
+    ]
     inlines = [ListingImageInline]
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('title', 'description', 'type', 'purpose', 'price', 'currency', 'location')
+            'fields': ('title', 'description', 'type', 'purpose', 'price', 'currency', 'price_base', 'location')
+        }),
+        ('Structured Location', {
+            'fields': ('city', 'district', 'latitude', 'longitude')
         }),
         ('Status & Type', {
-            'fields': ('status', 'ad_type', 'user')
+            'fields': ('status', 'ad_type', 'user', 'possible_duplicates', 'reused_photos')
         }),
         ('Dates', {
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Search the one indexed column the term is meant for, instead of OR-ing LIKEs across the user join."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        if term.startswith('+'):
+            return queryset.filter(user__in=User.objects.filter(phone__startswith=term).values('pk')), False
+        return queryset.filter(title__istartswith=term), False
+    
+    def _set_status(self, request, queryset, new_status):
+        """Change the status of the selected listings with one UPDATE, then refresh their derived rows in bulk."""
+        ids = list(queryset.exclude(status=new_status).values_list('pk', flat=True))
+        updated = Listing.objects.filter(pk__in=ids).update(status=new_status, updated_at=timezone.now())
+        # update() skips the model signals
+        sync_status_change(ids)
+        self.message_user(request, f'{updated} listings marked as {new_status}.')
+    
+    @admin.action(description='Approve selected listings')
+    def approve_selected(self, request, queryset):
+        self._set_status(request, queryset, 'approved')
+    
+    @admin.action(description='Reject selected listings')
+    def reject_selected(self, request, queryset):
+        self._set_status(request, queryset, 'rejected')
+    
+    @admin.action(description='Mark selected listings as sold')
+    def mark_sold_selected(self, request, queryset):
+        self._set_status(request, queryset, 'sold')
+    
+    @admin.display(description='Possible duplicates')
+    def possible_duplicates(self, obj):
+        """Listings whose text and attributes nearly match this one, to check before approving."""
+        if obj.pk is None:
+            return '-'
+        duplicates = describe_duplicates(obj.pk)
+        if not duplicates:
+            return '-'
+        return format_html_join(
+            format_html('<br>'), '<a href="{}">#{} {}</a> ({}, {} similar)',
+            (
+                (reverse('admin:listings_listing_change', args=[item['id']]), item['id'], item['title'],
+                 item['status'], f"{item['similarity']:.0%}")
+                for item in duplicates
+            ),
+        )
+    
+    @admin.display(description='Reused photos')
+    def reused_photos(self, obj):
+        """Photos of other listings that are perceptually identical to this listing's photos."""
+        if obj.pk is None:
+            return '-'
+        matches = find_image_matches(obj.pk)
+        if not matches:
+            return '-'
+        return format_html_join(
+            format_html('<br>'), 'Image {} matches image {} of <a href="{}">#{} {}</a> ({}, {} bits apart)',
+            (
+                (match['image_id'], match['matched_image_id'],
+                 reverse('admin:listings_listing_change', args=[match['listing']['id']]),
+                 match['listing']['id'], match['listing']['title'], match['listing']['status'], match['distance'])
+                for match in matches
+            ),
+        )
 
 
 @admin.register(CarDetails)
@@ -47,3 +138,41 @@ class PropertyDetailsAdmin(admin.ModelAdmin):
     search_fields = ['listing__title']
     list_filter = ['property_type']
 
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    """Admin interface for ExchangeRate model. Saving a rate re-prices its listings."""
+    
+    list_display = ['currency', 'rate', 'updated_at']
+    search_fields = ['currency']
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    """Admin interface for SavedSearch model."""
+    
+    list_display = ['__str__', 'user', 'type', 'purpose', 'make', 'city', 'is_active', 'created_at']
+    list_filter = ['is_active', 'type', 'purpose']
+    search_fields = ['name', 'user__phone']
+    raw_id_fields = ['user']
+    # Compiled from params on every save
+    readonly_fields = [
+        'type', 'purpose', 'ad_type', 'make', 'property_type', 'city', 'district', 'min_price', 'max_price',
+        'min_year', 'max_year', 'min_bedrooms', 'min_bathrooms', 'min_area', 'created_at', 'updated_at',
+    ]
+
+
+@admin.register(ArchivedListing)
+class ArchivedListingAdmin(admin.ModelAdmin):
+    """Read-only admin interface for archived listings."""
+    
+    list_display = ['id', 'title', 'type', 'purpose', 'status', 'price', 'currency', 'user', 'created_at', 'archived_at']
+    list_filter = ['status', 'type', 'purpose']
+    search_fields = ['title', 'user__phone']
+    raw_id_fields = ['user']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
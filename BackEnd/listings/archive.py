@@ -0,0 +1,130 @@
+"""
+Archival of old sold and rejected listings.
+
+Listings that have been sold or rejected for ``ARCHIVE_AFTER_DAYS`` are moved,
+in batches, from ``listings`` (with their ``car_details``,
+``property_details`` and ``listing_images`` rows) to ``archived_listings``.
+This keeps the hot table and its indexes to the rows the site still serves.
+An archived listing keeps its id and stays readable by its owner and by
+admins through ``GET /api/listings/{id}/``. Image files are not touched.
+
+Run with ``python manage.py archive_listings``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedListing, Listing, ListingMarketEntry
+
+ARCHIVED_STATUSES = ['sold', 'rejected']
+
+LISTING_FIELDS = [
+    'description', 'price_base', 'location', 'city', 'district', 'latitude', 'longitude', 'geohash', 'ad_type',
+    'view_count',
+]
+CAR_FIELDS = ['make', 'model', 'year', 'mileage', 'fuel_type', 'transmission', 'color', 'engine_size']
+PROPERTY_FIELDS = ['property_type', 'bedrooms', 'bathrooms', 'area', 'floor', 'furnished', 'amenities']
+
+
+def _fields(instance, names):
+    return {name: getattr(instance, name) for name in names}
+
+
+def build_archive_row(listing):
+    """The ArchivedListing for a listing with its details and images loaded."""
+    car = getattr(listing, 'car_details', None)
+    details = getattr(listing, 'property_details', None)
+    return ArchivedListing(
+        id=listing.pk,
+        user_id=listing.user_id,
+        title=listing.title,
+        type=listing.type,
+        purpose=listing.purpose,
+        status=listing.status,
+        price=listing.price,
+        currency=listing.currency,
+        created_at=listing.created_at,
+        updated_at=listing.updated_at,
+        data={
+            'listing': _fields(listing, LISTING_FIELDS),
+            'car_details': _fields(car, CAR_FIELDS) if car else None,
+            'property_details': _fields(details, PROPERTY_FIELDS) if details else None,
+            'images': [
+                {'id': image.pk, 'image': image.image.name, 'order': image.order, 'created_at': image.created_at}
+                for image in listing.images.all()
+            ],
+        },
+    )
+
+
+def archivable(days=None):
+    """Listings sold or rejected more than ``days`` (default ARCHIVE_AFTER_DAYS) ago."""
+    days = days if days is not None else getattr(settings, 'ARCHIVE_AFTER_DAYS', 180)
+    cutoff = timezone.now() - timedelta(days=days)
+    return Listing.objects.filter(status__in=ARCHIVED_STATUSES, updated_at__lt=cutoff)
+
+
+def archive_batch(listing_ids):
+    """Copy a batch of listings to the archive and delete them; returns how many were moved."""
+    with transaction.atomic():
+        listings = list(
+            Listing.objects.select_for_update()
+            .filter(pk__in=listing_ids, status__in=ARCHIVED_STATUSES)
+            .select_related('car_details', 'property_details')
+            .prefetch_related('images')
+        )
+        if not listings:
+            return 0
+        ArchivedListing.objects.bulk_create([build_archive_row(listing) for listing in listings])
+        listing_ids = [listing.pk for listing in listings]
+        # Archived sales keep counting in the market statistics: without an entry the
+        # delete handler has no contribution to take back (see listings.market)
+        ListingMarketEntry.objects.filter(listing_id__in=listing_ids, status='sold').delete()
+        # The delete cascades to details and images and runs the usual signal handlers
+        # (tombstone in the change feed, removal from the in-process indexes)
+        Listing.objects.filter(pk__in=listing_ids).delete()
+    return len(listings)
+
+
+def archive_listings(days=None, batch_size=500, limit=None):
+    """Archive every archivable listing, ``batch_size`` per transaction; returns the number archived."""
+    total = 0
+    last_id = 0
+    candidates = archivable(days).order_by('pk')
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        ids = list(candidates.filter(pk__gt=last_id).values_list('pk', flat=True)[:size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        total += archive_batch(ids)
+    return total
+
+
+def archived_payload(archived):
+    """Response body of an archived listing, shaped like ListingSerializer output."""
+    data = archived.data
+    images = [
+        {'id': image['id'], 'image': image['image'], 'order': image['order']}
+        for image in data.get('images', [])
+    ]
+    return {
+        'id': archived.pk,
+        'title': archived.title,
+        'type': archived.type,
+        'purpose': archived.purpose,
+        'price': archived.price,
+        'currency': archived.currency,
+        'status': archived.status,
+        'user_id': archived.user_id,
+        **data.get('listing', {}),
+        'images': images,
+        'car_details': data.get('car_details'),
+        'property_details': data.get('property_details'),
+        'created_at': archived.created_at,
+        'updated_at': archived.updated_at,
+        'archived': True,
+        'archived_at': archived.archived_at,
+    }
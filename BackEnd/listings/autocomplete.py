@@ -0,0 +1,122 @@
+"""
+In-process make/model autocomplete.
+
+Distinct car makes and models of approved listings are kept in sorted arrays
+of normalized keys, so a prefix lookup is a binary search followed by a short
+scan and never touches the database. The index is built on first use,
+adjusted incrementally by the ``listings.signals`` handlers whenever an
+approved car listing appears, changes or disappears, and rebuilt from the
+database every ``AUTOCOMPLETE_REFRESH_SECONDS`` so that processes which did
+not handle a write catch up. Only the first build runs on the request path
+(once, however many requests arrive); later rebuilds run in one background
+thread while the current index keeps answering (see ``listings.refresh``).
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import CarDetails
+from .refresh import SingleFlightRefresh
+from .search import normalize_text
+
+
+class PrefixIndex:
+    """Sorted normalized keys with a display value and a listing count each."""
+
+    def __init__(self):
+        self.keys = []
+        self.entries = {}  # key -> [display, count]
+
+    def add(self, display, delta=1):
+        key = normalize_text(display)
+        if not key:
+            return
+        entry = self.entries.get(key)
+        if entry is None:
+            if delta <= 0:
+                return
+            self.entries[key] = [display, delta]
+            insort(self.keys, key)
+            return
+        entry[1] += delta
+        if entry[1] <= 0:
+            del self.entries[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize_text(prefix) or ''
+        start = bisect_left(self.keys, prefix)
+        matches = []
+        for key in self.keys[start:]:
+            if not key.startswith(prefix):
+                break
+            matches.append(self.entries[key])
+        matches.sort(key=lambda entry: (-entry[1], entry[0]))
+        return [{'value': display, 'count': count} for display, count in matches[:limit]]
+
+
+class MakeModelIndex:
+    """Prefix indexes over makes, over all models and over the models of each make."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.makes = PrefixIndex()
+        self.models = PrefixIndex()
+        self.models_by_make = {}
+
+    def _add(self, make, model, delta):
+        self.makes.add(make, delta)
+        self.models.add(model, delta)
+        make_key = normalize_text(make)
+        if make_key:
+            self.models_by_make.setdefault(make_key, PrefixIndex()).add(model, delta)
+
+    def build(self):
+        """Load counts of approved car listings per (make, model) from the database."""
+        rows = (
+            CarDetails.objects.filter(listing__status='approved')
+            .values('make', 'model')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+        )
+        fresh = MakeModelIndex()
+        # Rows come most frequent first, so the first spelling seen becomes the display value
+        for row in rows:
+            fresh._add(row['make'], row['model'], row['total'])
+        with self.lock:
+            self.makes, self.models, self.models_by_make = fresh.makes, fresh.models, fresh.models_by_make
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        _refresh.ensure(self, getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 300), self.build)
+
+    def update(self, old, new):
+        """Apply the change of one listing: ``old``/``new`` are (make, model) or None."""
+        # Before the first build there is nothing to adjust; the build will count it
+        if self.built_at is None:
+            return
+        if old and new and [normalize_text(value) for value in old] == [normalize_text(value) for value in new]:
+            return
+        with self.lock:
+            if old:
+                self._add(old[0], old[1], -1)
+            if new:
+                self._add(new[0], new[1], 1)
+
+    def suggest(self, query, field='make', make=None, limit=10):
+        self.ensure_fresh()
+        with self.lock:
+            if field == 'make':
+                return self.makes.suggest(query, limit)
+            if make:
+                index = self.models_by_make.get(normalize_text(make))
+                return index.suggest(query, limit) if index else []
+            return self.models.suggest(query, limit)
+
+
+_refresh = SingleFlightRefresh('autocomplete')
+make_model_index = MakeModelIndex()
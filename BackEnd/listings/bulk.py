@@ -0,0 +1,27 @@
+"""
+Set-based ``INSERT ... SELECT`` for bulk rebuilds of derived tables.
+
+``bulk_create`` builds a model instance and binds every value of every row
+in Python; copying rows that can be derived in SQL with one statement keeps
+them in the database instead.
+"""
+from django.db import connections
+
+
+def insert_select(model, queryset, columns):
+    """
+    Insert into ``model``'s table one row per row of ``queryset``, in the
+    queryset's order, with ``columns`` mapping each column to an expression over
+    it, in a single statement. Returns the number of rows inserted.
+    """
+    # Aliased, so that column names may repeat field names of the queryset's model;
+    # the SELECT lists the annotations in the order they were added
+    aliases = {f'insert_{name}': expression for name, expression in columns.items()}
+    select = queryset.annotate(**aliases).values_list(*aliases)
+    sql, params = select.query.sql_with_params()
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} ({names}) {sql}', params)
+        return cursor.rowcount
@@ -0,0 +1,148 @@
+"""
+Change feed over listings, their images and details.
+
+Every write to a listing, its car/property details or its images appends a
+row to the ``listing_changes`` log (see ``listings.signals``); deleting a
+listing appends a tombstone. The auto-increment id of the log is the sync
+token: a client asks for the changes after its last token and receives, in
+one paginated stream, the current state of every approved listing that
+changed and a tombstone for every listing that was deleted or left the
+approved state (rejected, sold, back to pending).
+
+Ids are allocated when a row is inserted, not when its transaction commits,
+so a slow transaction can commit a lower id after a reader has moved past it.
+The feed therefore only returns ids below the first change younger than
+``CHANGE_FEED_LAG_SECONDS``: every change whose transaction commits within
+that window of being written is delivered, in id order, exactly once per
+token. A transaction that stays open longer than the window (a bulk admin
+action or ``snapshot`` on a very large catalog) can still slip behind a
+client's token; raise the setting above the longest such transaction.
+
+The log is compacted by ``python manage.py compact_listing_changes``, which
+drops changes superseded by a later change of the same listing. The latest
+change of each listing is always kept, so a client starting from token 0
+still receives the whole catalog.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, F, Max, Min, Value
+from django.utils import timezone
+
+from .bulk import insert_select
+from .models import Listing, ListingChange
+
+MAX_FEED_LIMIT = 500
+
+
+def record_change(listing_id, deleted=False):
+    ListingChange.objects.create(listing_id=listing_id, deleted=deleted)
+
+
+def record_changes(listing_ids):
+    """record_change for several listings with one INSERT."""
+    ListingChange.objects.bulk_create([ListingChange(listing_id=listing_id) for listing_id in listing_ids])
+
+
+def snapshot():
+    """Append one change per existing listing, so that syncing from token 0 returns the whole catalog."""
+    # One INSERT ... SELECT; the changes get ids in listing order
+    return insert_select(
+        ListingChange,
+        Listing.objects.order_by('pk'),
+        {
+            'listing_id': F('pk'),
+            'deleted': Value(False),
+            'changed_at': Value(timezone.now(), output_field=DateTimeField()),
+        },
+    )
+
+
+def token_for_time(moment):
+    """The token to use to receive every change made at or after ``moment``."""
+    before = ListingChange.objects.filter(changed_at__lt=moment).order_by('-id').values_list('id', flat=True).first()
+    return before or 0
+
+
+def settled_changes():
+    """
+    The changes a reader may consume: those below the first change younger than
+    CHANGE_FEED_LAG_SECONDS, whose lower ids are committed or long abandoned.
+    """
+    horizon = timezone.now() - timedelta(seconds=getattr(settings, 'CHANGE_FEED_LAG_SECONDS', 5))
+    # Not just changed_at < horizon: a young row would leave older rows past it readable
+    ceiling = ListingChange.objects.filter(changed_at__gte=horizon).aggregate(first=Min('id'))['first']
+    changes = ListingChange.objects.all()
+    return changes if ceiling is None else changes.filter(id__lt=ceiling)
+
+
+def read_changes(token, limit):
+    """
+    Return (entries, next_token, has_more) for the changes after ``token``.
+
+    Each entry is ``(listing_id, listing)`` where ``listing`` is the approved
+    listing with its user, details and images loaded, or ``(listing_id, reason)``
+    with a string reason for a tombstone. A listing that changed several times
+    appears once, at the position of its latest change.
+    """
+    changes = list(
+        settled_changes().filter(id__gt=token)
+        .order_by('id')
+        .values_list('id', 'listing_id')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return [], token, False
+
+    latest = {}
+    for change_id, listing_id in changes:
+        latest[listing_id] = change_id
+    ordered = sorted(latest, key=latest.get)
+
+    listings = (
+        Listing.objects.filter(pk__in=ordered)
+        .select_related('user', 'car_details', 'property_details')
+        .prefetch_related('images')
+        .in_bulk()
+    )
+    entries = []
+    for listing_id in ordered:
+        listing = listings.get(listing_id)
+        if listing is None:
+            entries.append((listing_id, 'deleted'))
+        elif listing.status != 'approved':
+            entries.append((listing_id, listing.status))
+        else:
+            entries.append((listing_id, listing))
+    return entries, changes[-1][0], has_more
+
+
+def compact(older_than_days=None, batch_size=10000):
+    """Delete changes older than the retention that a later change of the same listing supersedes."""
+    days = older_than_days if older_than_days is not None else getattr(settings, 'CHANGE_FEED_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = list(
+            ListingChange.objects.filter(id__gt=last_id, changed_at__lt=cutoff)
+            .order_by('id')
+            .values_list('id', 'listing_id')[:batch_size]
+        )
+        if not rows:
+            return deleted
+        last_id = rows[-1][0]
+        # Latest change of each of these listings; everything older than it is superseded
+        latest = dict(
+            ListingChange.objects.filter(listing_id__in={listing_id for _, listing_id in rows})
+            .order_by()
+            .values('listing_id')
+            .annotate(latest=Max('id'))
+            .values_list('listing_id', 'latest')
+        )
+        superseded = [change_id for change_id, listing_id in rows if change_id < latest[listing_id]]
+        if superseded:
+            with transaction.atomic():
+                deleted += ListingChange.objects.filter(id__in=superseded).delete()[0]
@@ -0,0 +1,191 @@
+"""
+Near-duplicate detection with MinHash signatures and locality-sensitive hashing.
+
+Each listing is reduced to a set of character shingles of its title,
+description and key attributes (type, purpose, make/model/year or property
+type/bedrooms, city). A MinHash signature of ``NUM_PERM`` values estimates the
+Jaccard similarity between two such sets as the fraction of equal positions.
+The signature is cut into ``BANDS`` bands of ``ROWS`` values; every band is
+hashed into an indexed ``listing_lsh_buckets`` row, so candidates for a
+listing are the rows sharing at least one (band, bucket) pair, found with
+indexed lookups instead of comparing against the whole catalog.
+
+Signatures are written by the ``listings.signals`` handlers whenever a
+listing or its details change, and for existing rows by
+``python manage.py scan_duplicates``.
+"""
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Listing, ListingFingerprint, ListingLSHBucket
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Estimated Jaccard similarity above which two listings are reported as duplicates
+DUPLICATE_THRESHOLD = 0.8
+# Upper bound on bucket rows read for one listing (templated ads can fill a bucket)
+MAX_CANDIDATES = 2000
+# Only the start of a description is fingerprinted, so a huge one costs no more than this
+MAX_DESCRIPTION_LENGTH = 20000
+# Shingles permuted at a time; bounds the permutation matrix to NUM_PERM x CHUNK values
+CHUNK = 4096
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_random = np.random.RandomState(20240611)
+# Coefficients stay below 2**29 so that a * hash (< 2**32) + b cannot overflow uint64
+_PERM_A = _random.randint(1, 1 << 29, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _random.randint(0, 1 << 29, size=NUM_PERM).astype(np.uint64)
+
+VALUES_FIELDS = [
+    'id', 'title', 'description', 'type', 'purpose', 'city',
+    'car_details__make', 'car_details__model', 'car_details__year',
+    'property_details__property_type', 'property_details__bedrooms',
+]
+
+
+def _normalize(value):
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w]+', ' ', value.lower()).split())
+
+
+def fingerprint_text(row):
+    """Text that is shingled for a VALUES_FIELDS row; attributes are appended as tokens."""
+    attributes = ' '.join(str(value) for value in row[3:] if value not in (None, ''))
+    description = str(row[2] or '')[:MAX_DESCRIPTION_LENGTH]
+    return _normalize(f'{row[1]} {description} {attributes}')
+
+
+def _row_from_listing(listing):
+    car = getattr(listing, 'car_details', None)
+    details = getattr(listing, 'property_details', None)
+    return (
+        listing.pk, listing.title, listing.description, listing.type, listing.purpose, listing.city,
+        car.make if car else None, car.model if car else None, car.year if car else None,
+        details.property_type if details else None, details.bedrooms if details else None,
+    )
+
+
+def shingles(text):
+    """32-bit hashes of the character shingles of a normalized text."""
+    if len(text) <= SHINGLE_SIZE:
+        pieces = {text}
+    else:
+        pieces = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (zlib.crc32(piece.encode('utf-8')) for piece in pieces), dtype=np.uint64, count=len(pieces),
+    )
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERM uint32 values) of a normalized text."""
+    hashes = shingles(text)
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), CHUNK):
+        permuted = (np.outer(_PERM_A, hashes[start:start + CHUNK]) + _PERM_B[:, None]) % _MERSENNE_PRIME
+        np.minimum(signature, (permuted & _MAX_HASH).min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_buckets(signature):
+    """One bucket hash per band of a signature."""
+    return [zlib.crc32(signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def compute(row):
+    """Return (listing_id, content_hash, signature bytes, bucket hashes) for a VALUES_FIELDS row."""
+    text = fingerprint_text(row)
+    signature = minhash(text)
+    return row[0], zlib.crc32(text.encode('utf-8')), signature.tobytes(), band_buckets(signature)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures given as bytes."""
+    first = np.frombuffer(bytes(signature), dtype=np.uint32)
+    second = np.frombuffer(bytes(other), dtype=np.uint32)
+    return float(np.mean(first == second))
+
+
+def store(results):
+    """Write fingerprints and LSH buckets computed by ``compute``, replacing previous ones."""
+    if not results:
+        return
+    listing_ids = [result[0] for result in results]
+    with transaction.atomic():
+        ListingFingerprint.objects.filter(listing_id__in=listing_ids).delete()
+        ListingLSHBucket.objects.filter(listing_id__in=listing_ids).delete()
+        ListingFingerprint.objects.bulk_create([
+            ListingFingerprint(listing_id=listing_id, content_hash=content_hash, signature=signature)
+            for listing_id, content_hash, signature, _ in results
+        ])
+        ListingLSHBucket.objects.bulk_create([
+            ListingLSHBucket(listing_id=listing_id, band=band, bucket=bucket)
+            for listing_id, _, _, buckets in results
+            for band, bucket in enumerate(buckets)
+        ])
+
+
+def fingerprint_listing(listing):
+    """Refresh the fingerprint of one listing (details loaded) unless its text is unchanged."""
+    result = compute(_row_from_listing(listing))
+    current = ListingFingerprint.objects.filter(listing_id=listing.pk).values_list('content_hash', flat=True).first()
+    if current != result[1]:
+        store([result])
+
+
+def find_duplicates(listing_id, threshold=DUPLICATE_THRESHOLD, limit=10):
+    """
+    Return [(other_listing_id, similarity)] for listings that look like copies of ``listing_id``.
+
+    Candidates come from the LSH buckets; their signatures are then compared to
+    drop the false positives of the banding.
+    """
+    fingerprint = ListingFingerprint.objects.filter(listing_id=listing_id).values_list('signature', flat=True).first()
+    if fingerprint is None:
+        return []
+
+    shared = Q()
+    for band, bucket in ListingLSHBucket.objects.filter(listing_id=listing_id).values_list('band', 'bucket'):
+        shared |= Q(band=band, bucket=bucket)
+    if not shared:
+        return []
+    candidates = set(
+        ListingLSHBucket.objects.filter(shared)
+        .exclude(listing_id=listing_id)
+        .values_list('listing_id', flat=True)[:MAX_CANDIDATES]
+    )
+    if not candidates:
+        return []
+
+    matches = []
+    others = ListingFingerprint.objects.filter(listing_id__in=candidates).values_list('listing_id', 'signature')
+    for other_id, signature in others:
+        score = similarity(fingerprint, signature)
+        if score >= threshold:
+            matches.append((other_id, score))
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches[:limit]
+
+
+def describe_duplicates(listing_id, threshold=DUPLICATE_THRESHOLD, limit=10):
+    """``find_duplicates`` with the fields a moderator needs to compare the listings."""
+    matches = find_duplicates(listing_id, threshold, limit)
+    if not matches:
+        return []
+    rows = Listing.objects.filter(pk__in=[other_id for other_id, _ in matches]).values(
+        'id', 'title', 'status', 'price', 'currency', 'location', 'user_id', 'user__phone', 'created_at',
+    )
+    listings = {row['id']: row for row in rows}
+    return [
+        dict(listings[other_id], similarity=round(score, 3))
+        for other_id, score in matches
+        if other_id in listings
+    ]
@@ -0,0 +1,96 @@
+"""
+Streaming export of listings as NDJSON or CSV.
+
+Rows are read with ``values()`` in primary-key batches (keyset pagination)
+and written out line by line, so memory stays constant whatever the size of
+the catalog. Django's ``iterator()`` cannot be used for this on MySQL: the
+driver has no server-side cursors and buffers the whole result set.
+
+The queryset comes from ``ListingViewSet`` itself, so an export accepts the
+same filters as ``GET /api/listings/``. Used by the ``export`` action and
+``python manage.py export_listings``.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+# (column, ORM path) in output order
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('type', 'type'),
+    ('purpose', 'purpose'),
+    ('price', 'price'),
+    ('currency', 'currency'),
+    ('price_base', 'price_base'),
+    ('location', 'location'),
+    ('city', 'city'),
+    ('district', 'district'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('status', 'status'),
+    ('ad_type', 'ad_type'),
+    ('user_id', 'user_id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('make', 'car_details__make'),
+    ('model', 'car_details__model'),
+    ('year', 'car_details__year'),
+    ('mileage', 'car_details__mileage'),
+    ('fuel_type', 'car_details__fuel_type'),
+    ('transmission', 'car_details__transmission'),
+    ('property_type', 'property_details__property_type'),
+    ('bedrooms', 'property_details__bedrooms'),
+    ('bathrooms', 'property_details__bathrooms'),
+    ('area', 'property_details__area'),
+]
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(queryset, chunk_size=2000):
+    """Yield one dict per listing of ``queryset``, in primary-key order, ``chunk_size`` rows per query."""
+    fields = [path for name, path in EXPORT_COLUMNS if name == path]
+    renamed = {name: F(path) for name, path in EXPORT_COLUMNS if name != path}
+    queryset = queryset.select_related(None).prefetch_related(None).order_by('pk').values(*fields, **renamed)
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]['id']
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps({name: row[name] for name in COLUMN_NAMES}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMN_NAMES)
+    for row in rows:
+        yield writer.writerow([
+            row[name].isoformat() if hasattr(row[name], 'isoformat') else row[name] for name in COLUMN_NAMES
+        ])
+
+
+def export_lines(queryset, output_format='ndjson', chunk_size=2000):
+    """Lines of the export of ``queryset`` in ``output_format`` ('ndjson' or 'csv')."""
+    rows = iter_rows(queryset, chunk_size)
+    return csv_lines(rows) if output_format == 'csv' else ndjson_lines(rows)
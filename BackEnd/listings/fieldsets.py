@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets for the listing read endpoints.
+
+``?fields=id,title,price,first_image`` returns only the named fields and
+``?expand=images,user`` adds relations to the default fields of the
+endpoint (or to ``fields``). ``id`` is always returned. The same selection
+trims the SQL: only the needed listing columns are loaded with ``only()``,
+and related tables are joined or prefetched only when one of their fields
+is requested.
+"""
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .models import ListingImage
+
+# Serialized field -> listing column(s) it reads
+LISTING_COLUMNS = {
+    'id': ['id'],
+    'title': ['title'],
+    'description': ['description'],
+    'type': ['type'],
+    'purpose': ['purpose'],
+    'price': ['price'],
+    'currency': ['currency'],
+    'price_base': ['price_base'],
+    'location': ['location'],
+    'city': ['city'],
+    'district': ['district'],
+    'latitude': ['latitude'],
+    'longitude': ['longitude'],
+    'status': ['status'],
+    'ad_type': ['ad_type'],
+    'view_count': ['view_count'],
+    'user_id': ['user'],
+    'created_at': ['created_at'],
+    'updated_at': ['updated_at'],
+}
+# Relations joined with select_related -> columns of the related table used by their serializer
+JOINED_COLUMNS = {
+    'user': ['id', 'phone', 'email', 'full_name', 'profile_picture', 'role', 'created_at'],
+    'car_details': ['id', 'make', 'model', 'year', 'mileage', 'fuel_type', 'transmission', 'color', 'engine_size'],
+    'property_details': [
+        'id', 'property_type', 'bedrooms', 'bathrooms', 'area', 'floor', 'furnished', 'amenities',
+    ],
+}
+# Fields read from the prefetched images
+IMAGE_FIELDS = {'images', 'first_image'}
+FIELDSET_FIELDS = set(LISTING_COLUMNS) | set(JOINED_COLUMNS) | IMAGE_FIELDS
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def parse_fieldset(query_params, default_fields):
+    """
+    Return the set of fields requested by ``fields``/``expand``, or None when neither is given.
+
+    Raises ValidationError for unknown field names.
+    """
+    fields = _names(query_params.get('fields'))
+    expand = _names(query_params.get('expand'))
+    if not fields and not expand:
+        return None
+    selected = {'id'} | set(fields or default_fields) | set(expand)
+    unknown = selected - FIELDSET_FIELDS
+    if unknown:
+        raise ValidationError({
+            'error': f"Unknown fields: {', '.join(sorted(unknown))}. "
+                     f"Available: {', '.join(sorted(FIELDSET_FIELDS))}"
+        })
+    return selected
+
+
+def load_fieldset(queryset, fieldset, extra_columns=()):
+    """Join, prefetch and select only what serializing ``fieldset`` (and the view, ``extra_columns``) needs."""
+    columns = [column for name in fieldset for column in LISTING_COLUMNS.get(name, [])] + list(extra_columns)
+    joined = [name for name in JOINED_COLUMNS if name in fieldset]
+    for name in joined:
+        columns.append('user' if name == 'user' else f'{name}__listing')
+        columns.extend(f'{name}__{column}' for column in JOINED_COLUMNS[name])
+    queryset = queryset.only(*columns)
+    if joined:
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(*joined)
+    if fieldset & IMAGE_FIELDS:
+        images = ListingImage.objects.only('id', 'listing_id', 'image', 'order')
+        queryset = queryset.prefetch_related(Prefetch('images', queryset=images))
+    return queryset
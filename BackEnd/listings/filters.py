@@ -0,0 +1,18 @@
+from rest_framework import filters
+
+
+class ListingOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that sorts ``price`` on the currency-normalized ``price_base`` column."""
+    
+    field_map = {'price': 'price_base'}
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self._map_term(term) for term in ordering]
+    
+    def _map_term(self, term):
+        descending = term.startswith('-')
+        field = self.field_map.get(term.lstrip('-'), term.lstrip('-'))
+        return f'-{field}' if descending else field
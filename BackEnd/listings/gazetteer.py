@@ -0,0 +1,184 @@
+"""
+Local gazetteer used to turn free-text listing locations into structured places.
+
+``lookup`` resolves text such as "Villa à Dubai Marina" or "tevragh-zeina,
+Nouakchott" to a city, an optional district and coordinates without calling
+any external service. Listings are normalized on every save by the
+``listings.signals`` handlers; existing rows are backfilled with
+``python manage.py normalize_locations``.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+
+from .geo import encode
+from .models import Listing
+
+# name -> (city, district, latitude, longitude); district is None for a whole city
+PLACES = {
+    # United Arab Emirates
+    'dubai': ('Dubai', None, 25.2048, 55.2708),
+    'dubai marina': ('Dubai', 'Dubai Marina', 25.0805, 55.1403),
+    'downtown dubai': ('Dubai', 'Downtown Dubai', 25.1972, 55.2744),
+    'business bay': ('Dubai', 'Business Bay', 25.1850, 55.2650),
+    'jumeirah village circle': ('Dubai', 'Jumeirah Village Circle', 25.0590, 55.2060),
+    'palm jumeirah': ('Dubai', 'Palm Jumeirah', 25.1124, 55.1390),
+    'jumeirah lake towers': ('Dubai', 'Jumeirah Lake Towers', 25.0693, 55.1417),
+    'jumeirah beach residence': ('Dubai', 'Jumeirah Beach Residence', 25.0780, 55.1336),
+    'jumeirah': ('Dubai', 'Jumeirah', 25.2048, 55.2550),
+    'difc': ('Dubai', 'DIFC', 25.2116, 55.2796),
+    'deira': ('Dubai', 'Deira', 25.2711, 55.3075),
+    'bur dubai': ('Dubai', 'Bur Dubai', 25.2532, 55.2972),
+    'al barsha': ('Dubai', 'Al Barsha', 25.1136, 55.1986),
+    'mirdif': ('Dubai', 'Mirdif', 25.2167, 55.4167),
+    'dubai silicon oasis': ('Dubai', 'Dubai Silicon Oasis', 25.1279, 55.3800),
+    'abu dhabi': ('Abu Dhabi', None, 24.4539, 54.3773),
+    'al reem island': ('Abu Dhabi', 'Al Reem Island', 24.4990, 54.4050),
+    'khalifa city': ('Abu Dhabi', 'Khalifa City', 24.4195, 54.5780),
+    'yas island': ('Abu Dhabi', 'Yas Island', 24.4960, 54.6030),
+    'saadiyat island': ('Abu Dhabi', 'Saadiyat Island', 24.5450, 54.4340),
+    'al ain': ('Al Ain', None, 24.2075, 55.7447),
+    'sharjah': ('Sharjah', None, 25.3463, 55.4209),
+    'ajman': ('Ajman', None, 25.4052, 55.5136),
+    'ras al khaimah': ('Ras Al Khaimah', None, 25.8007, 55.9762),
+    'umm al quwain': ('Umm Al Quwain', None, 25.5647, 55.5552),
+    'fujairah': ('Fujairah', None, 25.1288, 56.3265),
+    # Mauritania
+    'nouakchott': ('Nouakchott', None, 18.0735, -15.9582),
+    'tevragh zeina': ('Nouakchott', 'Tevragh Zeina', 18.1036, -15.9785),
+    'ksar': ('Nouakchott', 'Ksar', 18.1000, -15.9400),
+    'sebkha': ('Nouakchott', 'Sebkha', 18.0700, -15.9900),
+    'el mina': ('Nouakchott', 'El Mina', 18.0480, -15.9780),
+    'arafat': ('Nouakchott', 'Arafat', 18.0520, -15.9430),
+    'dar naim': ('Nouakchott', 'Dar Naim', 18.1200, -15.9200),
+    'toujounine': ('Nouakchott', 'Toujounine', 18.0800, -15.9000),
+    'teyarett': ('Nouakchott', 'Teyarett', 18.1250, -15.9500),
+    'nouadhibou': ('Nouadhibou', None, 20.9310, -17.0347),
+    'rosso': ('Rosso', None, 16.5138, -15.8050),
+    'kaedi': ('Kaédi', None, 16.1500, -13.5000),
+    'kiffa': ('Kiffa', None, 16.6200, -11.4000),
+    'atar': ('Atar', None, 20.5169, -13.0499),
+    'zouerat': ('Zouérat', None, 22.7350, -12.4713),
+    'nema': ('Néma', None, 16.6170, -7.2500),
+    'selibaby': ('Sélibaby', None, 15.1590, -12.1843),
+    'aleg': ('Aleg', None, 17.0500, -13.9167),
+    'akjoujt': ('Akjoujt', None, 19.7460, -14.3850),
+}
+
+ALIASES = {
+    'jvc': 'jumeirah village circle',
+    'jlt': 'jumeirah lake towers',
+    'jbr': 'jumeirah beach residence',
+    'downtown': 'downtown dubai',
+    'marina': 'dubai marina',
+    'reem island': 'al reem island',
+    'rak': 'ras al khaimah',
+    'uaq': 'umm al quwain',
+    'dso': 'dubai silicon oasis',
+    'nktt': 'nouakchott',
+    'ndb': 'nouadhibou',
+    'tevragh zena': 'tevragh zeina',
+}
+
+# Longest names first so "dubai marina" wins over "dubai"
+_NAMES = sorted(list(PLACES) + list(ALIASES), key=len, reverse=True)
+
+
+def normalize_place_text(value):
+    """Lowercase, strip accents and punctuation: 'Kaédi, Tevragh-Zeina' -> 'kaedi tevragh zeina'."""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value.lower()).split())
+
+
+def lookup(text):
+    """
+    Return (city, district, latitude, longitude) for free text, or None when unknown.
+
+    A district wins over a city ("Ksar, Nouakchott" is Ksar) unless the text
+    names another city, and the longest district name wins ("Palm Jumeirah"
+    over "Jumeirah").
+    """
+    normalized = normalize_place_text(text)
+    if not normalized:
+        return None
+    padded = f' {normalized} '
+    places = [PLACES[ALIASES.get(name, name)] for name in _NAMES if f' {name} ' in padded]
+    if not places:
+        return None
+    cities = {place[0] for place in places if place[1] is None}
+    for place in places:
+        if place[1] is not None and (not cities or place[0] in cities):
+            return place
+    return next(place for place in places if place[1] is None)
+
+
+def _contains(name, part):
+    return f' {normalize_place_text(part)} ' in f' {normalize_place_text(name)} '
+
+
+def districts_within(city, district):
+    """Districts of ``city`` whose name contains ``district`` ("Jumeirah" -> Jumeirah, Palm Jumeirah, ...)."""
+    return sorted({
+        name for place_city, name, _, _ in PLACES.values()
+        if place_city == city and name and _contains(name, district)
+    })
+
+
+def districts_containing(city, district):
+    """Districts of ``city`` whose name is part of ``district`` ("Palm Jumeirah" -> Jumeirah, Palm Jumeirah)."""
+    return sorted({
+        name for place_city, name, _, _ in PLACES.values()
+        if place_city == city and name and _contains(district, name)
+    })
+
+
+def apply_place(listing):
+    """Fill the structured location fields of a listing from its free-text location."""
+    place = lookup(listing.location)
+    if place is None:
+        listing.city = ''
+        listing.district = ''
+        listing.latitude = None
+        listing.longitude = None
+        listing.geohash = ''
+        return False
+
+    city, district, latitude, longitude = place
+    listing.city = city
+    listing.district = district or ''
+    listing.latitude = latitude
+    listing.longitude = longitude
+    listing.geohash = encode(latitude, longitude)
+    return True
+
+
+def normalize_locations():
+    """
+    Backfill the structured location of every listing.
+
+    Listings share a small number of distinct location strings, so this runs
+    one UPDATE per distinct string rather than one per listing. Returns
+    (distinct locations, listings resolved).
+    """
+    locations = list(Listing.objects.order_by().values_list('location', flat=True).distinct())
+    resolved = 0
+    with transaction.atomic():
+        for location in locations:
+            place = lookup(location)
+            if place is None:
+                fields = {'city': '', 'district': '', 'latitude': None, 'longitude': None, 'geohash': ''}
+            else:
+                city, district, latitude, longitude = place
+                fields = {
+                    'city': city,
+                    'district': district or '',
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'geohash': encode(latitude, longitude),
+                }
+            updated = Listing.objects.filter(location=location).update(**fields)
+            if place is not None:
+                resolved += updated
+    return len(locations), resolved
@@ -0,0 +1,131 @@
+"""
+Geohash encoding and radius search helpers.
+
+Listings store a geohash of their coordinates in an indexed column. A radius
+query is answered by covering the search circle with a 3x3 block of geohash
+cells (each at least as large as the radius), turning it into a handful of
+indexed range scans, then checking the exact great-circle distance on the
+few remaining rows.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from .search import prefix_range
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 9
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode coordinates as a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) span in degrees of a geohash cell."""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Return the geohash prefixes of the 3x3 block of cells around a point.
+
+    The precision is the finest one whose cells are still at least ``radius_km``
+    wide and high, so the block always contains the whole search circle.
+    """
+    km_per_lon_degree = max(KM_PER_DEGREE * math.cos(math.radians(latitude)), 1e-6)
+    precision = 1
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        lat_span, lon_span = cell_size(candidate)
+        if lat_span * KM_PER_DEGREE < radius_km or lon_span * km_per_lon_degree < radius_km:
+            break
+        precision = candidate
+
+    lat_span, lon_span = cell_size(precision)
+    cells = set()
+    for dlat in (-lat_span, 0, lat_span):
+        for dlon in (-lon_span, 0, lon_span):
+            lat = max(-90.0, min(90.0, latitude + dlat))
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def distance_expression(latitude, longitude):
+    """ORM expression computing the haversine distance in km from a point."""
+    lat = Value(float(latitude), output_field=FloatField())
+    lon = Value(float(longitude), output_field=FloatField())
+    half_dlat = Radians(F('latitude') - lat) / 2
+    half_dlon = Radians(F('longitude') - lon) / 2
+    a = (
+        Power(Sin(half_dlat), 2)
+        + Cos(Radians(lat)) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlon), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(a))
+
+
+def radius_filter(queryset, latitude, longitude, radius_km):
+    """Restrict a Listing queryset to rows within ``radius_km`` of a point."""
+    cells = Q()
+    for cell in covering_cells(latitude, longitude, radius_km):
+        lower, upper = prefix_range(cell)
+        cells |= Q(geohash__gte=lower, geohash__lt=upper)
+
+    # Bounding box first (cheap), exact distance last
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / max(KM_PER_DEGREE * math.cos(math.radians(latitude)), 1e-6)
+    return (
+        queryset.filter(cells)
+        .filter(
+            latitude__gte=latitude - lat_delta, latitude__lte=latitude + lat_delta,
+            longitude__gte=longitude - lon_delta, longitude__lte=longitude + lon_delta,
+        )
+        .alias(distance_km=distance_expression(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
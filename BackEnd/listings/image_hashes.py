@@ -0,0 +1,160 @@
+"""
+Perceptual hashes of listing images, to catch photos reused across listings.
+
+Each image gets a 64-bit difference hash (dHash): the picture is reduced to a
+9x8 grayscale thumbnail and every bit records whether a pixel is brighter
+than its right neighbour. Resizing, re-encoding or small colour changes flip
+only a few bits, so copies are found by Hamming distance.
+
+The hash is stored split into four 16-bit chunks, each in an indexed column
+(a multi-index hash table): two hashes within ``MAX_DISTANCE`` (3) bits of
+each other must agree exactly on at least one chunk, so candidates are found
+with four indexed equality lookups and then checked bit by bit.
+
+Hashes are computed by the ``listings.signals`` handlers when an image is
+uploaded, and for existing files by ``python manage.py hash_listing_images``.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from PIL import Image
+
+from .models import Listing, ListingImageHash
+
+HASH_WIDTH = 8
+HASH_HEIGHT = 8
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+MAX_DISTANCE = CHUNKS - 1
+# Hashes with almost all bits equal come from flat images (placeholders, blank scans) and match everything
+MIN_SET_BITS = 4
+MAX_CANDIDATES = 2000
+# Errors of files that are not images, are truncated, or are decompression bombs
+UNREADABLE_IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def difference_hash(file):
+    """Return the 64-bit dHash (unsigned int) of an image file or path."""
+    with Image.open(file) as image:
+        # Lets the JPEG decoder downscale while decoding instead of producing full-size pixels
+        image.draft('L', (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        thumbnail = image.convert('L').resize((HASH_WIDTH + 1, HASH_HEIGHT), Image.LANCZOS)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def to_signed(value):
+    """Map an unsigned 64-bit hash onto the signed range of a BIGINT column."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def hash_chunks(value):
+    """The CHUNKS indexed slices of an unsigned hash, or Nones when the image is too flat to compare."""
+    set_bits = bin(value).count('1')
+    if set_bits < MIN_SET_BITS or set_bits > 64 - MIN_SET_BITS:
+        return [None] * CHUNKS
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * index)) & mask for index in range(CHUNKS)]
+
+
+def hamming(first, second):
+    return bin(to_unsigned(first) ^ to_unsigned(second)).count('1')
+
+
+def build_row(image_id, listing_id, value):
+    chunk0, chunk1, chunk2, chunk3 = hash_chunks(value)
+    return ListingImageHash(
+        image_id=image_id, listing_id=listing_id, hash=to_signed(value),
+        chunk0=chunk0, chunk1=chunk1, chunk2=chunk2, chunk3=chunk3,
+    )
+
+
+def store(results):
+    """Write (image_id, listing_id, unsigned hash) results, replacing previous hashes of those images."""
+    if not results:
+        return
+    with transaction.atomic():
+        ListingImageHash.objects.filter(image_id__in=[result[0] for result in results]).delete()
+        ListingImageHash.objects.bulk_create([build_row(*result) for result in results])
+
+
+def hash_image(image):
+    """Hash one ListingImage from its stored file; unreadable files are left unhashed."""
+    try:
+        with image.image.open('rb') as file:
+            value = difference_hash(file)
+    except UNREADABLE_IMAGE_ERRORS:
+        ListingImageHash.objects.filter(image_id=image.pk).delete()
+        return None
+    store([(image.pk, image.listing_id, value)])
+    return value
+
+
+def find_image_matches(listing_id, max_distance=MAX_DISTANCE, limit=20):
+    """
+    Return images of other listings that look like copies of this listing's photos.
+
+    Each match is a dict with the image of this listing, the matching image,
+    its listing (title, status, owner) and the Hamming distance, closest first.
+    """
+    own = list(
+        ListingImageHash.objects.filter(listing_id=listing_id, chunk0__isnull=False)
+        .values_list('image_id', 'hash', 'chunk0', 'chunk1', 'chunk2', 'chunk3')
+    )
+    if not own:
+        return []
+
+    chunk_values = [sorted({chunks[index] for _, _, *chunks in own}) for index in range(CHUNKS)]
+    shared = Q()
+    for index, values in enumerate(chunk_values):
+        shared |= Q(**{f'chunk{index}__in': values})
+    # The more chunks a hash shares, the closer it is likely to be: those are kept first when capping
+    shared_chunks = sum(
+        (
+            Case(When(**{f'chunk{index}__in': values}, then=Value(1)), default=Value(0), output_field=IntegerField())
+            for index, values in enumerate(chunk_values)
+        ),
+        Value(0),
+    )
+    candidates = (
+        ListingImageHash.objects.filter(shared)
+        .exclude(listing_id=listing_id)
+        .annotate(shared_chunks=shared_chunks)
+        .order_by('-shared_chunks', 'image_id')
+        .values_list('image_id', 'listing_id', 'hash')[:MAX_CANDIDATES]
+    )
+
+    matches = []
+    for other_image_id, other_listing_id, other_hash in candidates:
+        best = min(((hamming(value, other_hash), image_id) for image_id, value, *_ in own))
+        if best[0] <= max_distance:
+            matches.append((best[0], best[1], other_image_id, other_listing_id))
+    if not matches:
+        return []
+    matches.sort()
+    matches = matches[:limit]
+
+    listings = {
+        row['id']: row
+        for row in Listing.objects.filter(pk__in={match[3] for match in matches}).values(
+            'id', 'title', 'status', 'user_id', 'user__phone',
+        )
+    }
+    return [
+        {
+            'image_id': image_id,
+            'matched_image_id': other_image_id,
+            'listing': listings[other_listing_id],
+            'distance': distance,
+        }
+        for distance, image_id, other_image_id, other_listing_id in matches
+        if other_listing_id in listings
+    ]
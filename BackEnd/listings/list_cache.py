@@ -0,0 +1,97 @@
+"""
+Cached public listing pages with single-flight recomputation.
+
+``GET /api/listings/`` responses for non-staff users depend only on the
+query parameters (and the scheme and host, through absolute image URLs),
+so they are kept in the Django cache. An entry is fresh for
+``LIST_CACHE_SECONDS`` and is then served stale for up to ``LIST_CACHE_STALE_SECONDS`` more while one
+request recomputes it (stale-while-revalidate).
+
+Exactly one request per key recomputes at a time: threads of the same
+process elect a leader with a lock and wait on its event, and the leaders
+of different processes race for a ``cache.add`` lock. When there is no stale
+value to serve, the others wait up to ``LIST_CACHE_WAIT_SECONDS`` for the
+new one and only then query the database themselves. Coalescing across
+processes needs a shared cache backend (``CACHE_BACKEND``); with the default
+local-memory cache each process recomputes on its own.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# A leader that died without releasing its lock blocks recomputation this long
+LOCK_SECONDS = 30
+# How often waiting requests look for the value computed by another process
+POLL_SECONDS = 0.05
+
+
+def cache_key(request):
+    """Cache key of a list request: scheme, host and query parameters, in any order."""
+    params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    digest = hashlib.md5(f'{request.scheme}://{request.get_host()}?{params!r}'.encode()).hexdigest()
+    return f'listings:list:{digest}'
+
+
+class SingleFlightCache:
+    """Cache lookups where only one caller per key computes a missing or stale value."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def get_or_compute(self, key, compute):
+        """Value of ``key``, calling ``compute()`` at most once per key at a time across callers."""
+        entry = cache.get(key)
+        if entry is not None and entry['fresh_until'] > time.time():
+            return entry['value']
+
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = threading.Event()
+
+        if not leader:
+            if entry is not None:
+                return entry['value']
+            flight.wait(settings.LIST_CACHE_WAIT_SECONDS)
+            entry = cache.get(key)
+            return entry['value'] if entry is not None else compute()
+
+        try:
+            return self._lead(key, entry, compute)
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.set()
+
+    def _lead(self, key, entry, compute):
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, LOCK_SECONDS):
+            # Another process is recomputing
+            if entry is not None:
+                return entry['value']
+            deadline = time.monotonic() + settings.LIST_CACHE_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(POLL_SECONDS)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry['value']
+            return compute()
+
+        try:
+            value = compute()
+            cache.set(
+                key,
+                {'value': value, 'fresh_until': time.time() + settings.LIST_CACHE_SECONDS},
+                settings.LIST_CACHE_SECONDS + settings.LIST_CACHE_STALE_SECONDS,
+            )
+            return value
+        finally:
+            cache.delete(lock_key)
+
+
+list_cache = SingleFlightCache()
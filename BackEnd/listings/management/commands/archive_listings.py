@@ -0,0 +1,38 @@
+"""
+Move old sold and rejected listings to the archive tables.
+
+Listings sold or rejected more than ARCHIVE_AFTER_DAYS ago are copied, with
+their details and image rows, to ``archived_listings`` and deleted from the
+hot tables, one transaction per batch. Image files are kept.
+
+Usage:
+    python manage.py archive_listings
+    python manage.py archive_listings --days 365 --batch-size 1000 --limit 50000
+    python manage.py archive_listings --dry-run
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.archive import archivable, archive_listings
+
+
+class Command(BaseCommand):
+    help = 'Archive listings sold or rejected long ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Archive listings sold or rejected more than this many days ago',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Listings moved per transaction')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many listings')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the archivable listings')
+
+    def handle(self, *args, **options):
+        days = max(0, options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(days).count()} listings would be archived.')
+            return
+
+        archived = archive_listings(days=days, batch_size=max(1, options['batch_size']), limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} listings.'))
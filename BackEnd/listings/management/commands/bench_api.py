@@ -0,0 +1,293 @@
+"""
+Benchmark the listings and auth endpoints in-process with the Django test client.
+
+Usage:
+    python manage.py bench_api --iterations 50 --output bench/HEAD.json
+    python manage.py bench_api --compare bench/baseline.json --output bench/HEAD.json
+
+Run it against a seeded database (see ``seed_catalog``). No network is used:
+requests go straight through the URL resolver, middleware and views.
+
+The run leaves the database as it found it, except for the benchmark user:
+detail views are not counted in ``view_count``, and the listings created by
+``create_with_images`` are deleted at the end with their images and their
+change-feed rows.
+"""
+import io
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from listings.models import Listing, ListingChange
+from listings.query_shapes import LIST_QUERY_SHAPES
+from listings.view_counts import view_counter
+
+User = get_user_model()
+
+BENCH_PHONE = '+990000000001'
+BENCH_PASSWORD = 'bench-password-123'
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _jpeg_upload(name):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (120, 120, 140)).save(buffer, 'JPEG', quality=70)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench_api'},
+}
+
+
+def _ignore_view(listing_id, views=1):
+    """Stands in for view_counter.record: benchmark hits are not real views."""
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, SQL queries and allocations for the listings and auth endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument('--only', nargs='*', help='Run only the scenarios with these names')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--compare', help='Previous JSON results to compare against')
+
+    def handle(self, *args, **options):
+        if not Listing.objects.filter(status='approved').exists():
+            raise CommandError('No approved listings found. Run "python manage.py seed_catalog" first.')
+
+        self.iterations = max(1, options['iterations'])
+        self.warmup = max(0, options['warmup'])
+
+        # The list scenarios measure the database path, not the cached public list pages or sampler flushes.
+        # The cache is a private one, cleared after each scenario (login attempts, counts) without
+        # touching the shared cache the instance may be configured with.
+        with override_settings(
+            ALLOWED_HOSTS=['*'], LIST_CACHE_SECONDS=0, LIST_CACHE_STALE_SECONDS=0, LIST_SAMPLE_RATE=0,
+            CACHES=BENCH_CACHES,
+        ), mock.patch.object(view_counter, 'record', _ignore_view):
+            self.client = Client()
+            self._prepare_users()
+            scenarios = self._scenarios()
+            if options['only']:
+                scenarios = [s for s in scenarios if s[0] in options['only']]
+
+            results = {}
+            try:
+                for name, request in scenarios:
+                    results[name] = self._run(request)
+                    self._print_row(name, results[name])
+            finally:
+                self._cleanup()
+
+        report = {
+            'revision': _git_revision(),
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'listings': Listing.objects.count(),
+            'iterations': self.iterations,
+            'scenarios': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            self._compare(options['compare'], report)
+
+    def _prepare_users(self):
+        bench_user, created = User.objects.get_or_create(phone=BENCH_PHONE, defaults={'full_name': 'Benchmark'})
+        if created or not bench_user.check_password(BENCH_PASSWORD):
+            bench_user.set_password(BENCH_PASSWORD)
+            bench_user.save()
+        self.bench_user = bench_user
+
+        # my_listings is measured for the owner with the most listings
+        busiest = (
+            Listing.objects.values('user_id').annotate(total=Count('id')).order_by('-total').first()
+        )
+        owner = User.objects.get(pk=busiest['user_id'])
+        self.owner_auth = f'Bearer {RefreshToken.for_user(owner).access_token}'
+        self.bench_auth = f'Bearer {RefreshToken.for_user(bench_user).access_token}'
+
+        self.detail_ids = list(
+            Listing.objects.filter(status='approved').order_by('id').values_list('id', flat=True)[:200]
+        )
+        self.created_ids = []
+        self.last_change_id = ListingChange.objects.aggregate(last=Max('id'))['last'] or 0
+        self.login_counter = 0
+
+    def _scenarios(self):
+        scenarios = [
+            (f'list_{name}', self._get('/api/listings/', params))
+            for name, params in LIST_QUERY_SHAPES.items()
+        ]
+        scenarios += [
+            ('list_page_5', self._get('/api/listings/', {'page': '5'})),
+            ('detail', self._detail),
+            ('my_listings', self._get('/api/listings/my_listings/', {}, auth=self.owner_auth)),
+            ('login', self._login),
+            ('create_with_images', self._create),
+        ]
+        return scenarios
+
+    def _get(self, path, params, auth=None):
+        extra = {'HTTP_AUTHORIZATION': auth} if auth else {}
+
+        def request(index):
+            return self.client.get(path, params, **extra)
+        return request
+
+    def _detail(self, index):
+        listing_id = self.detail_ids[index % len(self.detail_ids)]
+        return self.client.get(f'/api/listings/{listing_id}/')
+
+    def _login(self, index):
+        # Each attempt comes from a distinct address so the login rate limit never kicks in
+        self.login_counter += 1
+        address = f'10.{(self.login_counter >> 16) & 255}.{(self.login_counter >> 8) & 255}.{self.login_counter & 255}'
+        return self.client.post(
+            '/api/auth/login/',
+            {'phone': BENCH_PHONE, 'password': BENCH_PASSWORD},
+            content_type='application/json',
+            REMOTE_ADDR=address,
+        )
+
+    def _create(self, index):
+        data = {
+            'title': f'Benchmark listing {index}',
+            'description': 'Created by bench_api',
+            'type': 'car',
+            'purpose': 'sale',
+            'price': '45000',
+            'currency': 'AED',
+            'location': 'Dubai Marina',
+            'ad_type': 'simple',
+            'images': [_jpeg_upload(f'bench_{index}_{i}.jpg') for i in range(3)],
+        }
+        response = self.client.post('/api/listings/', data, HTTP_AUTHORIZATION=self.bench_auth)
+        if response.status_code == 201:
+            self.created_ids.append(response.json()['id'])
+        return response
+
+    def _run(self, request):
+        for index in range(self.warmup):
+            request(index)
+
+        latencies = []
+        queries = []
+        statuses = set()
+        for index in range(self.iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(self.warmup + index)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+            statuses.add(response.status_code)
+
+        # Allocations are measured in a separate pass: tracing skews latency
+        tracemalloc.start()
+        try:
+            peaks = []
+            blocks = []
+            for index in range(min(5, self.iterations)):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                snapshot_before = tracemalloc.take_snapshot()
+                request(self.warmup + self.iterations + index)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                diff = tracemalloc.take_snapshot().compare_to(snapshot_before, 'filename')
+                blocks.append(sum(stat.count_diff for stat in diff if stat.count_diff > 0))
+        finally:
+            tracemalloc.stop()
+            cache.clear()
+
+        latencies.sort()
+        return {
+            'status_codes': sorted(statuses),
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50), 3),
+                'p95': round(_percentile(latencies, 95), 3),
+                'p99': round(_percentile(latencies, 99), 3),
+                'mean': round(sum(latencies) / len(latencies), 3),
+            },
+            'queries': {'min': min(queries), 'max': max(queries)},
+            'alloc_peak_kib': round(max(peaks) / 1024, 1) if peaks else None,
+            'alloc_blocks': max(blocks) if blocks else None,
+        }
+
+    def _print_row(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{name:<28} p50={latency['p50']:>8.2f}ms p95={latency['p95']:>8.2f}ms "
+            f"p99={latency['p99']:>8.2f}ms queries={result['queries']['max']:>3} "
+            f"peak={result['alloc_peak_kib']}KiB status={result['status_codes']}"
+        )
+
+    def _compare(self, path, report):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                baseline = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+
+        self.stdout.write(f"\nCompared with {baseline.get('revision') or path}:")
+        for name, result in report['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if not previous:
+                continue
+            old_p50 = previous['latency_ms']['p50']
+            new_p50 = result['latency_ms']['p50']
+            change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0
+            query_delta = result['queries']['max'] - previous['queries']['max']
+            line = f'{name:<28} p50 {old_p50:.2f} -> {new_p50:.2f}ms ({change:+.1f}%) queries {query_delta:+d}'
+            if change > 10 or query_delta > 0:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+
+    def _cleanup(self):
+        for listing in Listing.objects.filter(id__in=self.created_ids).prefetch_related('images'):
+            for image in listing.images.all():
+                image.image.delete(save=False)
+            listing.delete()
+        # Created and deleted within the run: no client needs their changes or tombstones
+        ListingChange.objects.filter(id__gt=self.last_change_id, listing_id__in=self.created_ids).delete()
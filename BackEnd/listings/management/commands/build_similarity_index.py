@@ -0,0 +1,28 @@
+"""
+Build the similar-listings feature matrix and save it for the web processes.
+
+Usage:
+    python manage.py build_similarity_index
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.similarity import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = 'Compute the similar-listings feature matrix and write it to SIMILARITY_INDEX_PATH.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.SIMILARITY_INDEX_PATH, help='Where to write the .npz file')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = SimilarityIndex()
+        index.build()
+        index.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {index.size} listings in {time.perf_counter() - started:.1f}s -> {options['output']}"
+        ))
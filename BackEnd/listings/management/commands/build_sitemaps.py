@@ -0,0 +1,32 @@
+"""
+Write the sharded sitemaps of approved listings to SITEMAP_ROOT.
+
+Only the shards touched since the previous run are rewritten; --full
+rewrites all of them.
+
+Usage:
+    python manage.py build_sitemaps
+    python manage.py build_sitemaps --full
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Generate or update the listing sitemaps served from SITEMAP_URL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every shard')
+        parser.add_argument('--output', default=settings.SITEMAP_ROOT, help='Directory to write to')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rewritten, total = build_sitemaps(options['output'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rewrote {rewritten} shards ({total} in the index) in {time.perf_counter() - started:.1f}s "
+            f"-> {options['output']}"
+        ))
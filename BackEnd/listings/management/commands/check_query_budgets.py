@@ -0,0 +1,167 @@
+"""
+Fail when a listings endpoint exceeds its SQL query budget.
+
+Usage:
+    python manage.py check_query_budgets
+    python manage.py check_query_budgets --keepdb -v 2
+
+Budgets are declared in ``listings/query_budgets.py``. The check runs against a
+throwaway test database filled by ``seed_catalog``, so it can run in CI and
+exits with a non-zero status when any budget is broken.
+"""
+import io
+import re
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from listings.models import Listing
+from listings.query_budgets import QUERY_BUDGETS
+from listings.views import ListingViewSet
+
+User = get_user_model()
+
+JOIN_RE = re.compile(r'\bJOIN\b', re.IGNORECASE)
+
+BUDGET_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'check_query_budgets'},
+}
+
+
+@contextmanager
+def _page_size(size):
+    """Temporarily change the page size used by ListingViewSet."""
+    original = ListingViewSet.pagination_class
+    ListingViewSet.pagination_class = type('BudgetPagination', (original,), {'page_size': size})
+    try:
+        yield
+    finally:
+        ListingViewSet.pagination_class = original
+
+
+class Command(BaseCommand):
+    help = 'Check the SQL query count and shape of the listings endpoints against their budgets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+        parser.add_argument('--only', nargs='*', help='Check only the budgets with these names')
+
+    def handle(self, *args, **options):
+        budgets = QUERY_BUDGETS
+        if options['only']:
+            budgets = [budget for budget in budgets if budget['name'] in options['only']]
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # Sampler flushes would add queries to the measured requests; the cache, cleared
+            # before each request, is a private one rather than the shared cache of the instance
+            with override_settings(ALLOWED_HOSTS=['*'], LIST_SAMPLE_RATE=0, CACHES=BUDGET_CACHES):
+                self._prepare_fixtures()
+                failures = []
+                for budget in budgets:
+                    failures.extend(self._check(budget, options['verbosity']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} query budget violation(s).')
+        self.stdout.write(self.style.SUCCESS(f'All {len(budgets)} query budgets respected.'))
+
+    def _prepare_fixtures(self):
+        if not Listing.objects.exists():
+            call_command('seed_catalog', users=10, listings=400, max_images=3, seed=1, stdout=io.StringIO())
+
+        staff, _ = User.objects.get_or_create(
+            phone='+990000000090', defaults={'full_name': 'Budget staff', 'is_staff': True}
+        )
+        self.tokens = {'staff': str(RefreshToken.for_user(staff).access_token)}
+
+        # One owner per my_listings size, each owning exactly that many listings
+        self.owners = {}
+        for budget in QUERY_BUDGETS:
+            if budget['endpoint'] != 'my_listings':
+                continue
+            for size in budget['sizes']:
+                owner, _ = User.objects.get_or_create(
+                    phone=f'+99000000{size:04d}', defaults={'full_name': f'Budget owner {size}'}
+                )
+                if owner.listings.count() != size:
+                    owner.listings.all().delete()
+                    ids = list(
+                        Listing.objects.exclude(user__phone__startswith='+99000000')
+                        .order_by('id').values_list('id', flat=True)[:size]
+                    )
+                    Listing.objects.filter(id__in=ids).update(user=owner)
+                self.owners[size] = str(RefreshToken.for_user(owner).access_token)
+
+        self.detail_id = (
+            Listing.objects.filter(status='approved', images__isnull=False).values_list('id', flat=True).first()
+        )
+        self.batch_ids = list(
+            Listing.objects.filter(status='approved').order_by('-id').values_list('id', flat=True)[:200]
+        )
+
+    def _request(self, budget, size):
+        client = Client()
+        headers = {}
+        auth = budget.get('auth')
+        if auth == 'owner':
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.owners[size]}'
+        elif auth:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.tokens[auth]}'
+
+        if budget['endpoint'] == 'list':
+            with _page_size(size):
+                return client.get('/api/listings/', budget['params'], **headers)
+        if budget['endpoint'] == 'detail':
+            return client.get(f'/api/listings/{self.detail_id}/', budget['params'], **headers)
+        if budget['endpoint'] == 'batch':
+            ids = ','.join(str(listing_id) for listing_id in self.batch_ids[:size])
+            return client.get('/api/listings/batch/', {**budget['params'], 'ids': ids}, **headers)
+        return client.get('/api/listings/my_listings/', budget['params'], **headers)
+
+    def _check(self, budget, verbosity):
+        failures = []
+        counts = {}
+        for size in budget['sizes']:
+            # Budgets are about the database path, not the cached public list pages
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = self._request(budget, size)
+            if response.status_code != 200:
+                failures.append(f"{budget['name']} (size {size}): HTTP {response.status_code}")
+                continue
+
+            queries = [query['sql'] for query in captured.captured_queries]
+            counts[size] = len(queries)
+            if len(queries) > budget['max_queries']:
+                failures.append(
+                    f"{budget['name']} (size {size}): {len(queries)} queries, budget is {budget['max_queries']}"
+                )
+            for sql in queries:
+                joins = len(JOIN_RE.findall(sql))
+                if joins > budget['max_joins']:
+                    failures.append(
+                        f"{budget['name']} (size {size}): query with {joins} joins, "
+                        f"budget is {budget['max_joins']}: {sql[:200]}"
+                    )
+            if verbosity > 1:
+                for sql in queries:
+                    self.stdout.write(f'    {sql[:160]}')
+
+        if budget['constant'] and len(set(counts.values())) > 1:
+            failures.append(f"{budget['name']}: query count grows with size {counts}")
+
+        summary = ', '.join(f'{size}->{count}' for size, count in counts.items())
+        self.stdout.write(f"{budget['name']:<28} {summary}")
+        return failures
@@ -0,0 +1,29 @@
+"""
+Compact the listing change log behind the change feed.
+
+Changes older than CHANGE_FEED_RETENTION_DAYS are deleted when a later change
+of the same listing supersedes them. The latest change of every listing
+(including tombstones) is kept, so full syncs from token 0 stay complete.
+
+Usage:
+    python manage.py compact_listing_changes
+    python manage.py compact_listing_changes --days 7
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.changes import compact
+
+
+class Command(BaseCommand):
+    help = 'Delete superseded rows of the listing change log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGE_FEED_RETENTION_DAYS,
+            help='Only compact changes older than this many days',
+        )
+
+    def handle(self, *args, **options):
+        deleted = compact(older_than_days=max(0, options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} superseded changes.'))
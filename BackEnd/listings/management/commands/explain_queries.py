@@ -0,0 +1,125 @@
+"""
+Replay listing query shapes through EXPLAIN and report full scans and filesorts.
+
+Usage:
+    python manage.py explain_queries
+    python manage.py explain_queries --shapes captured.jsonl --verbose
+
+Without ``--shapes`` the representative shapes from ``listings/query_shapes.py``
+are used. A shapes file holds one JSON object of query parameters per line,
+exactly as they would be sent to ``/api/listings/``.
+"""
+import json
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from listings.query_shapes import LIST_QUERY_SHAPES
+from listings.views import ListingViewSet
+
+SQLITE_FULL_SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bINDEX\b)')
+SQLITE_FILESORT_RE = re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY)')
+POSTGRES_FULL_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_FILESORT_RE = re.compile(r'\bSort\b')
+
+
+def _mysql_problems(plan):
+    """Walk a MySQL FORMAT=JSON plan collecting full scans and filesorts."""
+    full_scans, filesort = [], False
+
+    def walk(node):
+        nonlocal filesort
+        if isinstance(node, dict):
+            if node.get('using_filesort'):
+                filesort = True
+            if node.get('access_type') == 'ALL':
+                full_scans.append(node.get('table_name', '?'))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return full_scans, filesort
+
+
+def analyse_plan(plan):
+    """Return (full-scanned tables, uses filesort) for an EXPLAIN output."""
+    if connection.vendor == 'mysql':
+        return _mysql_problems(plan)
+    if connection.vendor == 'postgresql':
+        return POSTGRES_FULL_SCAN_RE.findall(plan), bool(POSTGRES_FILESORT_RE.search(plan))
+    full_scans = [
+        match.group(1) for line in plan.splitlines() for match in [SQLITE_FULL_SCAN_RE.search(line)] if match
+    ]
+    return full_scans, bool(SQLITE_FILESORT_RE.search(plan))
+
+
+def build_list_querysets(params, page_size=20):
+    """Build the COUNT and page querysets ListingViewSet.list runs for ``params``."""
+    factory = APIRequestFactory()
+    request = Request(factory.get('/api/listings/', params))
+    request.user = AnonymousUser()
+
+    view = ListingViewSet()
+    view.setup(request._request)
+    view.request = request
+    view.action = 'list'
+    view.format_kwarg = None
+
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset, queryset[:page_size]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the listings list query shapes and flag full table scans and filesorts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shapes', help='File with one JSON object of query parameters per line')
+        parser.add_argument('--verbose', action='store_true', help='Print the full plans')
+
+    def handle(self, *args, **options):
+        shapes = self._load_shapes(options['shapes']) if options['shapes'] else LIST_QUERY_SHAPES
+        explain_kwargs = {'format': 'json'} if connection.vendor == 'mysql' else {}
+
+        problems = 0
+        for name, params in shapes.items():
+            queryset, page = build_list_querysets(params)
+            for label, plan in (
+                ('count', queryset.order_by().values('pk').explain(**explain_kwargs)),
+                ('page', page.explain(**explain_kwargs)),
+            ):
+                full_scans, filesort = analyse_plan(plan)
+                issues = [f'full scan on {table}' for table in full_scans]
+                if filesort and label == 'page':
+                    issues.append('filesort')
+
+                if issues:
+                    problems += 1
+                    self.stdout.write(self.style.WARNING(f"{name:<28} {label:<5} {', '.join(issues)}"))
+                else:
+                    self.stdout.write(f'{name:<28} {label:<5} ok')
+                if options['verbose']:
+                    self.stdout.write(f'    {params}')
+                    for line in plan.splitlines():
+                        self.stdout.write(f'    {line}')
+
+        summary = f'{problems} plan(s) with full scans or filesorts across {len(shapes)} shape(s).'
+        self.stdout.write(self.style.WARNING(summary) if problems else self.style.SUCCESS(summary))
+
+    def _load_shapes(self, path):
+        shapes = {}
+        try:
+            with open(path, encoding='utf-8') as handle:
+                for number, line in enumerate(handle, start=1):
+                    line = line.strip()
+                    if line:
+                        shapes[f'line_{number}'] = json.loads(line)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read shapes from {path}: {exc}')
+        return shapes
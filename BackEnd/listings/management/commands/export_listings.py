@@ -0,0 +1,73 @@
+"""
+Export listings as NDJSON or CSV with constant memory.
+
+Filters are the query parameters of GET /api/listings/, applied by
+ListingViewSet itself. Only approved listings are exported unless
+--include-unapproved is given.
+
+Usage:
+    python manage.py export_listings --output listings.ndjson
+    python manage.py export_listings --format csv --param type=car --param make=Toyota --output cars.csv
+"""
+import sys
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from listings.export import CONTENT_TYPES, export_lines
+from listings.views import ListingViewSet
+
+
+def build_export_queryset(params, include_unapproved=False):
+    """The queryset ListingViewSet.export streams for ``params``."""
+    request = Request(APIRequestFactory().get('/api/listings/export/', params))
+    # An unsaved staff user sees every status, as an admin calling the endpoint would
+    request.user = get_user_model()(is_staff=True) if include_unapproved else AnonymousUser()
+
+    view = ListingViewSet()
+    view.setup(request._request)
+    view.request = request
+    view.action = 'export'
+    view.format_kwarg = None
+    return view.filter_queryset(view.get_queryset())
+
+
+class Command(BaseCommand):
+    help = 'Stream listings to an NDJSON or CSV file, reusing the list endpoint filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(CONTENT_TYPES), default='ndjson', help='Output format')
+        parser.add_argument('--output', default='-', help='File to write, "-" for stdout')
+        parser.add_argument(
+            '--param', action='append', default=[], metavar='NAME=VALUE',
+            help='List endpoint query parameter, e.g. type=car (repeatable)',
+        )
+        parser.add_argument('--include-unapproved', action='store_true', help='Export every status')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per query')
+
+    def handle(self, *args, **options):
+        params = {}
+        for item in options['param']:
+            name, separator, value = item.partition('=')
+            if not separator or not name:
+                raise CommandError(f'Invalid --param "{item}", expected NAME=VALUE')
+            params[name] = value
+
+        queryset = build_export_queryset(params, options['include_unapproved'])
+        lines = export_lines(queryset, options['format'], max(1, options['chunk_size']))
+
+        total = 0
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8', newline='')
+        try:
+            for line in lines:
+                output.write(line)
+                total += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        rows = total - 1 if options['format'] == 'csv' else total
+        self.stderr.write(self.style.SUCCESS(f'Exported {rows} listings.'))
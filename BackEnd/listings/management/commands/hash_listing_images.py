@@ -0,0 +1,100 @@
+"""
+Compute perceptual hashes for existing listing images under MEDIA_ROOT.
+
+Files are read and hashed by a pool of worker processes, one batch of
+ListingImage rows at a time; the main process writes the results. Images
+that already have a hash are skipped unless --all is given.
+
+Usage:
+    python manage.py hash_listing_images
+    python manage.py hash_listing_images --workers 8 --batch-size 1000 --all
+    python manage.py hash_listing_images --start-method spawn  # workers started as on Windows and macOS
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from listings.image_hashes import UNREADABLE_IMAGE_ERRORS, difference_hash, store
+from listings.models import ListingImage
+
+
+def hash_batch(rows):
+    """Hash (image_id, listing_id, path) rows; returns (results, unreadable count)."""
+    results = []
+    unreadable = 0
+    # Several rows often point at the same file (reposts, seeded placeholders)
+    seen = {}
+    for image_id, listing_id, path in rows:
+        if path not in seen:
+            try:
+                seen[path] = difference_hash(path)
+            except UNREADABLE_IMAGE_ERRORS:
+                seen[path] = None
+        if seen[path] is None:
+            unreadable += 1
+        else:
+            results.append((image_id, listing_id, seen[path]))
+    return results, unreadable
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes of listing images to detect photos reused across listings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument(
+            '--start-method', choices=multiprocessing.get_all_start_methods(),
+            help='How worker processes are started (default: the platform default)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Images per batch')
+        parser.add_argument('--all', action='store_true', help='Rehash images that already have a hash')
+
+    def batches(self, batch_size, rehash):
+        queryset = ListingImage.objects.order_by('pk')
+        if not rehash:
+            queryset = queryset.filter(perceptual_hash__isnull=True)
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_id).values_list('id', 'listing_id', 'image')[:batch_size])
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(image_id, listing_id, default_storage.path(name)) for image_id, listing_id, name in rows if name]
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        hashed = 0
+        unreadable = 0
+        # Workers started with spawn (the default on Windows and macOS) import this module
+        # afresh, and its model imports need the app registry loaded first
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup,
+            mp_context=multiprocessing.get_context(options['start_method']),
+        ) as pool:
+            # Keep a bounded number of batches in flight so memory does not grow with the catalog
+            pending = deque()
+            for rows in self.batches(batch_size, options['all']):
+                pending.append(pool.submit(hash_batch, rows))
+                if len(pending) >= workers * 2:
+                    results, missing = pending.popleft().result()
+                    store(results)
+                    hashed += len(results)
+                    unreadable += missing
+            while pending:
+                results, missing = pending.popleft().result()
+                store(results)
+                hashed += len(results)
+                unreadable += missing
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashed {hashed} images in {time.perf_counter() - started:.1f}s; {unreadable} files missing or unreadable.'
+        ))
@@ -0,0 +1,19 @@
+"""
+Resolve the free-text location of every listing through the local gazetteer.
+
+Usage:
+    python manage.py normalize_locations
+"""
+from django.core.management.base import BaseCommand
+
+from listings.gazetteer import normalize_locations
+
+
+class Command(BaseCommand):
+    help = 'Backfill Listing.city/district/latitude/longitude/geohash from the free-text location.'
+
+    def handle(self, *args, **options):
+        distinct, resolved = normalize_locations()
+        self.stdout.write(self.style.SUCCESS(
+            f'{distinct} distinct location(s) processed, {resolved} listing(s) resolved to a known place.'
+        ))
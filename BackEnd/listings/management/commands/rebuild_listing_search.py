@@ -0,0 +1,20 @@
+"""
+Rebuild the denormalized listing_search table from the approved listings.
+
+Usage:
+    python manage.py rebuild_listing_search --batch-size 5000
+"""
+from django.core.management.base import BaseCommand
+
+from listings.search import rebuild_listing_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the listing_search table used by the public list filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Listings per batch')
+
+    def handle(self, *args, **options):
+        total = rebuild_listing_search(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} approved listings.'))
@@ -0,0 +1,24 @@
+"""
+Recompute the market price statistics from the listings.
+
+The histograms are kept up to date on every listing write; run this after
+deploying them, after bulk imports that bypass the model signals, or to
+repair drift.
+
+Usage:
+    python manage.py rebuild_market_stats
+"""
+from django.core.management.base import BaseCommand
+
+from listings.market import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the market statistics histograms of approved and sold listings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Listings read per query')
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Counted {total} listings in the market statistics.'))
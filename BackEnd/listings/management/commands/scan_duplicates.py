@@ -0,0 +1,86 @@
+"""
+Compute MinHash fingerprints and LSH buckets for every listing.
+
+Signatures are computed by a pool of worker processes, one batch of listings
+at a time; the main process reads the batches and writes the results.
+
+Usage:
+    python manage.py scan_duplicates
+    python manage.py scan_duplicates --workers 8 --batch-size 5000
+    python manage.py scan_duplicates --start-method spawn  # workers started as on Windows and macOS
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from listings.duplicates import VALUES_FIELDS, compute, store
+from listings.models import Listing, ListingLSHBucket
+
+
+def compute_batch(rows):
+    return [compute(row) for row in rows]
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint all listings for near-duplicate detection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument(
+            '--start-method', choices=multiprocessing.get_all_start_methods(),
+            help='How worker processes are started (default: the platform default)',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Listings per batch')
+
+    def batches(self, batch_size):
+        last_id = 0
+        while True:
+            rows = list(
+                Listing.objects.filter(pk__gt=last_id).order_by('pk').values_list(*VALUES_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def store(self, results):
+        store(results)
+        return len(results)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        total = 0
+        # Workers started with spawn (the default on Windows and macOS) import this module
+        # afresh, and its model imports need the app registry loaded first
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup,
+            mp_context=multiprocessing.get_context(options['start_method']),
+        ) as pool:
+            # Keep a bounded number of batches in flight so memory does not grow with the catalog
+            pending = deque()
+            for rows in self.batches(batch_size):
+                pending.append(pool.submit(compute_batch, rows))
+                if len(pending) >= workers * 2:
+                    total += self.store(pending.popleft().result())
+            while pending:
+                total += self.store(pending.popleft().result())
+
+        shared = (
+            ListingLSHBucket.objects.values('band', 'bucket')
+            .annotate(total=Count('listing_id'))
+            .filter(total__gt=1)
+            .count()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Fingerprinted {total} listings in {time.perf_counter() - started:.1f}s; '
+            f'{shared} LSH buckets hold more than one listing.'
+        ))
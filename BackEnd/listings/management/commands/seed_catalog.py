@@ -0,0 +1,352 @@
+"""
+Generate a synthetic catalog (users, listings, details and images) for scale testing.
+
+Usage:
+    python manage.py seed_catalog --users 100000 --listings 1000000
+    python manage.py seed_catalog --listings 50000 --placeholder-files --seed 7
+"""
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from listings.models import Listing, ListingImage, CarDetails, PropertyDetails, ExchangeRate
+from listings.changes import snapshot
+from listings.gazetteer import normalize_locations
+from listings.market import rebuild as rebuild_market_stats
+from listings.pricing import recompute_price_base
+from listings.search import insert_missing_search_rows
+
+User = get_user_model()
+
+# Make -> (price tier in AED, models)
+CAR_MAKES = {
+    'Toyota': (90000, ['Land Cruiser', 'Camry', 'Corolla', 'Hilux', 'Prado', 'RAV4', 'Yaris']),
+    'Nissan': (80000, ['Patrol', 'Altima', 'Sunny', 'X-Trail', 'Pathfinder']),
+    'Hyundai': (60000, ['Elantra', 'Tucson', 'Accent', 'Santa Fe', 'Sonata']),
+    'Kia': (55000, ['Sportage', 'Cerato', 'Picanto', 'Sorento']),
+    'Mitsubishi': (55000, ['Pajero', 'Lancer', 'Outlander', 'L200']),
+    'Honda': (70000, ['Civic', 'Accord', 'CR-V', 'Pilot']),
+    'Ford': (75000, ['Mustang', 'Explorer', 'F-150', 'Edge']),
+    'Chevrolet': (70000, ['Tahoe', 'Malibu', 'Camaro', 'Silverado']),
+    'Mercedes-Benz': (220000, ['Classe S', 'Classe E', 'Classe C', 'G 63', 'GLE']),
+    'BMW': (200000, ['Série 5', 'Série 3', 'X5', 'X6', 'Série 7']),
+    'Audi': (180000, ['A6', 'Q7', 'A4', 'Q5', 'RS6']),
+    'Lexus': (190000, ['LX 600', 'ES 350', 'RX 350', 'GX 460']),
+    'Land Rover': (260000, ['Range Rover', 'Range Rover Sport', 'Defender', 'Discovery']),
+    'Porsche': (350000, ['Cayenne', '911 Carrera', 'Macan', 'Panamera']),
+}
+# Relative frequency of each make on the market
+CAR_MAKE_WEIGHTS = {
+    'Toyota': 24, 'Nissan': 16, 'Hyundai': 10, 'Kia': 8, 'Mitsubishi': 6, 'Honda': 6,
+    'Ford': 5, 'Chevrolet': 5, 'Mercedes-Benz': 6, 'BMW': 4, 'Audi': 3, 'Lexus': 4,
+    'Land Rover': 2, 'Porsche': 1,
+}
+FUEL_TYPES = [('Essence', 70), ('Diesel', 20), ('Hybride', 7), ('Électrique', 3)]
+TRANSMISSIONS = [('Automatique', 85), ('Manuelle', 15)]
+COLORS = [('Blanc', 35), ('Noir', 20), ('Gris', 15), ('Argent', 12), ('Bleu', 6), ('Rouge', 5), ('Beige', 4), ('Vert', 3)]
+ENGINE_SIZES = ['1.4L', '1.6L', '2.0L', '2.5L', '3.0L', '3.5L', '4.0L', '4.6L', '5.7L']
+
+# Property type -> (weight, bedrooms range, sqft per bedroom, price per sqft for sale)
+PROPERTY_TYPES = {
+    'apartment': (55, (0, 4), 650, 1400),
+    'villa': (20, (3, 7), 1100, 1300),
+    'house': (12, (2, 6), 900, 1000),
+    'land': (6, (0, 0), 0, 350),
+    'commercial': (7, (0, 0), 0, 1600),
+}
+AMENITIES = ['Piscine', 'Salle de sport', 'Parking', 'Balcon', 'Sécurité 24/7', 'Jardin', 'Vue sur mer', 'Ascenseur']
+
+LOCATIONS = [
+    ('Dubai Marina', 14), ('Downtown Dubai', 12), ('Business Bay', 9), ('Jumeirah Village Circle', 9),
+    ('Palm Jumeirah', 5), ('DIFC', 4), ('Deira', 8), ('Al Barsha', 7), ('Abu Dhabi', 12),
+    ('Al Reem Island', 4), ('Sharjah', 10), ('Ajman', 5), ('Al Ain', 4), ('Ras Al Khaimah', 3),
+]
+STATUSES = [('approved', 70), ('pending', 12), ('sold', 12), ('rejected', 6)]
+CURRENCIES = [('AED', 85), ('USD', 10), ('EUR', 5)]
+# Value of one unit in AED, stored as ExchangeRate rows when AED is the base currency
+SEED_RATES = {'USD': Decimal('3.6725'), 'EUR': Decimal('3.98')}
+
+PLACEHOLDER_COLORS = [
+    (200, 200, 200), (30, 30, 30), (180, 40, 40), (40, 80, 160),
+    (230, 220, 190), (90, 140, 90), (120, 120, 140), (210, 170, 60),
+]
+
+
+def _weighted(items):
+    """Split [(value, weight), ...] into parallel lists for Random.choices."""
+    values = [item[0] for item in items]
+    weights = [item[1] for item in items]
+    return values, weights
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at values."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = False
+                field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalog of users, listings, details and images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--listings', type=int, default=10000, help='Number of listings to create')
+        parser.add_argument('--max-images', type=int, default=4, help='Maximum images per listing')
+        parser.add_argument('--car-ratio', type=float, default=0.6, help='Share of car listings (0-1)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same catalog)')
+        parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many days')
+        parser.add_argument('--password', default='password123', help='Password shared by all seeded users')
+        parser.add_argument(
+            '--placeholder-files',
+            action='store_true',
+            help='Write tiny placeholder JPEGs to MEDIA_ROOT so image URLs resolve',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['listings'] > 0 and not User.objects.exists():
+            raise CommandError('At least one user is required to own the listings.')
+        if not 0 <= options['car_ratio'] <= 1:
+            raise CommandError('--car-ratio must be between 0 and 1.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        self.now = timezone.now()
+        self.days = max(1, options['days'])
+
+        image_paths = self._image_paths(options['placeholder_files'])
+
+        user_ids = self._create_users(options['users'], options['password'], options['seed'])
+        if not user_ids:
+            user_ids = list(User.objects.values_list('id', flat=True)[:10000])
+
+        self._create_listings(
+            options['listings'], user_ids, options['car_ratio'], options['max_images'], image_paths
+        )
+        if options['listings'] > 0:
+            self._rebuild_derived()
+
+    def _rebuild_derived(self):
+        """bulk_create skips the model signals, so rebuild the derived columns and tables in bulk."""
+        if settings.BASE_CURRENCY == 'AED':
+            for code, rate in SEED_RATES.items():
+                if not ExchangeRate.objects.filter(currency=code).exists():
+                    ExchangeRate.objects.bulk_create([ExchangeRate(currency=code, rate=rate)])
+        # The market statistics are rebuilt below
+        recompute_price_base(market_stats=False)
+        normalize_locations()
+
+        total = insert_missing_search_rows()
+        self.stdout.write(f'listing_search: {total} rows')
+
+        total = snapshot()
+        self.stdout.write(f'listing_changes: {total} rows')
+
+        total = rebuild_market_stats(batch_size=self.batch_size)
+        self.stdout.write(f'market statistics: {total} listings')
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def _image_paths(self, write_files):
+        """Return the storage names used by seeded ListingImage rows."""
+        names = [f'listing_images/seed/placeholder_{i}.jpg' for i in range(len(PLACEHOLDER_COLORS))]
+        if write_files:
+            from PIL import Image
+
+            directory = os.path.join(settings.MEDIA_ROOT, 'listing_images', 'seed')
+            os.makedirs(directory, exist_ok=True)
+            for name, color in zip(names, PLACEHOLDER_COLORS):
+                path = os.path.join(settings.MEDIA_ROOT, name)
+                if not os.path.exists(path):
+                    Image.new('RGB', (120, 120), color).save(path, 'JPEG', quality=60)
+        return names
+
+    def _create_users(self, count, password, seed):
+        if count < 1:
+            return []
+
+        # Hashing is the expensive part of creating users; every seeded account shares one hash.
+        password_hash = make_password(password)
+        phone_prefix = f'+99{seed % 1000:03d}'
+        first_phone = User.objects.filter(phone__startswith=phone_prefix).count()
+        first_id = self._next_id(User)
+        first_names = ['Ahmed', 'Mohamed', 'Fatima', 'Aicha', 'Omar', 'Sara', 'Youssef', 'Mariem', 'Ali', 'Khadija']
+        last_names = ['Ould Ahmed', 'Diallo', 'Benali', 'Haddad', 'Sy', 'El Amine', 'Kane', 'Mansour', 'Ba', 'Salem']
+
+        user_ids = []
+        with _manual_timestamps(User):
+            for start in range(0, count, self.batch_size):
+                batch = []
+                for offset in range(start, min(start + self.batch_size, count)):
+                    created = self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+                    batch.append(User(
+                        id=first_id + offset,
+                        phone=f'{phone_prefix}{first_phone + offset:010d}',
+                        full_name=f'{self.rng.choice(first_names)} {self.rng.choice(last_names)}',
+                        email=f'seed{first_phone + offset}@example.com' if self.rng.random() < 0.6 else None,
+                        password=password_hash,
+                        role='user',
+                        created_at=created,
+                        updated_at=created,
+                    ))
+                with transaction.atomic():
+                    User.objects.bulk_create(batch, batch_size=self.batch_size)
+                user_ids.extend(user.id for user in batch)
+                self.stdout.write(f'Users: {len(user_ids)}/{count}')
+
+        return user_ids
+
+    def _create_listings(self, count, user_ids, car_ratio, max_images, image_paths):
+        if count < 1:
+            return
+
+        makes = list(CAR_MAKE_WEIGHTS)
+        make_weights = [CAR_MAKE_WEIGHTS[make] for make in makes]
+        property_types = list(PROPERTY_TYPES)
+        property_weights = [PROPERTY_TYPES[kind][0] for kind in property_types]
+        locations, location_weights = _weighted(LOCATIONS)
+        statuses, status_weights = _weighted(STATUSES)
+        fuels, fuel_weights = _weighted(FUEL_TYPES)
+        transmissions, transmission_weights = _weighted(TRANSMISSIONS)
+        colors, color_weights = _weighted(COLORS)
+        currencies, currency_weights = _weighted(CURRENCIES)
+
+        listing_id = self._next_id(Listing)
+        image_id = self._next_id(ListingImage)
+        car_id = self._next_id(CarDetails)
+        property_id = self._next_id(PropertyDetails)
+        current_year = self.now.year
+        rng = self.rng
+        created_count = 0
+
+        with _manual_timestamps(Listing, ListingImage):
+            for start in range(0, count, self.batch_size):
+                listings, images, cars, properties = [], [], [], []
+
+                for _ in range(start, min(start + self.batch_size, count)):
+                    created = self.now - timedelta(seconds=rng.randrange(self.days * 86400))
+                    updated = min(self.now, created + timedelta(seconds=rng.randrange(30 * 86400)))
+                    purpose = 'sale' if rng.random() < 0.7 else 'rent'
+                    location = rng.choices(locations, location_weights)[0]
+
+                    if rng.random() < car_ratio:
+                        listing_type = 'car'
+                        make = rng.choices(makes, make_weights)[0]
+                        tier, models = CAR_MAKES[make]
+                        model = rng.choice(models)
+                        # Skew towards recent model years
+                        age = min(int(rng.expovariate(1 / 5)), 25)
+                        year = current_year - age
+                        mileage = max(0, int(rng.gauss(18000, 6000) * age)) if age else rng.randrange(0, 5000)
+                        price = tier * (0.85 ** age) * rng.uniform(0.8, 1.25)
+                        if purpose == 'rent':
+                            price = price / 300  # daily rate
+                        title = f'{make} {model} {year}'
+                        cars.append(CarDetails(
+                            id=car_id,
+                            listing_id=listing_id,
+                            make=make,
+                            model=model,
+                            year=year,
+                            mileage=mileage,
+                            fuel_type=rng.choices(fuels, fuel_weights)[0],
+                            transmission=rng.choices(transmissions, transmission_weights)[0],
+                            color=rng.choices(colors, color_weights)[0],
+                            engine_size=rng.choice(ENGINE_SIZES) if rng.random() < 0.8 else None,
+                        ))
+                        car_id += 1
+                    else:
+                        listing_type = 'property'
+                        property_type = rng.choices(property_types, property_weights)[0]
+                        _, (min_bed, max_bed), sqft_per_bedroom, price_per_sqft = PROPERTY_TYPES[property_type]
+                        bedrooms = rng.randint(min_bed, max_bed)
+                        if sqft_per_bedroom:
+                            area = max(350, bedrooms * sqft_per_bedroom * rng.uniform(0.8, 1.4) + 300)
+                        else:
+                            area = rng.uniform(800, 20000)
+                        price = area * price_per_sqft * rng.uniform(0.7, 1.4)
+                        if purpose == 'rent':
+                            price = price * 0.06  # yearly rent
+                        title = (
+                            f'{property_type.capitalize()} {bedrooms} ch. - {location}'
+                            if bedrooms else f'{property_type.capitalize()} - {location}'
+                        )
+                        properties.append(PropertyDetails(
+                            id=property_id,
+                            listing_id=listing_id,
+                            property_type=property_type,
+                            bedrooms=bedrooms,
+                            bathrooms=max(1, bedrooms + rng.randint(-1, 1)) if bedrooms else rng.randint(0, 2),
+                            area=Decimal(f'{area:.2f}'),
+                            floor=rng.randint(0, 60) if property_type == 'apartment' else None,
+                            furnished=rng.random() < 0.35,
+                            amenities=rng.sample(AMENITIES, rng.randint(0, 4)),
+                        ))
+                        property_id += 1
+
+                    # Prices are generated in AED, some sellers advertise in another currency
+                    currency = rng.choices(currencies, currency_weights)[0]
+                    if currency in SEED_RATES:
+                        price = price / float(SEED_RATES[currency])
+
+                    listings.append(Listing(
+                        id=listing_id,
+                        title=title,
+                        description=f'{title}. Annonce générée pour les tests de charge.',
+                        type=listing_type,
+                        purpose=purpose,
+                        price=Decimal(f'{max(price, 1):.2f}'),
+                        currency=currency,
+                        location=location,
+                        status=rng.choices(statuses, status_weights)[0],
+                        ad_type='star' if rng.random() < 0.05 else 'simple',
+                        user_id=rng.choice(user_ids),
+                        created_at=created,
+                        updated_at=updated,
+                    ))
+
+                    for order in range(rng.randint(0, max_images) if max_images > 0 else 0):
+                        images.append(ListingImage(
+                            id=image_id,
+                            listing_id=listing_id,
+                            image=rng.choice(image_paths),
+                            order=order,
+                            created_at=created,
+                        ))
+                        image_id += 1
+
+                    listing_id += 1
+
+                with transaction.atomic():
+                    Listing.objects.bulk_create(listings, batch_size=self.batch_size)
+                    CarDetails.objects.bulk_create(cars, batch_size=self.batch_size)
+                    PropertyDetails.objects.bulk_create(properties, batch_size=self.batch_size)
+                    ListingImage.objects.bulk_create(images, batch_size=self.batch_size)
+
+                created_count += len(listings)
+                self.stdout.write(f'Listings: {created_count}/{count}')
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded {created_count} listings.'))
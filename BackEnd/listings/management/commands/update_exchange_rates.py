@@ -0,0 +1,50 @@
+"""
+Set exchange rates and recompute the normalized listing prices in bulk.
+
+Usage:
+    python manage.py update_exchange_rates --rate USD=3.6725 --rate EUR=3.98
+    python manage.py update_exchange_rates            # recompute every currency
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from listings.models import ExchangeRate
+from listings.pricing import recompute_price_base
+
+
+class Command(BaseCommand):
+    help = 'Update exchange rates (CODE=RATE in the base currency) and recompute Listing.price_base.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', action='append', default=[], metavar='CODE=RATE', help='Rate to set')
+
+    def handle(self, *args, **options):
+        rates = {}
+        for item in options['rate']:
+            code, _, value = item.partition('=')
+            code = code.strip().upper()
+            try:
+                rate = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f'Invalid rate "{item}", expected CODE=RATE.')
+            if len(code) != 3 or rate <= 0:
+                raise CommandError(f'Invalid rate "{item}", expected CODE=RATE.')
+            rates[code] = rate
+
+        # Queryset writes skip the per-rate signal so listings are re-priced once, below
+        with transaction.atomic():
+            existing = set(ExchangeRate.objects.filter(currency__in=rates).values_list('currency', flat=True))
+            for code in existing:
+                ExchangeRate.objects.filter(currency=code).update(rate=rates[code], updated_at=timezone.now())
+            ExchangeRate.objects.bulk_create(
+                [ExchangeRate(currency=code, rate=rate) for code, rate in rates.items() if code not in existing]
+            )
+
+        updated = recompute_price_base()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(rates)} rate(s) updated, {updated} listing prices normalized to {settings.BASE_CURRENCY}.'
+        ))
@@ -0,0 +1,82 @@
+"""
+Warm the listing caches of a fresh deploy by replaying the most frequent recent searches.
+
+The searches are the list requests sampled by ``listings.query_sampler``.
+Each one goes through the full view in-process (no network), which fills
+the cached list pages and approximate counts and pulls the rows the
+searches read into the database's buffer pool. Run it after ``migrate`` and
+before the instance is put back behind the load balancer; with the default
+local-memory cache only the database is warmed, so point ``CACHE_BACKEND``
+at the shared cache the instance uses.
+
+Usage:
+    python manage.py warm_list_cache
+    python manage.py warm_list_cache --top 200 --days 3 --workers 16
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from listings.models import ListQuerySample
+
+# Samples older than this are deleted by every run
+KEEP_DAYS = 30
+
+
+def _replay(origin, params):
+    scheme, host = origin.split('://', 1)
+    try:
+        response = Client().get(f'/api/listings/?{params}', HTTP_HOST=host, secure=scheme == 'https')
+        return response.status_code
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Replay the most frequent recent listing searches to fill the caches before taking traffic.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=100, help='Number of searches to replay')
+        parser.add_argument('--days', type=int, default=3, help='Rank the searches sampled in the last N days')
+        parser.add_argument('--workers', type=int, default=8, help='Searches replayed in parallel')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        ListQuerySample.objects.filter(day__lt=today - timedelta(days=KEEP_DAYS)).delete()
+        searches = list(
+            ListQuerySample.objects.filter(day__gt=today - timedelta(days=max(1, options['days'])))
+            .values('origin', 'params')
+            .annotate(total=Sum('hits'))
+            .order_by('-total')[:max(0, options['top'])]
+        )
+        if not searches:
+            self.stdout.write('No sampled searches to replay.')
+            return
+        if 'locmem' in settings.CACHES['default']['BACKEND']:
+            self.stderr.write(self.style.WARNING(
+                'The cache is local to this process: only the database is warmed (set CACHE_BACKEND).'
+            ))
+
+        started = time.monotonic()
+        # The replayed requests must not count as searches themselves
+        with override_settings(LIST_SAMPLE_RATE=0):
+            with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+                statuses = list(executor.map(
+                    lambda search: _replay(search['origin'], search['params']), searches
+                ))
+
+        for search, status in zip(searches, statuses):
+            if status != 200:
+                self.stderr.write(f"HTTP {status}: {search['origin']}/api/listings/?{search['params']}")
+        warmed = statuses.count(200)
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed} of {len(searches)} searches in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,341 @@
+"""
+Market price statistics per car and property segment.
+
+Prices (in the base currency) of approved listings (asking prices) and of
+sold listings are counted in log-scale histograms, one per segment, in the
+``market_stat_buckets`` table. A segment is a prefix of
+``car|purpose|make|model|year`` or ``property|purpose|city|property_type|bedrooms``,
+and every listing is counted in each prefix of its own segment, so a lookup
+by make alone or by make, model and year reads the same kind of rows.
+Properties also get a histogram of the price per square foot.
+
+Histograms are updated incrementally by the ``listings.signals`` handlers
+whenever a listing enters, changes within or leaves the approved and sold
+states; ``listing_market_entries`` remembers what each listing contributed
+so that the old contribution can be taken back. Sold listings moved to the
+archive keep counting (``listings.archive`` drops their entries first), and
+``recompute_price_base`` moves the listings whose base price changed with
+``rebucket``. ``python manage.py rebuild_market_stats`` recomputes
+everything in bulk, archived sales included.
+
+Reading the statistics of a segment is one indexed query returning at most
+a few hundred bucket rows. Quartiles and median are interpolated within
+their bucket, so they are accurate to about half a bucket (2.5%).
+"""
+import math
+from collections import Counter
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ArchivedListing, Listing, ListingMarketEntry, MarketStatBucket
+from .search import normalize_text
+
+BUCKET_RATIO = 1.05
+LOG_RATIO = math.log(BUCKET_RATIO)
+COUNTED_STATUSES = ['approved', 'sold']
+SEGMENT_PARAMS = {
+    'car': ['purpose', 'make', 'model', 'year'],
+    'property': ['purpose', 'city', 'property_type', 'bedrooms'],
+}
+QUANTILES = {'p25': 0.25, 'median': 0.5, 'p75': 0.75}
+
+VALUES_FIELDS = [
+    'id', 'type', 'purpose', 'status', 'price_base', 'city',
+    'car_details__make', 'car_details__model', 'car_details__year',
+    'property_details__property_type', 'property_details__bedrooms', 'property_details__area',
+]
+
+
+def to_bucket(value):
+    return int(math.floor(math.log(float(value)) / LOG_RATIO))
+
+
+def bucket_bounds(bucket):
+    return BUCKET_RATIO ** bucket, BUCKET_RATIO ** (bucket + 1)
+
+
+def segment_key(listing_type, parts):
+    """Segment of ``parts`` (the SEGMENT_PARAMS values, in order), cut at the first missing one."""
+    key = [listing_type]
+    for part in parts:
+        part = normalize_text(part)
+        if part is None:
+            break
+        key.append(part.replace('|', ' ')[:50])
+    return '|'.join(key)
+
+
+def segment_prefixes(segment):
+    parts = segment.split('|')
+    return ['|'.join(parts[:length]) for length in range(2, len(parts) + 1)]
+
+
+def contribution(row):
+    """(status, segment, price bucket, ppsf bucket) of a VALUES_FIELDS row, or None when it is not counted."""
+    if row['status'] not in COUNTED_STATUSES or not row['price_base'] or row['price_base'] <= 0:
+        return None
+    if row['type'] == 'car':
+        parts = [row['purpose'], row['car_details__make'], row['car_details__model'], row['car_details__year']]
+    else:
+        parts = [
+            row['purpose'], row['city'], row['property_details__property_type'], row['property_details__bedrooms'],
+        ]
+    area = row['property_details__area']
+    ppsf_bucket = to_bucket(row['price_base'] / area) if area and area > 0 else None
+    return row['status'], segment_key(row['type'], parts), to_bucket(row['price_base']), ppsf_bucket
+
+
+def listing_row(listing):
+    """The VALUES_FIELDS row of a Listing instance with its details loaded."""
+    car = getattr(listing, 'car_details', None)
+    details = getattr(listing, 'property_details', None)
+    return {
+        'id': listing.pk, 'type': listing.type, 'purpose': listing.purpose, 'status': listing.status,
+        'price_base': listing.price_base, 'city': listing.city,
+        'car_details__make': car.make if car else None,
+        'car_details__model': car.model if car else None,
+        'car_details__year': car.year if car else None,
+        'property_details__property_type': details.property_type if details else None,
+        'property_details__bedrooms': details.bedrooms if details else None,
+        'property_details__area': details.area if details else None,
+    }
+
+
+def archived_row(archived):
+    """The VALUES_FIELDS row of an ArchivedListing, from the listing data it keeps."""
+    data = archived.data
+    listing = data.get('listing') or {}
+    car = data.get('car_details') or {}
+    details = data.get('property_details') or {}
+
+    def number(value):
+        return Decimal(str(value)) if value not in (None, '') else None
+
+    return {
+        'id': archived.pk, 'type': archived.type, 'purpose': archived.purpose, 'status': archived.status,
+        'price_base': number(listing.get('price_base')), 'city': listing.get('city'),
+        'car_details__make': car.get('make'),
+        'car_details__model': car.get('model'),
+        'car_details__year': car.get('year'),
+        'property_details__property_type': details.get('property_type'),
+        'property_details__bedrooms': details.get('bedrooms'),
+        'property_details__area': number(details.get('area')),
+    }
+
+
+def _bucket_counts(status, segment, price_bucket, ppsf_bucket):
+    for prefix in segment_prefixes(segment):
+        yield (prefix, status, 'price', price_bucket)
+        if ppsf_bucket is not None:
+            yield (prefix, status, 'ppsf', ppsf_bucket)
+
+
+def _add_bucket(segment, status, metric, bucket, delta):
+    rows = MarketStatBucket.objects.filter(segment=segment, status=status, metric=metric, bucket=bucket)
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            MarketStatBucket.objects.create(segment=segment, status=status, metric=metric, bucket=bucket, count=delta)
+    except IntegrityError:
+        # Created concurrently by another write
+        rows.update(count=F('count') + delta)
+
+
+def _add(counted, delta):
+    for key in _bucket_counts(*counted):
+        _add_bucket(*key, delta)
+
+
+def update_market_stats(listing_id, listing):
+    """Move the contribution of one listing (``listing`` with details loaded, None once deleted) to its new value."""
+    new = contribution(listing_row(listing)) if listing is not None else None
+    entry = ListingMarketEntry.objects.filter(listing_id=listing_id).first()
+    old = (entry.status, entry.segment, entry.price_bucket, entry.ppsf_bucket) if entry else None
+    if old == new:
+        return
+    with transaction.atomic():
+        if old:
+            _add(old, -1)
+        if new:
+            _add(new, 1)
+            status, segment, price_bucket, ppsf_bucket = new
+            ListingMarketEntry.objects.update_or_create(
+                listing_id=listing_id,
+                defaults={
+                    'status': status, 'segment': segment, 'price_bucket': price_bucket, 'ppsf_bucket': ppsf_bucket,
+                },
+            )
+        elif entry:
+            entry.delete()
+
+
+def rebucket(listings, batch_size=5000):
+    """
+    Move the contributions of ``listings`` (a Listing queryset) to their current
+    values with bulk writes, dropping those of listings that no longer count;
+    returns how many listings moved.
+    """
+    deltas = Counter()
+    moved = 0
+    queryset = listings.filter(status__in=COUNTED_STATUSES).order_by('pk').values(*VALUES_FIELDS)
+    last_id = 0
+    with transaction.atomic():
+        while True:
+            rows = list(queryset.filter(pk__gt=last_id)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            entries = ListingMarketEntry.objects.in_bulk([row['id'] for row in rows])
+            replaced, created = [], []
+            for row in rows:
+                new = contribution(row)
+                entry = entries.get(row['id'])
+                old = (entry.status, entry.segment, entry.price_bucket, entry.ppsf_bucket) if entry else None
+                if old == new:
+                    continue
+                moved += 1
+                replaced.append(row['id'])
+                if old:
+                    deltas.subtract(_bucket_counts(*old))
+                if new:
+                    deltas.update(_bucket_counts(*new))
+                    status, segment, price_bucket, ppsf_bucket = new
+                    created.append(ListingMarketEntry(
+                        listing_id=row['id'], status=status, segment=segment,
+                        price_bucket=price_bucket, ppsf_bucket=ppsf_bucket,
+                    ))
+            # Replacing rows is much cheaper than bulk_update's CASE expressions
+            ListingMarketEntry.objects.filter(listing_id__in=replaced).delete()
+            ListingMarketEntry.objects.bulk_create(created)
+
+        # Rejected or back to pending
+        gone = ListingMarketEntry.objects.filter(listing__in=listings.exclude(status__in=COUNTED_STATUSES).values('pk'))
+        for entry in gone:
+            deltas.subtract(_bucket_counts(entry.status, entry.segment, entry.price_bucket, entry.ppsf_bucket))
+            moved += 1
+        gone.delete()
+
+        _apply_deltas({key: delta for key, delta in deltas.items() if delta}, batch_size)
+    return moved
+
+
+def _apply_deltas(deltas, batch_size):
+    """Add {(segment, status, metric, bucket): delta} to the histograms, replacing the changed rows."""
+    counts = Counter(deltas)
+    replaced = []
+    segments = sorted({key[0] for key in deltas})
+    for start in range(0, len(segments), batch_size):
+        rows = (
+            MarketStatBucket.objects.select_for_update()
+            .filter(segment__in=segments[start:start + batch_size])
+            .values_list('pk', 'segment', 'status', 'metric', 'bucket', 'count')
+        )
+        for pk, *key, count in rows:
+            if tuple(key) in deltas:
+                counts[tuple(key)] += count
+                replaced.append(pk)
+    for start in range(0, len(replaced), batch_size):
+        MarketStatBucket.objects.filter(pk__in=replaced[start:start + batch_size]).delete()
+    MarketStatBucket.objects.bulk_create(
+        [
+            MarketStatBucket(segment=segment, status=status, metric=metric, bucket=bucket, count=count)
+            for (segment, status, metric, bucket), count in counts.items() if count > 0
+        ],
+        batch_size=batch_size,
+    )
+
+
+def rebuild(batch_size=5000):
+    """
+    Recompute every histogram and entry from the listings and the archived
+    sales; returns the number of listings counted.
+    """
+    counts = Counter()
+    entries = []
+    archived = 0
+    queryset = Listing.objects.filter(status__in=COUNTED_STATUSES).order_by('pk').values(*VALUES_FIELDS)
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        for row in rows:
+            counted = contribution(row)
+            if counted is None:
+                continue
+            counts.update(_bucket_counts(*counted))
+            status, segment, price_bucket, ppsf_bucket = counted
+            entries.append(ListingMarketEntry(
+                listing_id=row['id'], status=status, segment=segment,
+                price_bucket=price_bucket, ppsf_bucket=ppsf_bucket,
+            ))
+
+    # Archived sales have no listing (nor entry) left but keep counting in the sold histograms
+    sales = ArchivedListing.objects.filter(status='sold').order_by('pk').only('id', 'type', 'purpose', 'status', 'data')
+    last_id = 0
+    while True:
+        batch = list(sales.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        for listing in batch:
+            counted = contribution(archived_row(listing))
+            if counted is not None:
+                counts.update(_bucket_counts(*counted))
+                archived += 1
+
+    with transaction.atomic():
+        MarketStatBucket.objects.all().delete()
+        ListingMarketEntry.objects.all().delete()
+        MarketStatBucket.objects.bulk_create(
+            [
+                MarketStatBucket(segment=segment, status=status, metric=metric, bucket=bucket, count=count)
+                for (segment, status, metric, bucket), count in counts.items()
+            ],
+            batch_size=batch_size,
+        )
+        ListingMarketEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries) + archived
+
+
+def _summary(histogram):
+    """Count and interpolated quartiles of a {bucket: count} histogram."""
+    total = sum(histogram.values())
+    summary = {'count': total}
+    if not total:
+        return summary
+    buckets = sorted(histogram.items())
+    for name, quantile in QUANTILES.items():
+        # Rank of the quantile among the values, 0-based and fractional
+        rank = quantile * (total - 1)
+        seen = 0
+        for bucket, count in buckets:
+            if rank < seen + count:
+                low, high = bucket_bounds(bucket)
+                fraction = (rank - seen + 0.5) / count
+                summary[name] = round(low * (high / low) ** fraction, 2)
+                break
+            seen += count
+    return summary
+
+
+def segment_stats(segment):
+    """Asking and sold price statistics of one segment, from its histograms."""
+    histograms = {}
+    rows = (
+        MarketStatBucket.objects.filter(segment=segment, count__gt=0)
+        .values_list('status', 'metric', 'bucket', 'count')
+    )
+    for status, metric, bucket, count in rows:
+        histograms.setdefault((status, metric), {})[bucket] = count
+
+    stats = {}
+    for status, name in (('approved', 'asking'), ('sold', 'sold')):
+        stats[name] = _summary(histograms.get((status, 'price'), {}))
+        if segment.startswith('property|'):
+            stats[name]['price_per_sqft'] = _summary(histograms.get((status, 'ppsf'), {}))
+    return stats
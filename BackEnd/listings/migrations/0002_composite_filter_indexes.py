@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listings_status_c3eaec_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cardetails',
+            index=models.Index(fields=['make', 'model', 'year'], name='car_details_make_c17e01_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardetails',
+            index=models.Index(fields=['year'], name='car_details_year_cebcac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'created_at'], name='listings_status_805c52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'type', 'purpose', 'created_at'], name='listings_status_536ddf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'ad_type', 'created_at'], name='listings_status_055b94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'price'], name='listings_status_8d0fb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'type', 'purpose', 'price'], name='listings_status_63b220_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertydetails',
+            index=models.Index(fields=['property_type', 'bedrooms'], name='property_de_propert_7e7f13_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertydetails',
+            index=models.Index(fields=['bedrooms'], name='property_de_bedroom_b004d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertydetails',
+            index=models.Index(fields=['area'], name='property_de_area_223290_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_composite_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSearch',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_row', serialize=False, to='listings.listing')),
+                ('type', models.CharField(max_length=10)),
+                ('purpose', models.CharField(max_length=10)),
+                ('ad_type', models.CharField(max_length=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField()),
+                ('make', models.CharField(blank=True, max_length=100, null=True)),
+                ('model', models.CharField(blank=True, max_length=100, null=True)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('mileage', models.IntegerField(blank=True, null=True)),
+                ('property_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('bedrooms', models.IntegerField(blank=True, null=True)),
+                ('bathrooms', models.IntegerField(blank=True, null=True)),
+                ('area', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'db_table': 'listing_search',
+                'indexes': [models.Index(fields=['type', 'purpose', 'created_at'], name='listing_sea_type_551efd_idx'), models.Index(fields=['make', 'model', 'year'], name='listing_sea_make_0e0f08_idx'), models.Index(fields=['year'], name='listing_sea_year_7a9135_idx'), models.Index(fields=['property_type', 'bedrooms'], name='listing_sea_propert_e135cf_idx'), models.Index(fields=['bedrooms'], name='listing_sea_bedroom_6273ba_idx'), models.Index(fields=['bathrooms'], name='listing_sea_bathroo_955bf0_idx'), models.Index(fields=['area'], name='listing_sea_area_8d8eb5_idx'), models.Index(fields=['price'], name='listing_sea_price_2224fd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+def copy_price_to_price_base(apps, schema_editor):
+    # Every existing listing is treated as being in the base currency until
+    # rates are loaded with "python manage.py update_exchange_rates".
+    Listing = apps.get_model('listings', 'Listing')
+    Listing.objects.update(price_base=models.F('price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_listing_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, help_text='Value of one unit of this currency in the base currency', max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'exchange_rates',
+                'ordering': ['currency'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listings_status_8d0fb4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listings_status_63b220_idx',
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='price_base',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(copy_price_to_price_base, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='listingsearch',
+            name='listing_sea_price_2224fd_idx',
+        ),
+        migrations.RenameField(
+            model_name='listingsearch',
+            old_name='price',
+            new_name='price_base',
+        ),
+        migrations.AlterField(
+            model_name='listingsearch',
+            name='price_base',
+            field=models.DecimalField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'price_base'], name='listings_status_f528e4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'type', 'purpose', 'price_base'], name='listings_status_700532_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingsearch',
+            index=models.Index(fields=['price_base'], name='listing_sea_price_b_40b14f_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_structured_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingFingerprint',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='listings.listing')),
+                ('signature', models.BinaryField()),
+                ('content_hash', models.BigIntegerField(help_text='Hash of the fingerprinted text, to skip unchanged listings')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'listing_fingerprints',
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.SmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='listings.listing')),
+            ],
+            options={
+                'db_table': 'listing_lsh_buckets',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='listing_lsh_band_fee86c_idx')],
+            },
+        ),
+    ]
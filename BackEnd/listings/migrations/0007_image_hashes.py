@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_duplicate_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingImageHash',
+            fields=[
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='perceptual_hash', serialize=False, to='listings.listingimage')),
+                ('hash', models.BigIntegerField(help_text='64-bit difference hash, stored signed')),
+                ('chunk0', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('chunk1', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('chunk2', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('chunk3', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to='listings.listing')),
+            ],
+            options={
+                'db_table': 'listing_image_hashes',
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('listings', '0007_image_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='', max_length=100)),
+                ('params', models.JSONField(default=dict, help_text='Query parameters accepted by GET /api/listings/')),
+                ('is_active', models.BooleanField(default=True)),
+                ('type', models.CharField(blank=True, default='', max_length=10)),
+                ('purpose', models.CharField(blank=True, default='', max_length=10)),
+                ('ad_type', models.CharField(blank=True, default='', max_length=10)),
+                ('make', models.CharField(blank=True, default='', help_text='Normalized make prefix', max_length=100)),
+                ('property_type', models.CharField(blank=True, default='', max_length=20)),
+                ('city', models.CharField(blank=True, default='', max_length=100)),
+                ('district', models.CharField(blank=True, default='', max_length=100)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('min_year', models.IntegerField(blank=True, null=True)),
+                ('max_year', models.IntegerField(blank=True, null=True)),
+                ('min_bedrooms', models.IntegerField(blank=True, null=True)),
+                ('min_bathrooms', models.IntegerField(blank=True, null=True)),
+                ('min_area', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'saved_searches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='listings.listing')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='listings.savedsearch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_outbox',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['is_active', 'type', 'purpose'], name='saved_searc_is_acti_0fb3ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['make'], name='saved_searc_make_2eb373_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['sent_at', 'created_at'], name='notificatio_sent_at_2d7ddb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['user', 'created_at'], name='notificatio_user_id_532ea3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationoutbox',
+            constraint=models.UniqueConstraint(fields=('saved_search', 'listing'), name='unique_saved_search_listing'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+def snapshot_existing_listings(apps, schema_editor):
+    # One change per existing listing, so that a sync from token 0 returns the whole catalog
+    Listing = apps.get_model('listings', 'Listing')
+    ListingChange = apps.get_model('listings', 'ListingChange')
+    last_id = 0
+    while True:
+        ids = list(Listing.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:5000])
+        if not ids:
+            return
+        ListingChange.objects.bulk_create([ListingChange(listing_id=listing_id) for listing_id in ids])
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'listing_changes',
+                'indexes': [models.Index(fields=['listing_id', 'id'], name='listing_cha_listing_626010_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_listings, migrations.RunPython.noop),
+    ]
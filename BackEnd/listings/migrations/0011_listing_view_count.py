@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_archived_listings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['status', 'view_count'], name='listings_status_ab7dff_idx'),
+        ),
+    ]
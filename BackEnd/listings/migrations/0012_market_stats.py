@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listing_view_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingMarketEntry',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='market_entry', serialize=False, to='listings.listing')),
+                ('status', models.CharField(max_length=10)),
+                ('segment', models.CharField(help_text='Most detailed segment; every prefix is counted too', max_length=255)),
+                ('price_bucket', models.SmallIntegerField()),
+                ('ppsf_bucket', models.SmallIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'listing_market_entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='MarketStatBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(help_text='e.g. car|sale|toyota|camry|2020', max_length=255)),
+                ('status', models.CharField(help_text='approved (asking prices) or sold', max_length=10)),
+                ('metric', models.CharField(help_text='price or ppsf (price per square foot)', max_length=10)),
+                ('bucket', models.SmallIntegerField(help_text='Log-scale bucket of the value, see listings.market')),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'market_stat_buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='marketstatbucket',
+            constraint=models.UniqueConstraint(fields=('segment', 'status', 'metric', 'bucket'), name='unique_market_stat_bucket'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_market_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['title'], name='listings_title_21a072_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_title_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListQuerySample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(help_text='Scheme and host, e.g. https://api.example.com', max_length=100)),
+                ('params', models.CharField(help_text='Query string with the parameters sorted', max_length=400)),
+                ('day', models.DateField(db_index=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'list_query_samples',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='listquerysample',
+            constraint=models.UniqueConstraint(fields=('origin', 'params', 'day'), name='unique_list_query_sample'),
+        ),
+    ]
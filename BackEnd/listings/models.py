@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 
 User = get_user_model()
 
@@ -35,9 +36,19 @@ class Listing(models.Model):
     purpose = models.CharField(max_length=10, choices=LISTING_PURPOSE_CHOICES)
     price = models.DecimalField(max_digits=12, decimal_places=2)
     currency = models.CharField(max_length=3, default='AED')
+    # Price converted to settings.BASE_CURRENCY, used for price filters and ordering
+    price_base = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     location = models.CharField(max_length=255)
+    # Structured location resolved from `location` by the local gazetteer (listings.gazetteer)
+    city = models.CharField(max_length=100, blank=True, default='')
+    district = models.CharField(max_length=100, blank=True, default='')
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default='')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     ad_type = models.CharField(max_length=10, choices=AD_TYPE_CHOICES, default='simple')
+    # Incremented in batches by listings.view_counts, not on every view
+    view_count = models.PositiveIntegerField(default=0)
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listings')
     
@@ -49,15 +60,43 @@ class Listing(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['type', 'purpose']),
-            models.Index(fields=['status']),
             models.Index(fields=['ad_type']),
             models.Index(fields=['created_at']),
+            # Public lists always filter on status='approved' and sort by date or price
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'type', 'purpose', 'created_at']),
+            models.Index(fields=['status', 'ad_type', 'created_at']),
+            models.Index(fields=['status', 'price_base']),
+            models.Index(fields=['status', 'type', 'purpose', 'price_base']),
+            models.Index(fields=['status', 'city', 'district']),
+            models.Index(fields=['status', 'geohash']),
+            models.Index(fields=['status', 'view_count']),
+            # Admin prefix search
+            models.Index(fields=['title']),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.get_type_display()} ({self.get_purpose_display()})"
 
 
+class ExchangeRate(models.Model):
+    """Local exchange rate used to normalize listing prices to the base currency."""
+    
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(
+        max_digits=18, decimal_places=8,
+        help_text="Value of one unit of this currency in the base currency"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'exchange_rates'
+        ordering = ['currency']
+    
+    def __str__(self):
+        return f"{self.currency} = {self.rate}"
+
+
 class ListingImage(models.Model):
     """Images for listings."""
     
@@ -89,6 +128,10 @@ class CarDetails(models.Model):
     
     class Meta:
         db_table = 'car_details'
+        indexes = [
+            models.Index(fields=['make', 'model', 'year']),
+            models.Index(fields=['year']),
+        ]
     
     def __str__(self):
         return f"{self.make} {self.model} ({self.year})"
@@ -116,7 +159,278 @@ class PropertyDetails(models.Model):
     
     class Meta:
         db_table = 'property_details'
+        indexes = [
+            models.Index(fields=['property_type', 'bedrooms']),
+            models.Index(fields=['bedrooms']),
+            models.Index(fields=['area']),
+        ]
     
     def __str__(self):
         return f"{self.get_property_type_display()} - {self.bedrooms}BR/{self.bathrooms}BA"
 
+
+
+class ListingSearch(models.Model):
+    """Denormalized, single-table copy of the filterable attributes of approved listings."""
+    
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='search_row')
+    type = models.CharField(max_length=10)
+    purpose = models.CharField(max_length=10)
+    ad_type = models.CharField(max_length=10)
+    price_base = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField()
+    
+    # Car attributes (make/model are normalized, see listings.search.normalize_text)
+    make = models.CharField(max_length=100, blank=True, null=True)
+    model = models.CharField(max_length=100, blank=True, null=True)
+    year = models.IntegerField(blank=True, null=True)
+    mileage = models.IntegerField(blank=True, null=True)
+    
+    # Property attributes
+    property_type = models.CharField(max_length=20, blank=True, null=True)
+    bedrooms = models.IntegerField(blank=True, null=True)
+    bathrooms = models.IntegerField(blank=True, null=True)
+    area = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    
+    class Meta:
+        db_table = 'listing_search'
+        indexes = [
+            models.Index(fields=['type', 'purpose', 'created_at']),
+            models.Index(fields=['make', 'model', 'year']),
+            models.Index(fields=['year']),
+            models.Index(fields=['property_type', 'bedrooms']),
+            models.Index(fields=['bedrooms']),
+            models.Index(fields=['bathrooms']),
+            models.Index(fields=['area']),
+            models.Index(fields=['price_base']),
+        ]
+    
+    def __str__(self):
+        return f"Search row for listing {self.listing_id}"
+
+
+class ListingFingerprint(models.Model):
+    """MinHash signature of a listing's text and attributes, used for near-duplicate detection."""
+    
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    signature = models.BinaryField()
+    content_hash = models.BigIntegerField(help_text="Hash of the fingerprinted text, to skip unchanged listings")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'listing_fingerprints'
+    
+    def __str__(self):
+        return f"Fingerprint of listing {self.listing_id}"
+
+
+class ListingLSHBucket(models.Model):
+    """One LSH band of a listing's MinHash signature; listings sharing a bucket are duplicate candidates."""
+    
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band = models.SmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        db_table = 'listing_lsh_buckets'
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f"Band {self.band} bucket {self.bucket} of listing {self.listing_id}"
+
+
+class ListingImageHash(models.Model):
+    """Perceptual hash of a listing image, split into indexed chunks for Hamming-distance search."""
+    
+    image = models.OneToOneField(ListingImage, on_delete=models.CASCADE, primary_key=True, related_name='perceptual_hash')
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='image_hashes')
+    hash = models.BigIntegerField(help_text="64-bit difference hash, stored signed")
+    # 16-bit slices of the hash; null for images too flat to compare (blank or single-color)
+    chunk0 = models.IntegerField(blank=True, null=True, db_index=True)
+    chunk1 = models.IntegerField(blank=True, null=True, db_index=True)
+    chunk2 = models.IntegerField(blank=True, null=True, db_index=True)
+    chunk3 = models.IntegerField(blank=True, null=True, db_index=True)
+    
+    class Meta:
+        db_table = 'listing_image_hashes'
+    
+    def __str__(self):
+        return f"Hash of image {self.image_id}"
+
+
+class SavedSearch(models.Model):
+    """
+    A user's saved listings query, stored as the query parameters of the list endpoint.
+    
+    The parameters are also compiled into the predicate columns below
+    (listings.saved_searches) so that a newly approved listing can be matched
+    against every saved search with one indexed query.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True, default='')
+    params = models.JSONField(default=dict, help_text="Query parameters accepted by GET /api/listings/")
+    is_active = models.BooleanField(default=True)
+    
+    # Compiled predicates; blank or null means "any"
+    type = models.CharField(max_length=10, blank=True, default='')
+    purpose = models.CharField(max_length=10, blank=True, default='')
+    ad_type = models.CharField(max_length=10, blank=True, default='')
+    make = models.CharField(max_length=100, blank=True, default='', help_text="Normalized make prefix")
+    property_type = models.CharField(max_length=20, blank=True, default='')
+    city = models.CharField(max_length=100, blank=True, default='')
+    district = models.CharField(max_length=100, blank=True, default='')
+    min_price = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    max_price = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    min_year = models.IntegerField(blank=True, null=True)
+    max_year = models.IntegerField(blank=True, null=True)
+    min_bedrooms = models.IntegerField(blank=True, null=True)
+    min_bathrooms = models.IntegerField(blank=True, null=True)
+    min_area = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'saved_searches'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'type', 'purpose']),
+            models.Index(fields=['make']),
+        ]
+    
+    def __str__(self):
+        return self.name or f"Saved search {self.pk}"
+
+
+class NotificationOutbox(models.Model):
+    """Notification waiting to be delivered: a newly approved listing matching a saved search."""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='notifications')
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'notification_outbox'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'listing'], name='unique_saved_search_listing'),
+        ]
+        indexes = [
+            models.Index(fields=['sent_at', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Listing {self.listing_id} for saved search {self.saved_search_id}"
+
+
+class ListingChange(models.Model):
+    """
+    Append-only log of listing writes behind the change feed; the id is the sync token.
+    
+    ``listing_id`` is not a foreign key so that the row outlives a deleted listing
+    and serves as its tombstone.
+    """
+    
+    listing_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'listing_changes'
+        indexes = [
+            models.Index(fields=['listing_id', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Change {self.pk} of listing {self.listing_id}"
+
+
+class ArchivedListing(models.Model):
+    """
+    Old sold or rejected listing moved out of the listings table (listings.archive).
+    
+    The listing keeps its id. Its remaining columns, its details and its image
+    rows are kept in ``data``.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_listings')
+    title = models.CharField(max_length=255)
+    type = models.CharField(max_length=10, choices=Listing.LISTING_TYPE_CHOICES)
+    purpose = models.CharField(max_length=10, choices=Listing.LISTING_PURPOSE_CHOICES)
+    status = models.CharField(max_length=10, choices=Listing.STATUS_CHOICES)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3)
+    data = models.JSONField(encoder=DjangoJSONEncoder, help_text="Remaining listing fields, details and images")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_listings'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+
+class MarketStatBucket(models.Model):
+    """Number of listings of one market segment in one price bucket (listings.market)."""
+    
+    segment = models.CharField(max_length=255, help_text="e.g. car|sale|toyota|camry|2020")
+    status = models.CharField(max_length=10, help_text="approved (asking prices) or sold")
+    metric = models.CharField(max_length=10, help_text="price or ppsf (price per square foot)")
+    bucket = models.SmallIntegerField(help_text="Log-scale bucket of the value, see listings.market")
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'market_stat_buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['segment', 'status', 'metric', 'bucket'], name='unique_market_stat_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.segment} {self.status} {self.metric}[{self.bucket}] = {self.count}"
+
+
+class ListingMarketEntry(models.Model):
+    """What one approved or sold listing currently adds to the market statistics."""
+    
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='market_entry')
+    status = models.CharField(max_length=10)
+    segment = models.CharField(max_length=255, help_text="Most detailed segment; every prefix is counted too")
+    price_bucket = models.SmallIntegerField()
+    ppsf_bucket = models.SmallIntegerField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'listing_market_entries'
+    
+    def __str__(self):
+        return f"Market entry of listing {self.listing_id}"
+
+
+class ListQuerySample(models.Model):
+    """Sampled ``GET /api/listings/`` requests of one query string on one day (listings.query_sampler)."""
+    
+    origin = models.CharField(max_length=100, help_text="Scheme and host, e.g. https://api.example.com")
+    params = models.CharField(max_length=400, help_text="Query string with the parameters sorted")
+    day = models.DateField(db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'list_query_samples'
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'params', 'day'], name='unique_list_query_sample'),
+        ]
+    
+    def __str__(self):
+        return f"{self.origin}/api/listings/?{self.params} on {self.day}: {self.hits}"
@@ -0,0 +1,86 @@
+"""
+Currency normalization of listing prices.
+
+``Listing.price_base`` holds the price converted to ``settings.BASE_CURRENCY``
+with the rates stored in ``ExchangeRate``, so price filters and ordering can
+compare listings across currencies using a plain indexed column. A listing
+whose currency has no known rate keeps its raw price until a rate is added.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Round
+
+from .market import rebucket
+from .models import Listing, ListingSearch, ExchangeRate
+
+CENT = Decimal('0.01')
+
+
+def get_rate(currency):
+    """Return the rate of ``currency`` to the base currency, or None if unknown."""
+    currency = (currency or '').upper()
+    if currency == settings.BASE_CURRENCY:
+        return Decimal('1')
+    return ExchangeRate.objects.filter(currency=currency).values_list('rate', flat=True).first()
+
+
+def to_base(price, currency):
+    """Convert a price to the base currency (unchanged when the rate is unknown)."""
+    if price is None:
+        return None
+    rate = get_rate(currency)
+    if rate is None:
+        return Decimal(price)
+    return (Decimal(price) * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def recompute_price_base(currency=None, market_stats=True):
+    """
+    Recompute price_base in bulk with one UPDATE per currency.
+
+    Returns the number of listings updated. Used when a rate changes and after
+    bulk imports that bypass the model signals. The re-priced listings are
+    moved to their new market statistics buckets unless ``market_stats`` is
+    False (for callers that rebuild the statistics afterwards).
+    """
+    # Currency codes are matched case-insensitively, like get_rate() does
+    if currency:
+        currencies = [currency.upper()]
+    else:
+        currencies = sorted({
+            code.upper() for code in Listing.objects.order_by().values_list('currency', flat=True).distinct()
+        })
+
+    rates = dict(ExchangeRate.objects.filter(currency__in=currencies).values_list('currency', 'rate'))
+    rates[settings.BASE_CURRENCY] = Decimal('1')
+
+    updated = 0
+    with transaction.atomic():
+        for code in currencies:
+            rate = rates.get(code)
+            if rate is None or rate == 1:
+                expression = F('price')
+            else:
+                # Rounded to the cent in SQL, as to_base() does for single saves
+                expression = Round(
+                    F('price') * Value(rate, output_field=DecimalField(max_digits=18, decimal_places=8)), 2,
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
+                )
+            updated += Listing.objects.filter(currency__iexact=code).update(price_base=expression)
+
+        search_rows = ListingSearch.objects.all()
+        if currency:
+            search_rows = search_rows.filter(listing__currency__iexact=currency)
+        search_rows.update(
+            price_base=Subquery(Listing.objects.filter(pk=OuterRef('pk')).values('price_base')[:1])
+        )
+
+        if market_stats:
+            listings = Listing.objects.all()
+            if currency:
+                listings = listings.filter(currency__iexact=currency)
+            rebucket(listings)
+    return updated
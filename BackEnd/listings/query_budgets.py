@@ -0,0 +1,72 @@
+"""
+SQL query budgets for the listings endpoints.
+
+Each budget caps how many queries a request may run and how wide each query
+may be (number of JOINs). ``sizes`` lists the page sizes (or, for
+``my_listings``, the number of listings owned and, for ``batch``, the number
+of ids requested) the endpoint is exercised with; when ``constant`` is set the query count must be identical for every
+size, which is what catches N+1 regressions in the serializers.
+
+Checked by ``python manage.py check_query_budgets``.
+"""
+from .query_shapes import LIST_QUERY_SHAPES
+
+PAGE_SIZES = [1, 5, 20, 50]
+
+# Anonymous list: COUNT, page, images prefetch
+QUERY_BUDGETS = [
+    {
+        'name': f'list_{shape}',
+        'endpoint': 'list',
+        'params': params,
+        'max_queries': 3,
+        'max_joins': 4,
+        'sizes': PAGE_SIZES,
+        'constant': True,
+    }
+    for shape, params in LIST_QUERY_SHAPES.items()
+]
+
+QUERY_BUDGETS += [
+    # Staff list uses ListingSerializer (nested user and all images); +1 for the JWT user lookup
+    {
+        'name': 'list_staff',
+        'endpoint': 'list',
+        'params': {},
+        'auth': 'staff',
+        'max_queries': 4,
+        'max_joins': 3,
+        'sizes': PAGE_SIZES,
+        'constant': True,
+    },
+    {
+        'name': 'detail',
+        'endpoint': 'detail',
+        'params': {},
+        'max_queries': 2,
+        'max_joins': 3,
+        'sizes': [1],
+        'constant': True,
+    },
+    # JWT user lookup, listings, images prefetch
+    {
+        'name': 'my_listings',
+        'endpoint': 'my_listings',
+        'params': {},
+        'auth': 'owner',
+        'max_queries': 3,
+        'max_joins': 3,
+        'sizes': [1, 5, 25],
+        'constant': True,
+    },
+    # Listings, images prefetch
+    {
+        'name': 'batch',
+        'endpoint': 'batch',
+        'params': {},
+        'max_queries': 2,
+        'max_joins': 3,
+        'sizes': [1, 50, 200],
+        'constant': True,
+    },
+]
@@ -0,0 +1,96 @@
+"""
+Sampling of the public listing searches, for warming caches after a deploy.
+
+A fraction (``LIST_SAMPLE_RATE``) of the non-staff ``GET /api/listings/``
+requests is counted in process memory by origin (scheme and host) and
+normalized query string, and written to ``list_query_samples`` in one
+statement per query string every ``LIST_SAMPLE_FLUSH_SECONDS``, one row per
+day. Sampling costs a random draw per request and nothing else on the
+request path.
+
+``python manage.py warm_list_cache`` replays the most frequent recent query
+strings so that a freshly deployed instance finds its pages and counts
+already cached.
+"""
+import atexit
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ListQuerySample
+
+MAX_PARAMS_LENGTH = ListQuerySample._meta.get_field('params').max_length
+MAX_ORIGIN_LENGTH = ListQuerySample._meta.get_field('origin').max_length
+
+
+def normalized_params(query_params):
+    """Query string of ``query_params`` with the parameters sorted, so that equivalent searches match."""
+    return urlencode(sorted((name, value) for name, values in query_params.lists() for value in values))
+
+
+class QuerySampler:
+    """Sampled list requests per (origin, query string) not yet written to ``list_query_samples``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+
+    def record(self, request):
+        """Count a list request with probability LIST_SAMPLE_RATE, flushing once the interval has passed."""
+        if random.random() >= settings.LIST_SAMPLE_RATE:
+            return
+        origin = f'{request.scheme}://{request.get_host()}'
+        params = normalized_params(request.query_params)
+        if len(origin) > MAX_ORIGIN_LENGTH or len(params) > MAX_PARAMS_LENGTH:
+            return
+        with self.lock:
+            self.pending[(origin, params)] += 1
+            due = time.monotonic() - self.flushed_at >= settings.LIST_SAMPLE_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the pending samples to today's rows; returns the number of query strings written."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        day = timezone.localdate()
+        remaining = list(pending.items())
+        try:
+            while remaining:
+                (origin, params), hits = remaining[0]
+                rows = ListQuerySample.objects.filter(origin=origin, params=params, day=day)
+                if not rows.update(hits=F('hits') + hits):
+                    try:
+                        with transaction.atomic():
+                            ListQuerySample.objects.create(origin=origin, params=params, day=day, hits=hits)
+                    except IntegrityError:
+                        # Created concurrently by another process
+                        rows.update(hits=F('hits') + hits)
+                remaining.pop(0)
+        finally:
+            # Keep the samples that were not written for the next flush
+            if remaining:
+                with self.lock:
+                    for key, hits in remaining:
+                        self.pending[key] += hits
+        return len(pending)
+
+
+def _flush_at_exit():
+    try:
+        query_sampler.flush()
+    except DatabaseError:
+        pass
+
+
+query_sampler = QuerySampler()
+atexit.register(_flush_at_exit)
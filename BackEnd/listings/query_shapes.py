@@ -0,0 +1,33 @@
+"""
+Representative query-parameter sets for the listings list endpoint.
+
+These cover every filter supported by ``ListingViewSet.get_queryset`` and are
+shared by the benchmark, query-budget and index-advisor commands so that all
+of them exercise the same query shapes. Values match the distributions
+produced by ``seed_catalog``.
+"""
+
+LIST_QUERY_SHAPES = {
+    'default': {},
+    'type': {'type': 'car'},
+    'type_purpose': {'type': 'property', 'purpose': 'rent'},
+    'ad_type': {'ad_type': 'star'},
+    'price_range': {'min_price': '50000', 'max_price': '250000'},
+    'order_price': {'type': 'car', 'ordering': 'price'},
+    'order_price_desc': {'type': 'property', 'purpose': 'sale', 'ordering': '-price'},
+    'location': {'location': 'Dubai'},
+    'location_district': {'location': 'Dubai Marina', 'type': 'property'},
+    'near': {'near': '25.0805,55.1403', 'radius': '5'},
+    'car_make': {'type': 'car', 'make': 'Toyota'},
+    'car_years': {'type': 'car', 'min_year': '2018', 'max_year': '2023'},
+    'car_make_years_price': {
+        'type': 'car', 'purpose': 'sale', 'make': 'Nissan', 'min_year': '2015', 'max_price': '150000',
+    },
+    'property_type': {'type': 'property', 'property_type': 'apartment'},
+    'property_bedrooms': {'type': 'property', 'purpose': 'sale', 'min_bedrooms': '3'},
+    'property_full': {
+        'type': 'property', 'property_type': 'villa', 'min_bedrooms': '4',
+        'min_bathrooms': '3', 'min_area': '3000',
+    },
+    'search': {'search': 'Camry'},
+}
@@ -0,0 +1,52 @@
+"""
+Single-flight refreshes of the in-process indexes.
+
+An index is built in the first request that needs it, while the other
+threads wait for that build instead of running their own. Once it is built,
+a stale index keeps being served and one background thread rebuilds it, so
+no request pays for a rebuild after the first.
+"""
+import logging
+import threading
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightRefresh:
+    """Keeps an index with a ``built_at`` (monotonic time, None until built) at most ``max_age`` seconds old."""
+
+    def __init__(self, name):
+        self.name = name
+        self.build_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.refreshing = False
+
+    def ensure(self, index, max_age, build):
+        """Build ``index`` now if it never was, or start a background rebuild when it is older than ``max_age``."""
+        if index.built_at is None:
+            with self.build_lock:
+                if index.built_at is None:
+                    build()
+            return
+        if time.monotonic() - index.built_at <= max_age:
+            return
+        with self.state_lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._run, args=(build,), name=f'refresh-{self.name}', daemon=True).start()
+
+    def _run(self, build):
+        try:
+            with self.build_lock:
+                build()
+        except Exception:
+            # The current index keeps being served; the next request past max_age retries
+            logger.exception('Refreshing the %s index failed', self.name)
+        finally:
+            connection.close()
+            with self.state_lock:
+                self.refreshing = False
@@ -0,0 +1,150 @@
+"""
+In-process rotation of star listings for the featured placements.
+
+Ordering star listings by ``-created_at`` gives the newest advertisers all
+the exposure, and querying them on every home page view costs a query per
+view. Instead time is divided into slots of ``STAR_ROTATION_SLOT_SECONDS``
+and each slot shows the next window of a shuffled sequence of the approved
+star listings, so every star listing is shown exactly once per pass over the
+sequence whatever its age. The ids of the star listings are kept in process
+memory and the cards of the current slot are serialized once per slot and
+origin (scheme and host, which the absolute image URLs carry), so a home
+page view runs no query.
+
+Each pass is a fresh shuffle that spreads every advertiser evenly along the
+sequence instead of letting one fill a slot. Advertisers with the same number
+of star listings form a group whose listings are dealt round-robin in a
+random advertiser order, and each group is spaced evenly over the whole pass
+from a random offset, so that an advertiser's listings never follow each
+other unless it owns more than half of them. Shuffles
+are seeded with the pass number and the star listing ids, so every process
+serves the same listings in the same slot.
+
+The star listing ids are reloaded on first use after a star listing is
+approved, edited, sold, rejected, downgraded or deleted (see
+``listings.signals``), and every ``STAR_ROTATION_REFRESH_SECONDS`` to pick up
+writes handled by other processes. Either reload happens once however many
+requests arrive, the periodic one in a background thread (see
+``listings.refresh``).
+"""
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Listing
+from .refresh import SingleFlightRefresh
+from .serializers import ListingListSerializer
+
+MAX_FEATURED_LIMIT = 50
+
+
+def spread_shuffle(listings, seed):
+    """Listing ids of ``listings`` ((id, user_id) pairs) in a seeded random order spreading each advertiser evenly."""
+    rng = random.Random(seed)
+    by_user = defaultdict(list)
+    for listing_id, user_id in sorted(listings):
+        by_user[user_id].append(listing_id)
+    by_count = defaultdict(list)
+    for user_id in sorted(by_user):
+        by_count[len(by_user[user_id])].append(user_id)
+
+    keyed = []
+    for count in sorted(by_count):
+        users = by_count[count]
+        rng.shuffle(users)
+        for user_id in users:
+            rng.shuffle(by_user[user_id])
+        # Round-robin: consecutive listings of one advertiser are len(users) places apart in the group
+        group = [by_user[user_id][rank] for rank in range(count) for user_id in users]
+        offset = rng.random()
+        for position, listing_id in enumerate(group):
+            keyed.append(((position + offset) / len(group), listing_id))
+    keyed.sort()
+    return [listing_id for _, listing_id in keyed]
+
+
+class StarRotation:
+    """Ids of the approved star listings, their shuffle per pass and the cards of the current slot."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.pairs = []
+        self.members = set()
+        self.seed = 0
+        self.passes = {}  # pass number -> shuffled ids
+        self.cards = {}  # (slot, limit, origin) -> serialized listings
+
+    def build(self):
+        """Load the (id, advertiser) pairs of the approved star listings."""
+        pairs = list(
+            Listing.objects.filter(status='approved', ad_type='star').order_by('pk').values_list('pk', 'user_id')
+        )
+        with self.lock:
+            self.pairs, self.members = pairs, {pk for pk, _ in pairs}
+            self.seed = zlib.crc32(','.join(str(pk) for pk, _ in pairs).encode())
+            self.passes, self.cards = {}, {}
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        _refresh.ensure(self, getattr(settings, 'STAR_ROTATION_REFRESH_SECONDS', 300), self.build)
+
+    def invalidate(self):
+        self.built_at = None
+
+    def update(self, listing_id, listing):
+        """Reload on next use if the change of a listing affects the rotation (``listing`` is None unless approved)."""
+        if (listing is not None and listing.ad_type == 'star') or listing_id in self.members:
+            self.invalidate()
+
+    def _sequence(self, number):
+        sequence = self.passes.get(number)
+        if sequence is None:
+            sequence = spread_shuffle(self.pairs, f'{number}:{self.seed}')
+            # A window spans at most two passes
+            self.passes = {key: value for key, value in self.passes.items() if key >= number - 1}
+            self.passes[number] = sequence
+        return sequence
+
+    def window(self, slot, limit):
+        """Ids shown in ``slot`` by a placement of ``limit`` listings."""
+        with self.lock:
+            total = len(self.pairs)
+            count = min(limit, total)
+            position = slot * count
+            return [
+                self._sequence(index // total)[index % total] for index in range(position, position + count)
+            ]
+
+    def slot(self, request, limit=10):
+        """Return (cards, slot number, seconds until the next slot) for the current time slot."""
+        self.ensure_fresh()
+        slot_seconds = getattr(settings, 'STAR_ROTATION_SLOT_SECONDS', 300)
+        now = time.time()
+        slot = int(now // slot_seconds)
+        expires_in = int(slot_seconds - now % slot_seconds)
+
+        key = (slot, limit, f'{request.scheme}://{request.get_host()}')
+        cards = self.cards.get(key)
+        if cards is None:
+            ids = self.window(slot, limit)
+            listings = (
+                Listing.objects.filter(pk__in=ids)
+                .select_related('car_details', 'property_details')
+                .prefetch_related('images')
+                .in_bulk()
+            )
+            ordered = [listings[pk] for pk in ids if pk in listings]
+            cards = ListingListSerializer(ordered, many=True, context={'request': request}).data
+            with self.lock:
+                self.cards = {key: value for key, value in self.cards.items() if key[0] == slot}
+                self.cards[key] = cards
+        return cards, slot, expires_in
+
+
+_refresh = SingleFlightRefresh('star-rotation')
+star_rotation = StarRotation()
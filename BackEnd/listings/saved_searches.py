@@ -0,0 +1,198 @@
+"""
+Saved searches and the incremental matcher that feeds the notification outbox.
+
+A saved search keeps the query parameters of ``GET /api/listings/``. When it
+is saved, the parameters are compiled into predicate columns on the
+``saved_searches`` row (type, purpose, make prefix, city, price bounds, ...)
+following the same rules as ``ListingViewSet.get_queryset``.
+
+When a listing becomes approved, ``match_listing`` turns the listing into a
+single indexed query over those columns ("which searches accept this
+listing?") instead of re-running every saved query. The few predicates that
+cannot be expressed as columns (free-text location, ``search`` terms and
+radius) are checked in Python on the candidates. Matches are queued in
+``notification_outbox`` for delivery.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from . import gazetteer
+from .geo import haversine_km
+from .models import NotificationOutbox, SavedSearch
+from .search import normalize_text
+
+# Query parameters of the list endpoint that a saved search may contain
+SEARCH_PARAMS = [
+    'type', 'purpose', 'ad_type', 'min_price', 'max_price', 'location', 'near', 'radius',
+    'make', 'min_year', 'max_year', 'property_type', 'min_bedrooms', 'min_bathrooms', 'min_area', 'search',
+]
+
+# Numeric bounds with the limits the list endpoint validates them against: (name, minimum, maximum, type)
+NUMERIC_PARAMS = [
+    ('min_price', 0, None, Decimal),
+    ('max_price', 0, None, Decimal),
+    ('min_year', 1900, 2100, int),
+    ('max_year', 1900, 2100, int),
+    ('min_bedrooms', 0, 50, int),
+    ('min_bathrooms', 0, 50, int),
+    ('min_area', 0, None, Decimal),
+]
+
+
+def _sanitize(value, max_length=255):
+    if not value:
+        return None
+    sanitized = re.sub(r'[<>"\';\\]', '', str(value))[:max_length].strip()
+    return sanitized or None
+
+
+def _number(value, min_val=None, max_val=None, cast=Decimal):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    if not number.is_finite():
+        return None
+    if (min_val is not None and number < min_val) or (max_val is not None and number > max_val):
+        return None
+    return int(number) if cast is int else number.quantize(Decimal('0.01'))
+
+
+def parse_near(params):
+    """Return (latitude, longitude, radius_km) of a radius search, or None."""
+    near = params.get('near')
+    if not near:
+        return None
+    try:
+        lat_text, lon_text = str(near).split(',', 1)
+    except ValueError:
+        return None
+    latitude = _number(lat_text, -90, 90)
+    longitude = _number(lon_text, -180, 180)
+    radius = _number(params.get('radius', 10), Decimal('0.1'), 500)
+    if latitude is None or longitude is None or radius is None:
+        return None
+    return float(latitude), float(longitude), float(radius)
+
+
+def compile_search(saved):
+    """Fill the predicate columns of a SavedSearch from its params; invalid values are ignored like the API does."""
+    params = saved.params or {}
+    saved.type = params.get('type') if params.get('type') in ('car', 'property') else ''
+    saved.purpose = params.get('purpose') if params.get('purpose') in ('sale', 'rent') else ''
+    saved.ad_type = params.get('ad_type') if params.get('ad_type') in ('simple', 'star') else ''
+    saved.make = normalize_text(_sanitize(params.get('make'), 100)) or ''
+    saved.property_type = _sanitize(params.get('property_type'), 50) or ''
+
+    saved.city = ''
+    saved.district = ''
+    location = _sanitize(params.get('location'))
+    place = gazetteer.lookup(location) if location else None
+    if place is not None:
+        saved.city = place[0]
+        saved.district = place[1] or ''
+
+    for name, min_val, max_val, cast in NUMERIC_PARAMS:
+        value = params.get(name)
+        setattr(saved, name, _number(value, min_val, max_val, cast) if value not in (None, '') else None)
+
+
+def _any_or_equal(column, value):
+    return Q(**{column: ''}) | Q(**{column: value}) if value else Q(**{column: ''})
+
+
+def _at_most(column, value):
+    """Searches with no ``column`` bound, or a lower bound the listing's value reaches."""
+    if value is None:
+        return Q(**{f'{column}__isnull': True})
+    return Q(**{f'{column}__isnull': True}) | Q(**{f'{column}__lte': value})
+
+
+def _at_least(column, value):
+    """Searches with no ``column`` bound, or an upper bound the listing's value stays under."""
+    if value is None:
+        return Q(**{f'{column}__isnull': True})
+    return Q(**{f'{column}__isnull': True}) | Q(**{f'{column}__gte': value})
+
+
+def candidate_searches(listing):
+    """Active saved searches whose compiled predicates accept an approved listing (details loaded)."""
+    car = getattr(listing, 'car_details', None)
+    details = getattr(listing, 'property_details', None)
+
+    make = normalize_text(car.make) if car else None
+    makes = Q(make='')
+    if make:
+        # The API matches makes by prefix, so any prefix of this make is a matching search
+        makes |= Q(make__in=[make[:length] for length in range(1, len(make) + 1)])
+
+    places = Q(city='')
+    if listing.city:
+        places |= Q(city=listing.city, district='')
+        if listing.district:
+            # Like the API, a search for "Jumeirah" also matches Palm Jumeirah
+            places |= Q(city=listing.city, district__in=gazetteer.districts_containing(listing.city, listing.district))
+
+    return (
+        SavedSearch.objects.filter(is_active=True)
+        .exclude(user_id=listing.user_id)
+        .filter(
+            _any_or_equal('type', listing.type),
+            _any_or_equal('purpose', listing.purpose),
+            _any_or_equal('ad_type', listing.ad_type),
+            _any_or_equal('property_type', details.property_type if details else None),
+            makes,
+            places,
+            _at_most('min_price', listing.price_base),
+            _at_least('max_price', listing.price_base),
+            _at_most('min_year', car.year if car else None),
+            _at_least('max_year', car.year if car else None),
+            _at_most('min_bedrooms', details.bedrooms if details else None),
+            _at_most('min_bathrooms', details.bathrooms if details else None),
+            _at_most('min_area', details.area if details else None),
+        )
+    )
+
+
+def residual_match(saved, listing):
+    """Check the parameters that have no predicate column."""
+    params = saved.params or {}
+
+    location = _sanitize(params.get('location'))
+    if location and gazetteer.lookup(location) is None and location.lower() not in listing.location.lower():
+        return False
+
+    near = parse_near(params)
+    if near is not None:
+        latitude, longitude, radius = near
+        if listing.latitude is None or listing.longitude is None:
+            return False
+        if haversine_km(latitude, longitude, listing.latitude, listing.longitude) > radius:
+            return False
+
+    # Same semantics as the SearchFilter: every term must appear in one of the search fields
+    text = ' '.join([listing.title, listing.description, listing.location]).lower()
+    for term in str(params.get('search') or '').replace(',', ' ').split():
+        if term.lower() not in text:
+            return False
+
+    return True
+
+
+def match_listing(listing):
+    """Queue a notification for every saved search that a newly approved listing satisfies."""
+    return match_listings([listing])
+
+
+def match_listings(listings):
+    """match_listing for several listings: one candidate query each, one INSERT into the outbox."""
+    notifications = [
+        NotificationOutbox(user_id=saved.user_id, saved_search=saved, listing=listing)
+        for listing in listings
+        for saved in candidate_searches(listing)
+        if residual_match(saved, listing)
+    ]
+    NotificationOutbox.objects.bulk_create(notifications, ignore_conflicts=True)
+    return len(notifications)
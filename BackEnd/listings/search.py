@@ -0,0 +1,163 @@
+"""
+Maintenance of the denormalized ``listing_search`` table.
+
+Every approved listing has one ``ListingSearch`` row holding all of its
+filterable attributes, so the public list filters run against a single
+indexed table instead of joining ``car_details`` / ``property_details``.
+Rows are kept in sync on every write by the signal handlers in
+``listings.signals`` and can be rebuilt from scratch with
+``python manage.py rebuild_listing_search``.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .bulk import insert_select
+from .models import Listing, ListingSearch
+
+
+def normalize_text(value):
+    """Lowercase and collapse separators so 'Mercedes-Benz' matches 'mercedes benz'."""
+    if not value:
+        return None
+    return ' '.join(str(value).lower().replace('-', ' ').split()) or None
+
+
+def prefix_range(prefix):
+    """
+    Return (lower, upper) bounds matching every normalized value starting with ``prefix``.
+    
+    A range comparison uses the index on every backend, unlike LIKE 'x%' which
+    SQLite only optimizes for case-sensitive LIKE.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_search_row(listing):
+    """Return an unsaved ListingSearch row for an approved listing."""
+    row = ListingSearch(
+        listing_id=listing.pk,
+        type=listing.type,
+        purpose=listing.purpose,
+        ad_type=listing.ad_type,
+        price_base=listing.price_base,
+        created_at=listing.created_at,
+    )
+
+    car = getattr(listing, 'car_details', None)
+    if car is not None:
+        row.make = normalize_text(car.make)
+        row.model = normalize_text(car.model)
+        row.year = car.year
+        row.mileage = car.mileage
+
+    details = getattr(listing, 'property_details', None)
+    if details is not None:
+        row.property_type = details.property_type
+        row.bedrooms = details.bedrooms
+        row.bathrooms = details.bathrooms
+        row.area = details.area
+
+    return row
+
+
+def sync_listing_search(listing_id):
+    """
+    Insert, update or remove the search row of one listing.
+    
+    Returns ``(previous, listing, added)``: the normalized (make, model) the
+    row had before, or None; the approved listing with its details loaded, or
+    None when the listing is not (or no longer) approved; and whether the row
+    was just created, i.e. the listing has just become approved.
+    """
+    previous = ListingSearch.objects.filter(listing_id=listing_id).values_list('make', 'model').first()
+    existed = previous is not None
+    if previous == (None, None):
+        previous = None
+
+    listing = (
+        Listing.objects.select_related('car_details', 'property_details')
+        .filter(pk=listing_id, status='approved')
+        .first()
+    )
+    if listing is None:
+        ListingSearch.objects.filter(listing_id=listing_id).delete()
+        return previous, None, False
+
+    build_search_row(listing).save()
+    return previous, listing, not existed
+
+
+def upsert_search_rows(listings):
+    """Insert or update the rows of approved listings (details loaded) with one statement."""
+    fields = [field.name for field in ListingSearch._meta.concrete_fields if not field.primary_key]
+    ListingSearch.objects.bulk_create(
+        [build_search_row(listing) for listing in listings],
+        update_conflicts=True, unique_fields=['listing'], update_fields=fields,
+    )
+
+
+def rebuild_listing_search(batch_size=5000):
+    """
+    Rewrite the whole table from the approved listings, in primary-key batches.
+
+    Each batch is upserted in its own transaction and the rows of listings that
+    are no longer approved are deleted at the end, so public searches keep
+    finding every listing while the rebuild runs.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Listing.objects.select_related('car_details', 'property_details')
+            .filter(status='approved', pk__gt=last_id)
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            break
+        with transaction.atomic():
+            upsert_search_rows(batch)
+        total += len(batch)
+        last_id = batch[-1].pk
+
+    ListingSearch.objects.exclude(listing_id__in=Listing.objects.filter(status='approved').values('pk')).delete()
+    return total
+
+
+def insert_missing_search_rows():
+    """
+    Add the rows of the approved listings that have none, e.g. after a
+    ``bulk_create`` of listings, which skips the signals; returns the number
+    of rows added.
+
+    The rows are copied with one INSERT ... SELECT, then make and model are
+    normalized with one UPDATE per distinct stored value, which is much
+    faster than rebuild_listing_search for a large number of new listings.
+    """
+    with transaction.atomic():
+        total = insert_select(
+            ListingSearch,
+            Listing.objects.filter(status='approved', search_row__isnull=True).order_by('pk'),
+            {
+                'listing': F('pk'),
+                'type': F('type'),
+                'purpose': F('purpose'),
+                'ad_type': F('ad_type'),
+                'price_base': F('price_base'),
+                'created_at': F('created_at'),
+                'make': F('car_details__make'),
+                'model': F('car_details__model'),
+                'year': F('car_details__year'),
+                'mileage': F('car_details__mileage'),
+                'property_type': F('property_details__property_type'),
+                'bedrooms': F('property_details__bedrooms'),
+                'bathrooms': F('property_details__bathrooms'),
+                'area': F('property_details__area'),
+            },
+        )
+        for field in ('make', 'model'):
+            values = ListingSearch.objects.exclude(**{f'{field}__isnull': True}).order_by()
+            for value in list(values.values_list(field, flat=True).distinct()):
+                normalized = normalize_text(value)
+                if normalized != value:
+                    ListingSearch.objects.filter(**{field: value}).update(**{field: normalized})
+    return total
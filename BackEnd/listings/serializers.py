@@ -2,7 +2,8 @@ from rest_framework import serializers
 from django.core.exceptions import ValidationError
 from django.core.files.images import get_image_dimensions
 from accounts.serializers import UserSerializer
-from .models import Listing, ListingImage, CarDetails, PropertyDetails
+from .models import Listing, ListingImage, CarDetails, PropertyDetails, SavedSearch, NotificationOutbox
+from .saved_searches import SEARCH_PARAMS
 import os
 
 
@@ -54,11 +55,14 @@ class ListingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Listing
         fields = [
-            'id', 'title', 'description', 'type', 'purpose', 'price', 'currency',
-            'location', 'status', 'ad_type', 'user', 'user_id', 'images',
-            'car_details', 'property_details', 'created_at', 'updated_at'
+            'id', 'title', 'description', 'type', 'purpose', 'price', 'currency', 'price_base',
+            'location', 'city', 'district', 'latitude', 'longitude', 'status', 'ad_type', 'user',
+            'user_id', 'images', 'car_details', 'property_details', 'view_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'price_base', 'city', 'district', 'latitude', 'longitude', 'view_count',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'status', 'created_at', 'updated_at']
 
 
 class ListingCreateSerializer(serializers.ModelSerializer):
@@ -202,9 +206,9 @@ class ListingListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Listing
         fields = [
-            'id', 'title', 'description', 'type', 'purpose', 'price', 'currency',
-            'location', 'status', 'ad_type', 'first_image', 'car_details',
-            'property_details', 'created_at'
+            'id', 'title', 'description', 'type', 'purpose', 'price', 'currency', 'price_base',
+            'location', 'city', 'district', 'status', 'ad_type', 'first_image', 'car_details',
+            'property_details', 'view_count', 'created_at'
         ]
     
     def get_first_image(self, obj):
@@ -217,3 +221,60 @@ class ListingListSerializer(serializers.ModelSerializer):
             return first_image.image.url
         return None
 
+
+class ListingFieldsetSerializer(ListingSerializer):
+    """ListingSerializer plus ``first_image``, trimmed to a sparse fieldset (see listings.fieldsets)."""
+    
+    first_image = serializers.SerializerMethodField()
+    
+    class Meta(ListingSerializer.Meta):
+        fields = ListingSerializer.Meta.fields + ['first_image']
+    
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            for name in set(self.fields) - set(fieldset):
+                self.fields.pop(name)
+    
+    get_first_image = ListingListSerializer.get_first_image
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """Serializer for saved searches."""
+    
+    MAX_SAVED_SEARCHES = 50
+    
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'params', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_params(self, value):
+        """Keep only the list endpoint filters (paging and ordering are not part of a search)."""
+        if not isinstance(value, dict):
+            raise ValidationError("params must be an object of query parameters.")
+        params = {
+            key: str(item)[:255]
+            for key, item in value.items()
+            if key in SEARCH_PARAMS and item not in (None, '')
+        }
+        if not params:
+            raise ValidationError(f"params must contain at least one of: {', '.join(SEARCH_PARAMS)}")
+        return params
+    
+    def validate(self, attrs):
+        request = self.context.get('request')
+        if self.instance is None and request is not None:
+            if SavedSearch.objects.filter(user=request.user).count() >= self.MAX_SAVED_SEARCHES:
+                raise ValidationError(f"You can save at most {self.MAX_SAVED_SEARCHES} searches.")
+        return attrs
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Serializer for queued saved-search notifications."""
+    
+    listing = ListingListSerializer(read_only=True)
+    
+    class Meta:
+        model = NotificationOutbox
+        fields = ['id', 'saved_search', 'listing', 'created_at', 'sent_at']
@@ -0,0 +1,167 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .autocomplete import make_model_index
+from .changes import record_change, record_changes
+from .duplicates import fingerprint_listing
+from .gazetteer import apply_place
+from .image_hashes import hash_image
+from .market import rebucket, update_market_stats
+from .models import Listing, ListingImage, ListingSearch, CarDetails, PropertyDetails, ExchangeRate, SavedSearch
+from .pricing import to_base, recompute_price_base
+from .rotation import star_rotation
+from .saved_searches import compile_search, match_listing, match_listings
+from .search import sync_listing_search, upsert_search_rows
+from .similarity import similarity_index
+
+
+def _match_on_commit(listing_id):
+    """Match an approved listing against the saved searches once its transaction commits, details included."""
+    def match():
+        listing = (
+            Listing.objects.select_related('car_details', 'property_details')
+            .filter(pk=listing_id, status='approved')
+            .first()
+        )
+        if listing is not None:
+            match_listing(listing)
+    transaction.on_commit(match)
+
+
+def sync_derived(listing_id, details_created=False):
+    """Refresh the derived rows and in-process indexes of one listing, notify saved searches and log the change."""
+    previous, listing, approved_now = sync_listing_search(listing_id)
+    car = getattr(listing, 'car_details', None) if listing is not None else None
+    make_model_index.update(previous, (car.make, car.model) if car is not None else None)
+    star_rotation.update(listing_id, listing)
+    if listing is not None:
+        similarity_index.upsert(listing)
+        # A listing created approved gets its details in a later save; matching again then
+        # only adds the searches that needed them (the outbox skips those already queued)
+        if approved_now or details_created:
+            _match_on_commit(listing_id)
+    else:
+        similarity_index.remove(listing_id)
+        # Pending, rejected and sold listings are fingerprinted too, to catch reposts
+        listing = Listing.objects.select_related('car_details', 'property_details').filter(pk=listing_id).first()
+    if listing is not None:
+        fingerprint_listing(listing)
+    update_market_stats(listing_id, listing)
+    record_change(listing_id)
+
+
+def sync_status_change(listing_ids, batch_size=1000):
+    """
+    sync_derived for listings whose status was changed with one UPDATE.
+
+    The search rows, market statistics and change log of each batch are
+    written with set-based statements; only matching the newly approved
+    listings against the saved searches takes one query per listing. Titles,
+    details and prices did not change, so the fingerprints are left alone.
+    """
+    for start in range(0, len(listing_ids), batch_size):
+        ids = listing_ids[start:start + batch_size]
+        previous = {
+            listing_id: (make, model) if (make, model) != (None, None) else None
+            for listing_id, make, model in ListingSearch.objects.filter(listing_id__in=ids).values_list(
+                'listing_id', 'make', 'model',
+            )
+        }
+        approved = list(
+            Listing.objects.select_related('car_details', 'property_details').filter(pk__in=ids, status='approved')
+        )
+        with transaction.atomic():
+            ListingSearch.objects.filter(listing_id__in=ids).exclude(listing__status='approved').delete()
+            upsert_search_rows(approved)
+            rebucket(Listing.objects.filter(pk__in=ids))
+            record_changes(ids)
+
+        approved_ids = set()
+        for listing in approved:
+            approved_ids.add(listing.pk)
+            car = getattr(listing, 'car_details', None)
+            make_model_index.update(previous.get(listing.pk), (car.make, car.model) if car is not None else None)
+            star_rotation.update(listing.pk, listing)
+            similarity_index.upsert(listing)
+        for listing_id in ids:
+            if listing_id not in approved_ids:
+                make_model_index.update(previous.get(listing_id), None)
+                star_rotation.update(listing_id, None)
+                similarity_index.remove(listing_id)
+        match_listings([listing for listing in approved if listing.pk not in previous])
+
+
+@receiver(pre_save, sender=Listing)
+def listing_pre_save(sender, instance, raw=False, **kwargs):
+    """Normalize the price and the location before every write."""
+    if raw:
+        return
+    instance.price_base = to_base(instance.price, instance.currency)
+    apply_place(instance)
+
+
+@receiver(post_save, sender=Listing)
+def listing_saved(sender, instance, raw=False, **kwargs):
+    """Keep derived tables in sync when a listing is written."""
+    if raw:
+        return
+    sync_derived(instance.pk)
+
+
+@receiver(pre_delete, sender=Listing)
+def listing_deleted(sender, instance, **kwargs):
+    """The search row goes with the listing (cascade); drop it from the in-process indexes."""
+    previous = ListingSearch.objects.filter(listing_id=instance.pk).values_list('make', 'model').first()
+    if previous and previous != (None, None):
+        make_model_index.update(previous, None)
+    similarity_index.remove(instance.pk)
+    star_rotation.update(instance.pk, None)
+    update_market_stats(instance.pk, None)
+
+
+@receiver(post_delete, sender=Listing)
+def listing_removed(sender, instance, **kwargs):
+    """Leave a tombstone in the change feed."""
+    record_change(instance.pk, deleted=True)
+
+
+@receiver(post_save, sender=CarDetails)
+@receiver(post_save, sender=PropertyDetails)
+def details_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Details feed the search row of their listing."""
+    if raw:
+        return
+    sync_derived(instance.listing_id, details_created=created)
+
+
+@receiver(post_save, sender=ListingImage)
+def image_saved(sender, instance, raw=False, **kwargs):
+    """Hash uploaded photos so reuse across listings can be detected, and log the change."""
+    if raw:
+        return
+    hash_image(instance)
+    record_change(instance.listing_id)
+
+
+@receiver(post_delete, sender=ListingImage)
+def image_deleted(sender, instance, **kwargs):
+    """Removing a photo changes the listing in the change feed."""
+    record_change(instance.listing_id)
+
+
+@receiver(pre_save, sender=SavedSearch)
+def saved_search_pre_save(sender, instance, raw=False, **kwargs):
+    """Compile the saved query parameters into the predicate columns used by the matcher."""
+    if raw:
+        return
+    compile_search(instance)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def exchange_rate_changed(sender, instance, raw=False, **kwargs):
+    """Re-price every listing in the affected currency."""
+    if raw:
+        return
+    recompute_price_base(instance.currency)
@@ -0,0 +1,301 @@
+"""
+"Similar listings" recommendations from a precomputed feature matrix.
+
+Every approved listing is described by NumPy arrays: its type/purpose, a
+location bucket, standardized numeric features (price, year, mileage,
+bedrooms, area) and a hashed TF-IDF vector of its title. Finding neighbours
+scores the whole matrix with a few vectorized operations, in fixed-size
+batches, and keeps the top k with ``argpartition``.
+
+The matrix lives in process memory. It is built on first use (or loaded from
+``SIMILARITY_INDEX_PATH`` when ``python manage.py build_similarity_index`` has
+written it), updated incrementally by the ``listings.signals`` handlers when
+a listing is approved, changed, sold or rejected, and rebuilt every
+``SIMILARITY_REFRESH_SECONDS`` to pick up writes handled by other processes.
+Rebuilds run in one background thread while the current matrix keeps being
+served (see ``listings.refresh``). Updates made while a build or load is
+under way are applied to the current matrix and replayed on the new one.
+"""
+import math
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+from .models import Listing
+from .refresh import SingleFlightRefresh
+
+TEXT_DIMENSIONS = 64
+LOCATION_BUCKETS = 4096
+BATCH_ROWS = 65536
+NUMERIC_FIELDS = ['price', 'year', 'mileage', 'bedrooms', 'area']
+
+# Relative weight of each block in the final score
+TEXT_WEIGHT = 2.0
+PURPOSE_WEIGHT = 1.0
+LOCATION_WEIGHT = 0.5
+NUMERIC_WEIGHT = 0.5
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+VALUES_FIELDS = [
+    'id', 'type', 'purpose', 'price_base', 'city', 'location', 'title',
+    'car_details__year', 'car_details__mileage', 'property_details__bedrooms', 'property_details__area',
+]
+
+
+def _bucket(token, size):
+    """Stable hash bucket (Python's hash() differs between processes)."""
+    return zlib.crc32(token.encode('utf-8')) % size
+
+
+def _tokens(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def _row_from_listing(listing):
+    """Build the same tuple a VALUES_FIELDS query returns from a Listing instance."""
+    car = getattr(listing, 'car_details', None)
+    details = getattr(listing, 'property_details', None)
+    return (
+        listing.pk, listing.type, listing.purpose, listing.price_base, listing.city, listing.location,
+        listing.title,
+        car.year if car else None, car.mileage if car else None,
+        details.bedrooms if details else None, details.area if details else None,
+    )
+
+
+def _raw_numeric(row):
+    price, year, mileage, bedrooms, area = row[3], row[7], row[8], row[9], row[10]
+    return [
+        math.log1p(float(price)) if price is not None else np.nan,
+        float(year) if year is not None else np.nan,
+        math.log1p(float(mileage)) if mileage is not None else np.nan,
+        float(bedrooms) if bedrooms is not None else np.nan,
+        math.log1p(float(area)) if area is not None else np.nan,
+    ]
+
+
+class SimilarityIndex:
+    """Feature arrays of approved listings plus the statistics used to vectorize new ones."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built_at = None
+        # listing id -> listing (upserted) or None (removed) while a build or load is under way
+        self.journal = None
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.kind = np.zeros(capacity, dtype=np.int8)  # 0 car, 1 property
+        self.purpose = np.zeros(capacity, dtype=np.int8)  # 0 sale, 1 rent
+        self.location = np.zeros(capacity, dtype=np.int16)
+        self.numeric = np.zeros((capacity, len(NUMERIC_FIELDS)), dtype=np.float32)
+        self.text = np.zeros((capacity, TEXT_DIMENSIONS), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.positions = {}
+        self.idf = np.ones(TEXT_DIMENSIONS, dtype=np.float32)
+        self.mean = np.zeros(len(NUMERIC_FIELDS), dtype=np.float32)
+        self.std = np.ones(len(NUMERIC_FIELDS), dtype=np.float32)
+
+    # Vectorization
+
+    def _text_counts(self, title):
+        counts = np.zeros(TEXT_DIMENSIONS, dtype=np.float32)
+        for token in _tokens(title):
+            counts[_bucket(token, TEXT_DIMENSIONS)] += 1
+        return counts
+
+    def _text_vector(self, counts):
+        vector = counts * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _numeric_vector(self, raw):
+        values = (np.asarray(raw, dtype=np.float32) - self.mean) / self.std
+        return np.nan_to_num(values, nan=0.0)
+
+    def _vectorize(self, row):
+        location = row[4] or row[5] or ''
+        return (
+            0 if row[1] == 'car' else 1,
+            0 if row[2] == 'sale' else 1,
+            _bucket(location.lower(), LOCATION_BUCKETS),
+            self._numeric_vector(_raw_numeric(row)),
+            self._text_vector(self._text_counts(row[6])),
+        )
+
+    # Building and persistence
+
+    def build(self):
+        """Compute the whole matrix from the approved listings."""
+        self._start_journal()
+        queryset = Listing.objects.filter(status='approved').order_by().values_list(*VALUES_FIELDS)
+        rows = list(queryset.iterator(chunk_size=10000))
+
+        fresh = SimilarityIndex()
+        fresh._reset(len(rows))
+        if rows:
+            counts = np.stack([fresh._text_counts(row[6]) for row in rows])
+            document_frequency = (counts > 0).sum(axis=0)
+            fresh.idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+            raw = np.asarray([_raw_numeric(row) for row in rows], dtype=np.float32)
+            with np.errstate(invalid='ignore'):
+                fresh.mean = np.nan_to_num(np.nanmean(raw, axis=0)).astype(np.float32)
+                std = np.nan_to_num(np.nanstd(raw, axis=0))
+            fresh.std = np.where(std > 0, std, 1).astype(np.float32)
+
+            text = counts * fresh.idf
+            norms = np.linalg.norm(text, axis=1, keepdims=True)
+            fresh.text[:] = np.divide(text, norms, out=np.zeros_like(text), where=norms > 0)
+            fresh.numeric[:] = np.nan_to_num((raw - fresh.mean) / fresh.std, nan=0.0)
+            fresh.ids[:] = [row[0] for row in rows]
+            fresh.kind[:] = [0 if row[1] == 'car' else 1 for row in rows]
+            fresh.purpose[:] = [0 if row[2] == 'sale' else 1 for row in rows]
+            fresh.location[:] = [_bucket((row[4] or row[5] or '').lower(), LOCATION_BUCKETS) for row in rows]
+            fresh.active[:] = True
+            fresh.size = len(rows)
+            fresh.positions = {int(listing_id): index for index, listing_id in enumerate(fresh.ids)}
+
+        self._adopt(fresh)
+
+    def _start_journal(self):
+        with self.lock:
+            self.journal = {}
+
+    def _adopt(self, other):
+        with self.lock:
+            self.__dict__.update({
+                key: value for key, value in other.__dict__.items() if key not in ('lock', 'journal')
+            })
+            self.built_at = time.monotonic()
+            # The new matrix was read before these updates
+            journal, self.journal = self.journal or {}, None
+            for listing_id, listing in journal.items():
+                if listing is None:
+                    self.remove(listing_id)
+                else:
+                    self.upsert(listing)
+
+    def save(self, path):
+        with self.lock:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            np.savez(
+                path,
+                ids=self.ids[:self.size], kind=self.kind[:self.size], purpose=self.purpose[:self.size],
+                location=self.location[:self.size], numeric=self.numeric[:self.size],
+                text=self.text[:self.size], active=self.active[:self.size],
+                idf=self.idf, mean=self.mean, std=self.std,
+            )
+
+    def load(self, path):
+        self._start_journal()
+        with np.load(path) as data:
+            fresh = SimilarityIndex()
+            fresh._reset(0)
+            for name in ('ids', 'kind', 'purpose', 'location', 'numeric', 'text', 'active', 'idf', 'mean', 'std'):
+                setattr(fresh, name, data[name].copy())
+        fresh.size = len(fresh.ids)
+        fresh.positions = {int(listing_id): index for index, listing_id in enumerate(fresh.ids)}
+        self._adopt(fresh)
+
+    def ensure_fresh(self):
+        """Build the index on first use; past SIMILARITY_REFRESH_SECONDS rebuild it in the background."""
+        _refresh.ensure(self, getattr(settings, 'SIMILARITY_REFRESH_SECONDS', 900), self._refresh)
+
+    def _refresh(self):
+        refresh = getattr(settings, 'SIMILARITY_REFRESH_SECONDS', 900)
+        path = getattr(settings, 'SIMILARITY_INDEX_PATH', None)
+        if self.built_at is None and path and os.path.exists(path) and time.time() - os.path.getmtime(path) <= refresh:
+            self.load(path)
+        else:
+            self.build()
+
+    # Incremental updates
+
+    def _grow(self):
+        capacity = max(16, len(self.ids) * 2)
+        for name in ('ids', 'kind', 'purpose', 'location', 'numeric', 'text', 'active'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def upsert(self, listing):
+        """Add or refresh an approved listing (details must be loaded)."""
+        with self.lock:
+            if self.journal is not None:
+                self.journal[listing.pk] = listing
+            if self.built_at is None:
+                return
+            kind, purpose, location, numeric, text = self._vectorize(_row_from_listing(listing))
+            index = self.positions.get(listing.pk)
+            if index is None:
+                if self.size == len(self.ids):
+                    self._grow()
+                index = self.size
+                self.size += 1
+                self.positions[listing.pk] = index
+                self.ids[index] = listing.pk
+            self.kind[index], self.purpose[index], self.location[index] = kind, purpose, location
+            self.numeric[index], self.text[index] = numeric, text
+            self.active[index] = True
+
+    def remove(self, listing_id):
+        """Stop recommending a listing (sold, rejected, deleted)."""
+        with self.lock:
+            if self.journal is not None:
+                self.journal[listing_id] = None
+            index = self.positions.get(listing_id)
+            if index is not None:
+                self.active[index] = False
+
+    # Queries
+
+    def similar(self, listing, limit=6):
+        """Return the ids of the ``limit`` listings most similar to ``listing``, best first."""
+        self.ensure_fresh()
+        with self.lock:
+            index = self.positions.get(listing.pk)
+            if index is not None:
+                kind, purpose, location = self.kind[index], self.purpose[index], self.location[index]
+                numeric, text = self.numeric[index], self.text[index]
+            else:
+                kind, purpose, location, numeric, text = self._vectorize(_row_from_listing(listing))
+
+            best_scores = np.empty(0, dtype=np.float32)
+            best_ids = np.empty(0, dtype=np.int64)
+            for start in range(0, self.size, BATCH_ROWS):
+                stop = min(start + BATCH_ROWS, self.size)
+                candidates = self.active[start:stop] & (self.kind[start:stop] == kind)
+                if index is not None and start <= index < stop:
+                    candidates[index - start] = False
+                if not candidates.any():
+                    continue
+
+                scores = TEXT_WEIGHT * (self.text[start:stop] @ text)
+                scores += PURPOSE_WEIGHT * (self.purpose[start:stop] == purpose)
+                scores += LOCATION_WEIGHT * (self.location[start:stop] == location)
+                scores -= NUMERIC_WEIGHT * np.mean((self.numeric[start:stop] - numeric) ** 2, axis=1)
+                scores = np.where(candidates, scores, -np.inf)
+
+                keep = min(limit, int(candidates.sum()))
+                top = np.argpartition(-scores, keep - 1)[:keep]
+                best_scores = np.concatenate([best_scores, scores[top]])
+                best_ids = np.concatenate([best_ids, self.ids[start:stop][top]])
+
+            order = np.argsort(-best_scores, kind='stable')[:limit]
+            return [int(listing_id) for listing_id in best_ids[order]]
+
+
+_refresh = SingleFlightRefresh('similarity')
+similarity_index = SimilarityIndex()
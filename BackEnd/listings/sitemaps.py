@@ -0,0 +1,143 @@
+"""
+Sharded XML sitemaps of approved listings, written as static files.
+
+Listings are assigned to shards by id range (``SHARD_SIZE`` ids per shard),
+so a shard never holds more than the 50,000 URLs a sitemap may contain and a
+listing always stays in the same file. ``sitemap.xml`` is the index of the
+non-empty shards.
+
+A build is incremental: the change log behind the change feed
+(``listings.changes``) tells which listings were written, approved, sold,
+rejected or deleted since the token of the previous run, and only the
+shards containing them are rewritten. The state of the last run is kept in
+``state.json`` next to the files. Run ``python manage.py build_sitemaps``
+periodically and let the web server serve ``SITEMAP_ROOT`` at ``SITEMAP_URL``.
+"""
+import gzip
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Max
+
+from .changes import settled_changes
+from .models import Listing, ListingChange
+
+SHARD_SIZE = 50000
+STATE_FILE = 'state.json'
+INDEX_FILE = 'sitemap.xml'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def shard_name(shard):
+    return f'sitemap-listings-{shard:05d}.xml.gz'
+
+
+def listing_url(listing_id):
+    return f"{settings.SITE_URL.rstrip('/')}/listing/{listing_id}"
+
+
+def _write_atomic(path, write):
+    temporary = f'{path}.tmp'
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def write_shard(root, shard):
+    """Rewrite one shard from the database; returns its lastmod, or None when it has no approved listing."""
+    rows = (
+        Listing.objects.filter(status='approved', pk__gt=shard * SHARD_SIZE, pk__lte=(shard + 1) * SHARD_SIZE)
+        .order_by('pk')
+        .values_list('pk', 'updated_at')
+    )
+    path = os.path.join(root, shard_name(shard))
+    lastmod = None
+
+    def write(temporary):
+        nonlocal lastmod
+        with gzip.open(temporary, 'wt', encoding='utf-8') as output:
+            output.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+            for listing_id, updated_at in rows.iterator(chunk_size=5000):
+                output.write(
+                    f'<url><loc>{escape(listing_url(listing_id))}</loc>'
+                    f'<lastmod>{updated_at.isoformat()}</lastmod></url>\n'
+                )
+                lastmod = max(lastmod, updated_at) if lastmod else updated_at
+            output.write('</urlset>\n')
+
+    _write_atomic(path, write)
+    if lastmod is None:
+        os.remove(path)
+    return lastmod
+
+
+def write_index(root, shards):
+    base = settings.SITE_URL.rstrip('/') + settings.SITEMAP_URL
+
+    def write(temporary):
+        with open(temporary, 'w', encoding='utf-8') as output:
+            output.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n')
+            for shard in sorted(shards, key=int):
+                output.write(
+                    f'<sitemap><loc>{escape(base + shard_name(int(shard)))}</loc>'
+                    f'<lastmod>{shards[shard]}</lastmod></sitemap>\n'
+                )
+            output.write('</sitemapindex>\n')
+
+    _write_atomic(os.path.join(root, INDEX_FILE), write)
+
+
+def load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE), encoding='utf-8') as state:
+            return json.load(state)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(root, state):
+    def write(temporary):
+        with open(temporary, 'w', encoding='utf-8') as output:
+            json.dump(state, output)
+
+    _write_atomic(os.path.join(root, STATE_FILE), write)
+
+
+def build_sitemaps(root=None, full=False):
+    """
+    Bring the sitemap files up to date and return (shards rewritten, shards in the index).
+
+    Without a previous state (or with ``full``) every shard is rewritten.
+    """
+    root = root or settings.SITEMAP_ROOT
+    os.makedirs(root, exist_ok=True)
+    state = None if full else load_state(root)
+
+    # Read the token first: changes committed while shards are written are picked up next run.
+    # Like the change feed, stop short of the newest changes in case an older transaction commits late.
+    token = settled_changes().aggregate(latest=Max('id'))['latest'] or 0
+    if state is None:
+        max_id = Listing.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        dirty = set(range((max_id - 1) // SHARD_SIZE + 1)) if max_id else set()
+        shards = {}
+    else:
+        changed = (
+            ListingChange.objects.filter(id__gt=state['token'], id__lte=token)
+            .values_list('listing_id', flat=True)
+            .distinct()
+        )
+        dirty = {(listing_id - 1) // SHARD_SIZE for listing_id in changed.iterator(chunk_size=10000)}
+        shards = state['shards']
+
+    for shard in sorted(dirty):
+        lastmod = write_shard(root, shard)
+        if lastmod is None:
+            shards.pop(str(shard), None)
+        else:
+            shards[str(shard)] = lastmod.isoformat()
+
+    if dirty or state is None:
+        write_index(root, shards)
+    save_state(root, {'token': token, 'shards': shards})
+    return len(dirty), len(shards)
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from listings.admin import ListingAdmin
+from listings.models import CarDetails, Listing, ListingChange, ListingMarketEntry, ListingSearch, SavedSearch
+
+User = get_user_model()
+
+
+class BulkStatusActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(phone='+991000000001', password='x', full_name='Seller')
+        buyer = User.objects.create_user(phone='+991000000002', password='x', full_name='Buyer')
+        SavedSearch.objects.create(user=buyer, params={'type': 'car', 'make': 'toyota'})
+
+    def create_listings(self, count):
+        ids = []
+        for index in range(count):
+            listing = Listing.objects.create(
+                user=self.seller, title=f'Toyota Camry {index}', description='Camry', type='car', purpose='sale',
+                price=50000 + index, currency='AED', location='Dubai Marina', status='pending',
+            )
+            CarDetails.objects.create(listing=listing, make='Toyota', model='Camry', year=2020, mileage=1000)
+            ids.append(listing.pk)
+        return ids
+
+    def run_action(self, action, ids):
+        model_admin = ListingAdmin(Listing, site)
+        request = RequestFactory().post('/admin/listings/listing/')
+        with mock.patch.object(model_admin, 'message_user'):
+            with CaptureQueriesContext(connection) as captured:
+                getattr(model_admin, action)(request, Listing.objects.filter(pk__in=ids))
+        return len(captured.captured_queries)
+
+    def test_derived_rows_follow_the_bulk_action(self):
+        ids = self.create_listings(3)
+        changes = ListingChange.objects.count()
+        self.run_action('approve_selected', ids)
+        self.assertEqual(ListingSearch.objects.filter(listing_id__in=ids).count(), 3)
+        self.assertEqual(ListingMarketEntry.objects.filter(listing_id__in=ids, status='approved').count(), 3)
+        self.assertEqual(ListingChange.objects.count() - changes, 3)
+
+        self.run_action('reject_selected', ids)
+        self.assertFalse(ListingSearch.objects.filter(listing_id__in=ids).exists())
+        self.assertFalse(ListingMarketEntry.objects.filter(listing_id__in=ids).exists())
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        # An untouched approved and sold listing keep the histogram rows of the segment in every run
+        approved, sold = self.create_listings(2)
+        self.run_action('approve_selected', [approved, sold])
+        self.run_action('mark_sold_selected', [sold])
+        few, many = self.create_listings(3), self.create_listings(30)
+
+        # Only the saved-search lookup of each newly approved listing is per row
+        approve_few, approve_many = self.run_action('approve_selected', few), self.run_action('approve_selected', many)
+        self.assertEqual(approve_many - approve_few, len(many) - len(few))
+
+        self.assertEqual(self.run_action('mark_sold_selected', few), self.run_action('mark_sold_selected', many))
+        self.assertEqual(self.run_action('reject_selected', few), self.run_action('reject_selected', many))
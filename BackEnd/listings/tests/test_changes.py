@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from listings.changes import read_changes
+from listings.models import ListingChange
+
+
+@override_settings(CHANGE_FEED_LAG_SECONDS=5)
+class CommitSafetyTests(TestCase):
+
+    def add_change(self, listing_id, age):
+        change = ListingChange.objects.create(listing_id=listing_id, deleted=True)
+        ListingChange.objects.filter(pk=change.pk).update(changed_at=timezone.now() - timedelta(seconds=age))
+        return change.pk
+
+    def test_stops_before_the_first_young_change(self):
+        first = self.add_change(1001, age=60)
+        young = self.add_change(1002, age=1)
+        self.add_change(1003, age=60)
+
+        entries, token, has_more = read_changes(0, 100)
+        self.assertEqual(entries, [(1001, 'deleted')])
+        self.assertEqual(token, first)
+        self.assertFalse(has_more)
+
+        # Once the window has passed the held-back changes come through, the young one included
+        ListingChange.objects.filter(pk=young).update(changed_at=timezone.now() - timedelta(seconds=60))
+        entries, _, _ = read_changes(token, 100)
+        self.assertEqual(entries, [(1002, 'deleted'), (1003, 'deleted')])
+
+    def test_holds_back_everything_inside_the_window(self):
+        self.add_change(1001, age=1)
+        self.assertEqual(read_changes(0, 100), ([], 0, False))
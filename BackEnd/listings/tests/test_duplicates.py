@@ -0,0 +1,45 @@
+import random
+import string
+import time
+import tracemalloc
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from listings import duplicates
+
+
+def _text(length, seed=1):
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(5000)]
+    text = ''
+    while len(text) < length:
+        text += ' '.join(rng.choices(words, k=500)) + ' '
+    return text[:length]
+
+
+class MinHashTests(SimpleTestCase):
+
+    def test_chunked_signature_matches_single_pass(self):
+        text = duplicates._normalize(_text(30000))
+        hashes = duplicates.shingles(text)
+        permuted = (np.outer(duplicates._PERM_A, hashes) + duplicates._PERM_B[:, None]) % duplicates._MERSENNE_PRIME
+        expected = (permuted & duplicates._MAX_HASH).min(axis=1).astype(np.uint32)
+        np.testing.assert_array_equal(duplicates.minhash(text), expected)
+
+    def test_large_description_is_fingerprinted_in_bounded_memory_and_time(self):
+        row = (1, 'Villa 4 ch.', _text(1_000_000), 'property', 'sale', 'Dubai', None, None, None, 'villa', 4)
+        tracemalloc.start()
+        try:
+            started = time.monotonic()
+            duplicates.compute(row)
+            elapsed = time.monotonic() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(elapsed, 2)
+        self.assertLess(peak, 32 * 1024 * 1024)
+
+    def test_attributes_survive_the_description_cap(self):
+        row = (1, 'Toyota Camry', 'x' * 50000, 'car', 'sale', 'Dubai', 'Toyota', 'Camry', 2020, None, None)
+        self.assertTrue(duplicates.fingerprint_text(row).endswith('toyota camry 2020'))
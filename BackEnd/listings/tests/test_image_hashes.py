@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from listings import image_hashes
+from listings.models import Listing, ListingImage, ListingImageHash
+
+User = get_user_model()
+
+# 32 set bits spread over every 16-bit chunk
+HASH = 0x5A5A_3C3C_0FF0_A5A5
+
+
+class ImageHashTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(phone='+991000000041', password='x', full_name='Seller')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = media_root
+
+    def create_image(self, name='photo.jpg'):
+        listing = Listing.objects.create(
+            user=self.seller, title='Apartment', description='Sea view', type='property', purpose='rent',
+            price=90000, currency='AED', location='Dubai Marina', status='approved',
+        )
+        return ListingImage.objects.create(listing=listing, image=f'listing_images/{name}', order=0)
+
+    def test_decompression_bomb_is_left_unhashed(self):
+        image = self.create_image('bomb.jpg')
+        os.makedirs(os.path.join(self.media_root, 'listing_images'))
+        Image.new('RGB', (200, 200), (120, 40, 40)).save(os.path.join(self.media_root, image.image.name), 'JPEG')
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            self.assertIsNone(image_hashes.hash_image(image))
+        self.assertFalse(ListingImageHash.objects.filter(image=image).exists())
+
+    @mock.patch.object(image_hashes, 'MAX_CANDIDATES', 3)
+    def test_close_copy_survives_the_candidate_cap(self):
+        own = self.create_image()
+        image_hashes.store([(own.pk, own.listing_id, HASH)])
+        # Share the first chunk only, and come first in table order
+        for index in range(5):
+            noise = self.create_image()
+            image_hashes.store([(noise.pk, noise.listing_id, HASH ^ (0xFFFF << 16) ^ (0xFFFF << 32) ^ ((index + 1) << 48))])
+        copy = self.create_image()
+        image_hashes.store([(copy.pk, copy.listing_id, HASH ^ 1 << 63)])
+
+        matches = image_hashes.find_image_matches(own.listing_id)
+        self.assertEqual([(match['matched_image_id'], match['distance']) for match in matches], [(copy.pk, 1)])
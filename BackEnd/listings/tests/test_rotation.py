@@ -0,0 +1,74 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from listings.models import Listing, ListingImage
+from listings.rotation import star_rotation
+
+User = get_user_model()
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class FeaturedCardsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(phone='+991000000021', password='x', full_name='Seller')
+        for index in range(3):
+            listing = Listing.objects.create(
+                user=seller, title=f'Villa {index}', description='Sea view', type='property', purpose='sale',
+                price=2000000, currency='AED', location='Palm Jumeirah', status='approved', ad_type='star',
+            )
+            ListingImage.objects.create(listing=listing, image=f'listing_images/star_{index}.jpg', order=0)
+
+    def setUp(self):
+        star_rotation.invalidate()
+
+    def test_image_urls_follow_the_requesting_host(self):
+        for origin, extra in [
+            ('http://a.example', {'HTTP_HOST': 'a.example'}),
+            ('https://b.example', {'HTTP_HOST': 'b.example', 'secure': True}),
+        ]:
+            results = self.client.get('/api/listings/featured/', {'limit': 3}, **extra).json()['results']
+            self.assertEqual(len(results), 3)
+            for card in results:
+                self.assertTrue(card['first_image'].startswith(f'{origin}/'), card['first_image'])
+
+
+class RotationRefreshTests(SimpleTestCase):
+
+    def setUp(self):
+        star_rotation.invalidate()
+        self.addCleanup(star_rotation.invalidate)
+        self.builds = 0
+
+    def slow_build(self):
+        self.builds += 1
+        time.sleep(0.2)
+        star_rotation.built_at = time.monotonic()
+
+    def ensure_from_threads(self, count):
+        threads = [threading.Thread(target=star_rotation.ensure_fresh) for _ in range(count)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - started
+
+    def test_cold_rotation_is_built_once(self):
+        with mock.patch.object(star_rotation, 'build', self.slow_build):
+            self.ensure_from_threads(10)
+        self.assertEqual(self.builds, 1)
+
+    @override_settings(STAR_ROTATION_REFRESH_SECONDS=60)
+    def test_stale_rotation_is_rebuilt_once_in_the_background(self):
+        star_rotation.built_at = time.monotonic() - 120
+        with mock.patch.object(star_rotation, 'build', self.slow_build):
+            elapsed = self.ensure_from_threads(10)
+            self.assertLess(elapsed, 0.2)
+            time.sleep(0.4)
+        self.assertEqual(self.builds, 1)
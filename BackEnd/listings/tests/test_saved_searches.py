@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from listings.models import CarDetails, Listing, NotificationOutbox, SavedSearch
+
+User = get_user_model()
+
+
+class ApprovedOnCreationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(phone='+991000000011', password='x', full_name='Seller')
+        buyer = User.objects.create_user(phone='+991000000012', password='x', full_name='Buyer')
+        cls.search = SavedSearch.objects.create(user=buyer, params={'type': 'car', 'make': 'toyota', 'min_year': 2018})
+
+    def create_listing(self):
+        return Listing.objects.create(
+            user=self.seller, title='Toyota Land Cruiser 2021', description='Full option', type='car',
+            purpose='sale', price=250000, currency='AED', location='Dubai Marina', status='approved',
+        )
+
+    def add_details(self, listing):
+        CarDetails.objects.create(listing=listing, make='Toyota', model='Land Cruiser', year=2021, mileage=20000)
+
+    def test_details_saved_after_the_approved_listing(self):
+        # Each save commits on its own, like the listing serializer
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing()
+        self.assertFalse(NotificationOutbox.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_details(listing)
+        self.assertEqual(
+            list(NotificationOutbox.objects.values_list('saved_search_id', 'listing_id')), [(self.search.pk, listing.pk)],
+        )
+
+    def test_listing_and_details_saved_in_one_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing()
+            self.add_details(listing)
+        self.assertEqual(
+            list(NotificationOutbox.objects.values_list('saved_search_id', 'listing_id')), [(self.search.pk, listing.pk)],
+        )
+
+    def test_later_details_edit_does_not_match_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing()
+            self.add_details(listing)
+        NotificationOutbox.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            CarDetails.objects.filter(listing=listing).first().save()
+        self.assertFalse(NotificationOutbox.objects.exists())
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from listings.models import Listing
+from listings.similarity import SimilarityIndex
+
+User = get_user_model()
+
+
+class RebuildTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(phone='+991000000031', password='x', full_name='Seller')
+        cls.sold, cls.kept = [cls.create_listing(f'Apartment {index}') for index in range(2)]
+
+    @classmethod
+    def create_listing(cls, title):
+        return Listing.objects.create(
+            user=cls.seller, title=title, description='Sea view', type='property', purpose='rent',
+            price=90000, currency='AED', location='Dubai Marina', status='approved',
+        )
+
+    def active_ids(self, index):
+        return {int(listing_id) for listing_id in index.ids[:index.size][index.active[:index.size]]}
+
+    def test_updates_made_during_a_rebuild_are_kept(self):
+        index = SimilarityIndex()
+        index.build()
+        adopt = index._adopt
+
+        def updates_then_adopt(fresh):
+            # Handled by the signals after the rebuild read its rows
+            index.upsert(self.create_listing('Apartment 3'))
+            index.remove(self.sold.pk)
+            adopt(fresh)
+
+        index._adopt = updates_then_adopt
+        index.build()
+        new = Listing.objects.get(title='Apartment 3')
+        self.assertEqual(self.active_ids(index), {self.kept.pk, new.pk})
+        self.assertIsNone(index.journal)
+
+    def test_updates_made_during_the_first_build_are_kept(self):
+        index = SimilarityIndex()
+        adopt = index._adopt
+
+        def updates_then_adopt(fresh):
+            index.remove(self.sold.pk)
+            adopt(fresh)
+
+        index._adopt = updates_then_adopt
+        index.build()
+        self.assertEqual(self.active_ids(index), {self.kept.pk})
@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ListingViewSet
+from .views import ListingViewSet, SavedSearchViewSet
 
 router = DefaultRouter()
+# Registered first so its routes are not taken for listing ids
+router.register(r'saved-searches', SavedSearchViewSet, basename='saved-search')
 router.register(r'', ListingViewSet, basename='listing')
 
 urlpatterns = [
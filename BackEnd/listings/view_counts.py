@@ -0,0 +1,120 @@
+"""
+Write-behind listing view counters.
+
+Counting a view with ``UPDATE listings SET view_count = view_count + 1`` on
+every ``GET /api/listings/{id}/`` would turn the hottest read into a write
+and make concurrent viewers of a popular listing queue on its row lock.
+Instead each process adds views to an in-memory counter and flushes the
+accumulated increments every ``VIEW_COUNT_FLUSH_SECONDS`` (or once
+``VIEW_COUNT_MAX_PENDING`` listings are pending), with one ``UPDATE ... WHERE
+id IN (...)`` per distinct increment. Flushes go through ``QuerySet.update``,
+so they neither run the listing signals nor touch ``updated_at``.
+
+Besides the flushes run by ``record()``, a daemon thread started with the
+first view of each process flushes every interval, so views recorded before
+an idle period are written too. A crash loses at most the views of one flush
+interval of that process; pending views are also flushed when the process
+exits normally.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import F
+
+from .models import Listing
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """Views per listing not yet written to ``listings.view_count``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+        self.flusher = None
+
+    def record(self, listing_id, views=1):
+        """Count views of a listing, flushing when the interval or the pending limit is reached."""
+        interval = getattr(settings, 'VIEW_COUNT_FLUSH_SECONDS', 10)
+        max_pending = getattr(settings, 'VIEW_COUNT_MAX_PENDING', 10000)
+        with self.lock:
+            self.pending[listing_id] += views
+            # Not alive in a forked worker either, which starts its own
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = threading.Thread(target=self._flush_periodically, name='view-counter', daemon=True)
+                self.flusher.start()
+            due = time.monotonic() - self.flushed_at >= interval or len(self.pending) >= max_pending
+        if due:
+            self.flush()
+
+    def _flush_periodically(self):
+        while True:
+            interval = getattr(settings, 'VIEW_COUNT_FLUSH_SECONDS', 10)
+            with self.lock:
+                wait = self.flushed_at + interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                self.flush()
+            except DatabaseError:
+                # The views stay pending for the next flush
+                logger.exception('Flushing the listing view counts failed')
+                with self.lock:
+                    self.flushed_at = time.monotonic()
+            finally:
+                connection.close()
+
+    def pending_views(self, listing_id):
+        with self.lock:
+            return self.pending.get(listing_id, 0)
+
+    def flush(self):
+        """Write pending views to the database; returns the number of UPDATE statements run."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for listing_id, views in pending.items():
+            by_increment[views].append(listing_id)
+        remaining = list(by_increment.items())
+        statements = 0
+        try:
+            while remaining:
+                views, listing_ids = remaining[0]
+                Listing.objects.filter(pk__in=listing_ids).update(view_count=F('view_count') + views)
+                remaining.pop(0)
+                statements += 1
+        finally:
+            # Keep the views that were not written for the next flush
+            if remaining:
+                with self.lock:
+                    for views, listing_ids in remaining:
+                        for listing_id in listing_ids:
+                            self.pending[listing_id] += views
+        return statements
+
+    def views(self, listing):
+        """Views of a listing: its stored ``view_count`` plus the views pending in this process."""
+        return listing.view_count + self.pending_views(listing.pk)
+
+
+def _flush_at_exit():
+    try:
+        view_counter.flush()
+    except DatabaseError:
+        pass
+
+
+view_counter = ViewCounter()
+atexit.register(_flush_at_exit)
@@ -1,14 +1,42 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Lower, Replace
+from django.http import Http404, StreamingHttpResponse
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import gettext_lazy as _
 import re
-from .models import Listing
-from .serializers import ListingSerializer, ListingCreateSerializer, ListingListSerializer
+from functools import cached_property
+from . import gazetteer, geo
+from .archive import archived_payload
+from .autocomplete import make_model_index
+from .changes import MAX_FEED_LIMIT, read_changes, token_for_time
+from .duplicates import describe_duplicates
+from .export import CONTENT_TYPES, export_lines
+from .fieldsets import load_fieldset, parse_fieldset
+from .filters import ListingOrderingFilter
+from .image_hashes import find_image_matches
+from .list_cache import cache_key, list_cache
+from .market import SEGMENT_PARAMS, segment_key, segment_stats
+from .models import ArchivedListing, Listing, ListingSearch, NotificationOutbox, SavedSearch
+from .query_sampler import query_sampler
+from .search import normalize_text, prefix_range
+from .serializers import (
+    ListingSerializer, ListingCreateSerializer, ListingFieldsetSerializer, ListingListSerializer, NotificationSerializer,
+    SavedSearchSerializer,
+)
+from .rotation import MAX_FEATURED_LIMIT, star_rotation
+from .similarity import similarity_index
+from .view_counts import view_counter
+
+
+MAX_BATCH_IDS = 200
 
 
 class ListingViewSet(viewsets.ModelViewSet):
@@ -16,12 +44,32 @@ class ListingViewSet(viewsets.ModelViewSet):
     
     queryset = Listing.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, ListingOrderingFilter]
     filterset_fields = ['type', 'purpose', 'status', 'ad_type']
     search_fields = ['title', 'description', 'location']
-    ordering_fields = ['price', 'created_at']
+    ordering_fields = ['price', 'created_at', 'view_count']
     ordering = ['-created_at']
     
+    # Read actions accepting sparse fieldsets (?fields=, ?expand=)
+    fieldset_actions = ['list', 'retrieve', 'my_listings', 'batch']
+    
+    @cached_property
+    def fieldset(self):
+        """Fields requested with ``fields``/``expand`` (see listings.fieldsets), or None for the full output."""
+        if self.action not in self.fieldset_actions:
+            return None
+        if self.action == 'list' and not self.request.user.is_staff:
+            default = ListingListSerializer.Meta.fields
+        else:
+            default = ListingSerializer.Meta.fields
+        return parse_fieldset(self.request.query_params, default)
+    
+    def get_serializer(self, *args, **kwargs):
+        if self.fieldset is not None:
+            kwargs.setdefault('context', self.get_serializer_context())
+            return ListingFieldsetSerializer(*args, fieldset=self.fieldset, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
         if self.action in ['create', 'update', 'partial_update']:
@@ -60,7 +108,8 @@ class ListingViewSet(viewsets.ModelViewSet):
         queryset = Listing.objects.all()
         
         # Filter by approved status for public listings
-        if self.action == 'list' and not self.request.user.is_staff:
+        public_only = self.action in ('list', 'export') and not self.request.user.is_staff
+        if public_only:
             queryset = queryset.filter(status='approved')
         
         # Additional filters with validation
@@ -80,17 +129,18 @@ class ListingViewSet(viewsets.ModelViewSet):
         min_area = self.request.query_params.get('min_area')
         
         # Validate and filter numeric parameters (Django ORM automatically prevents SQL injection)
+        # Prices are given in the base currency and compared with the normalized price_base column
         if min_price:
             try:
                 min_price_val = self._validate_numeric_param(min_price, 'min_price', min_val=0)
-                queryset = queryset.filter(price__gte=min_price_val)
+                queryset = queryset.filter(price_base__gte=min_price_val)
             except ValidationError:
                 pass  # Ignore invalid parameters
         
         if max_price:
             try:
                 max_price_val = self._validate_numeric_param(max_price, 'max_price', min_val=0)
-                queryset = queryset.filter(price__lte=max_price_val)
+                queryset = queryset.filter(price_base__lte=max_price_val)
             except ValidationError:
                 pass
         
@@ -98,25 +148,60 @@ class ListingViewSet(viewsets.ModelViewSet):
         if location:
             location_sanitized = self._sanitize_string_param(location, max_length=255)
             if location_sanitized:
-                queryset = queryset.filter(location__icontains=location_sanitized)
+                # Known places use the indexed structured columns, anything else falls back to text search
+                place = gazetteer.lookup(location_sanitized)
+                if place is None:
+                    queryset = queryset.filter(location__icontains=location_sanitized)
+                elif place[1]:
+                    # A district also matches the districts named after it ("Jumeirah" -> Palm Jumeirah, JBR, ...)
+                    districts = gazetteer.districts_within(place[0], place[1])
+                    matches = Q(city=place[0], district__in=districts)
+                    if len(districts) > 1:
+                        # Such shared names also keep matching the text, as before the gazetteer
+                        matches |= Q(location__icontains=location_sanitized)
+                    queryset = queryset.filter(matches)
+                else:
+                    queryset = queryset.filter(city=place[0])
+        
+        # Radius search: near=lat,lon&radius=km
+        near = self.request.query_params.get('near')
+        if near:
+            try:
+                lat_text, lon_text = near.split(',', 1)
+                latitude = self._validate_numeric_param(lat_text, 'latitude', min_val=-90, max_val=90)
+                longitude = self._validate_numeric_param(lon_text, 'longitude', min_val=-180, max_val=180)
+                radius = self._validate_numeric_param(
+                    self.request.query_params.get('radius', 10), 'radius', min_val=0.1, max_val=500
+                )
+                queryset = geo.radius_filter(queryset, latitude, longitude, radius)
+            except (ValueError, ValidationError):
+                pass
+        
+        # Car and property filters. Public lists read them from the denormalized
+        # listing_search table (approved listings only); everyone else joins the details.
+        search_filters = {}
+        joined_filters = {}
         
-        # Car filters with validation
         if make:
             make_sanitized = self._sanitize_string_param(make, max_length=100)
-            if make_sanitized:
-                queryset = queryset.filter(car_details__make__icontains=make_sanitized)
+            if make_sanitized and normalize_text(make_sanitized):
+                # Makes match by prefix of the normalized make ("merc" finds Mercedes-Benz) on both paths
+                search_filters['make__gte'], search_filters['make__lt'] = prefix_range(normalize_text(make_sanitized))
+                joined_filters['normalized_make__startswith'] = normalize_text(make_sanitized)
         
         if min_year:
             try:
                 min_year_val = self._validate_numeric_param(min_year, 'min_year', min_val=1900, max_val=2100)
-                queryset = queryset.filter(car_details__year__gte=int(min_year_val))
+                search_filters['year__gte'] = int(min_year_val)
+                joined_filters['car_details__year__gte'] = int(min_year_val)
             except ValidationError:
                 pass
         
         if max_year:
             try:
                 max_year_val = self._validate_numeric_param(max_year, 'max_year', min_val=1900, max_val=2100)
-                queryset = queryset.filter(car_details__year__lte=int(max_year_val))
+                search_filters['year__lte'] = int(max_year_val)
+                joined_filters['car_details__year__lte'] = int(max_year_val)
             except ValidationError:
                 pass
         
@@ -124,29 +209,49 @@ class ListingViewSet(viewsets.ModelViewSet):
         if property_type:
             property_type_sanitized = self._sanitize_string_param(property_type, max_length=50)
             if property_type_sanitized:
-                queryset = queryset.filter(property_details__property_type=property_type_sanitized)
+                search_filters['property_type'] = property_type_sanitized
+                joined_filters['property_details__property_type'] = property_type_sanitized
         
         if min_bedrooms:
             try:
                 min_bedrooms_val = self._validate_numeric_param(min_bedrooms, 'min_bedrooms', min_val=0, max_val=50)
-                queryset = queryset.filter(property_details__bedrooms__gte=int(min_bedrooms_val))
+                search_filters['bedrooms__gte'] = int(min_bedrooms_val)
+                joined_filters['property_details__bedrooms__gte'] = int(min_bedrooms_val)
             except ValidationError:
                 pass
         
         if min_bathrooms:
             try:
                 min_bathrooms_val = self._validate_numeric_param(min_bathrooms, 'min_bathrooms', min_val=0, max_val=50)
-                queryset = queryset.filter(property_details__bathrooms__gte=int(min_bathrooms_val))
+                search_filters['bathrooms__gte'] = int(min_bathrooms_val)
+                joined_filters['property_details__bathrooms__gte'] = int(min_bathrooms_val)
             except ValidationError:
                 pass
         
         if min_area:
             try:
                 min_area_val = self._validate_numeric_param(min_area, 'min_area', min_val=0)
-                queryset = queryset.filter(property_details__area__gte=min_area_val)
+                search_filters['area__gte'] = min_area_val
+                joined_filters['property_details__area__gte'] = min_area_val
             except ValidationError:
                 pass
         
+        if search_filters:
+            if public_only:
+                matching = ListingSearch.objects.filter(**search_filters).values('listing_id')
+                queryset = queryset.filter(pk__in=matching)
+            else:
+                if 'normalized_make__startswith' in joined_filters:
+                    # The SQL counterpart of normalize_text (lowercase, hyphens as spaces)
+                    queryset = queryset.alias(
+                        normalized_make=Lower(Replace('car_details__make', Value('-'), Value(' ')))
+                    )
+                queryset = queryset.filter(**joined_filters)
+        
+        if self.fieldset is not None:
+            # The batch action checks who may see each listing
+            extra_columns = ['status', 'user'] if self.action == 'batch' else []
+            return load_fieldset(queryset, self.fieldset, extra_columns)
         return queryset.select_related('user', 'car_details', 'property_details').prefetch_related('images')
     
     def perform_create(self, serializer):
@@ -167,14 +272,239 @@ class ListingViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(full_serializer.data)
         return Response(full_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
     
+    def list(self, request, *args, **kwargs):
+        """List listings; public pages are cached and recomputed by one request at a time (see listings.list_cache)."""
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+        
+        def compute():
+            return super(ListingViewSet, self).list(request, *args, **kwargs).data
+        
+        data = list_cache.get_or_compute(cache_key(request), compute)
+        query_sampler.record(request)
+        return Response(data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Return a listing; archived listings remain visible to their owner and to admins."""
+        try:
+            response = super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pk = str(kwargs.get('pk', ''))
+            archived = ArchivedListing.objects.filter(pk=pk).first() if pk.isdigit() else None
+            if archived is None or not (request.user.is_staff or archived.user_id == request.user.pk):
+                raise
+            return Response(archived_payload(archived))
+        view_counter.record(response.data['id'])
+        if 'view_count' in response.data:
+            response.data['view_count'] += view_counter.pending_views(response.data['id'])
+        return response
+    
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_listings(self, request):
         """Get current user's listings."""
         listings = self.get_queryset().filter(user=request.user)
-        # Use ListingSerializer to get full data including images
-        serializer = ListingSerializer(listings, many=True, context={'request': request})
+        if self.fieldset is not None:
+            serializer = self.get_serializer(listings, many=True)
+        else:
+            # Use ListingSerializer to get full data including images
+            serializer = ListingSerializer(listings, many=True, context={'request': request})
         return Response({'results': serializer.data})
     
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Get several listings by id (``ids=3,1,2``) in the requested order, in a constant number of queries.
+        
+        Listings that are not approved are only returned to their owner and to admins; the
+        other ids are reported in ``missing`` (no such listing) or ``unauthorized``.
+        """
+        values = [value.strip() for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        if not all(value.isdigit() for value in values):
+            return Response(
+                {'error': 'ids must be a comma-separated list of listing ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Duplicates keep their first position
+        ids = list(dict.fromkeys(int(value) for value in values))
+        if not ids or len(ids) > MAX_BATCH_IDS:
+            return Response(
+                {'error': f'ids must contain between 1 and {MAX_BATCH_IDS} listing ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        found = self.get_queryset().filter(pk__in=ids).in_bulk()
+        results, missing, unauthorized = [], [], []
+        for listing_id in ids:
+            listing = found.get(listing_id)
+            if listing is None:
+                missing.append(listing_id)
+            elif listing.status != 'approved' and not (request.user.is_staff or listing.user_id == request.user.pk):
+                unauthorized.append(listing_id)
+            else:
+                results.append(listing)
+        serializer = self.get_serializer(results, many=True)
+        return Response({'results': serializer.data, 'missing': missing, 'unauthorized': unauthorized})
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def archived(self, request):
+        """Get current user's archived listings."""
+        archived = ArchivedListing.objects.filter(user=request.user)
+        return Response({'results': [archived_payload(listing) for listing in archived]})
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def autocomplete(self, request):
+        """Suggest car makes (or models, optionally of one make) from the in-memory index."""
+        field = request.query_params.get('field', 'make')
+        if field not in ('make', 'model'):
+            return Response({'error': 'field must be "make" or "model".'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        query = self._sanitize_string_param(request.query_params.get('q', ''), max_length=100) or ''
+        make = self._sanitize_string_param(request.query_params.get('make'), max_length=100)
+        try:
+            limit = int(self._validate_numeric_param(request.query_params.get('limit', 10), 'limit', min_val=1, max_val=50))
+        except ValidationError:
+            limit = 10
+        
+        results = make_model_index.suggest(query, field=field, make=make, limit=limit)
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def featured(self, request):
+        """Star listings of the current rotation slot, served from process memory."""
+        try:
+            limit = int(self._validate_numeric_param(
+                request.query_params.get('limit', 10), 'limit', min_val=1, max_val=MAX_FEATURED_LIMIT
+            ))
+        except ValidationError:
+            limit = 10
+        
+        results, slot, expires_in = star_rotation.slot(request, limit)
+        return Response({'results': results, 'slot': slot, 'expires_in': expires_in})
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def market_stats(self, request):
+        """
+        Price statistics of a market segment, read from the precomputed histograms.
+        
+        Cars: ``type=car&purpose=sale&make=&model=&year=``; properties:
+        ``type=property&purpose=rent&city=&property_type=&bedrooms=``. Each
+        parameter after ``purpose`` requires the previous one.
+        """
+        listing_type = request.query_params.get('type')
+        if listing_type not in SEGMENT_PARAMS:
+            return Response(
+                {'error': f"type must be one of: {', '.join(SEGMENT_PARAMS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        parts = []
+        for name in SEGMENT_PARAMS[listing_type]:
+            default = 'sale' if name == 'purpose' else None
+            value = self._sanitize_string_param(request.query_params.get(name, default), max_length=100)
+            if value and parts and parts[-1] is None:
+                return Response(
+                    {'error': f"{name} requires {SEGMENT_PARAMS[listing_type][len(parts) - 1]}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            parts.append(value)
+        
+        segment = segment_key(listing_type, parts)
+        return Response({
+            'segment': dict(zip(['type'] + SEGMENT_PARAMS[listing_type], segment.split('|'))),
+            'currency': settings.BASE_CURRENCY,
+            **segment_stats(segment),
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        Stream every listing matching the list filters as NDJSON or CSV (``output=csv``).
+        
+        Non-admin users export approved listings only, like the list endpoint.
+        """
+        output_format = request.query_params.get('output', 'ndjson')
+        if output_format not in CONTENT_TYPES:
+            return Response(
+                {'error': f"output must be one of: {', '.join(CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export_lines(queryset, output_format), content_type=CONTENT_TYPES[output_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="listings.{output_format}"'
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def changes(self, request):
+        """
+        Get listings that changed after a sync token, as one paginated stream.
+        
+        ``updated_since`` is the ``next_token`` of the previous call (0 or absent
+        for a full sync) or an ISO datetime. Approved listings come back in full;
+        deleted, rejected, sold and pending ones come back as tombstones.
+        """
+        updated_since = request.query_params.get('updated_since') or '0'
+        if updated_since.isdigit():
+            token = int(updated_since)
+        else:
+            try:
+                moment = parse_datetime(updated_since)
+            except ValueError:
+                moment = None
+            if moment is None:
+                return Response(
+                    {'error': 'updated_since must be a token or an ISO 8601 datetime.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            token = token_for_time(moment)
+        
+        try:
+            limit = int(self._validate_numeric_param(
+                request.query_params.get('limit', 100), 'limit', min_val=1, max_val=MAX_FEED_LIMIT
+            ))
+        except ValidationError:
+            limit = 100
+        
+        entries, next_token, has_more = read_changes(token, limit)
+        results = []
+        for listing_id, entry in entries:
+            if isinstance(entry, Listing):
+                data = ListingSerializer(entry, context={'request': request}).data
+                results.append({'id': listing_id, 'deleted': False, 'listing': data})
+            else:
+                results.append({'id': listing_id, 'deleted': True, 'reason': entry})
+        return Response({'results': results, 'next_token': str(next_token), 'has_more': has_more})
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def similar(self, request, pk=None):
+        """Get approved listings similar to this one, best match first."""
+        listing = self.get_object()
+        try:
+            limit = int(self._validate_numeric_param(request.query_params.get('limit', 6), 'limit', min_val=1, max_val=24))
+        except ValidationError:
+            limit = 6
+        
+        ids = similarity_index.similar(listing, limit=limit)
+        listings = (
+            Listing.objects.filter(pk__in=ids, status='approved')
+            .select_related('car_details', 'property_details')
+            .prefetch_related('images')
+        )
+        by_id = {item.pk: item for item in listings}
+        ordered = [by_id[listing_id] for listing_id in ids if listing_id in by_id]
+        serializer = ListingListSerializer(ordered, many=True, context={'request': request})
+        return Response({'results': serializer.data})
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def views(self, request, pk=None):
+        """View count of a listing, including the views this process has not flushed yet."""
+        listing = self.get_object()
+        return Response({'listing_id': listing.pk, 'views': view_counter.views(listing)})
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def approve(self, request, pk=None):
         """Approve a listing (admin only)."""
@@ -187,7 +517,26 @@ class ListingViewSet(viewsets.ModelViewSet):
         listing = self.get_object()
         listing.status = 'approved'
         listing.save()
-        return Response({'message': 'Listing approved successfully.'})
+        return Response({
+            'message': 'Listing approved successfully.',
+            'possible_duplicates': describe_duplicates(listing.pk),
+            'reused_images': find_image_matches(listing.pk),
+        })
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def duplicates(self, request, pk=None):
+        """Get listings whose text or photos look copied from this one, for review before approval (admin only)."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'You do not have permission to perform this action.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        listing = self.get_object()
+        return Response({
+            'results': describe_duplicates(listing.pk),
+            'reused_images': find_image_matches(listing.pk),
+        })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def reject(self, request, pk=None):
@@ -219,3 +568,36 @@ class ListingViewSet(viewsets.ModelViewSet):
         listing.save()
         return Response({'message': 'Listing marked as sold.'})
 
+
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """ViewSet for the current user's saved searches and their notifications."""
+    
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        """Set the user when saving a search."""
+        serializer.save(user=self.request.user)
+    
+    @action(detail=False, methods=['get'])
+    def notifications(self, request):
+        """Get new listings that matched the user's saved searches, newest first."""
+        queryset = (
+            NotificationOutbox.objects.filter(user=request.user)
+            .select_related('listing__car_details', 'listing__property_details')
+            .prefetch_related('listing__images')
+        )
+        saved_search = request.query_params.get('saved_search')
+        if saved_search and saved_search.isdigit():
+            queryset = queryset.filter(saved_search_id=int(saved_search))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = NotificationSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
+        serializer = NotificationSerializer(queryset, many=True, context={'request': request})
+        return Response(serializer.data)
@@ -0,0 +1,180 @@
+"""
+Pagination that avoids exact ``COUNT(*)`` over large tables.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+# Below this many rows an exact count is cheap enough
+ESTIMATE_THRESHOLD = 10000
+# Filtered admin changelists stop counting here
+ADMIN_COUNT_LIMIT = 10000
+
+
+def table_row_estimate(model, using='default'):
+    """Row count of the model's table from the database statistics, or None when the backend keeps none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+def explain_row_estimate(queryset):
+    """Number of rows the query planner expects ``queryset`` to return, or None when the backend gives none."""
+    connection = connections[queryset.db]
+    sql, params = queryset.values('pk').order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            # Tables of the outer query block are joined in nested loops, so their estimates multiply
+            estimate = 1.0
+            for step in plan:
+                if step['id'] == 1 and step['rows']:
+                    estimate *= step['rows'] * float(step.get('filtered') or 100) / 100
+            return int(estimate)
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+    return None
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.values('pk').order_by().query.sql_with_params()
+    return 'count:' + hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+
+
+def estimate_count(queryset):
+    """
+    ``(count, approximate)`` of a queryset known to hold more than
+    ESTIMATE_THRESHOLD rows: the table statistics when it is unfiltered, else
+    the planner's estimate, and an exact count (``approximate`` False) only
+    when the backend gives no estimate.
+    """
+    count = table_row_estimate(queryset.model, queryset.db) if not queryset.query.where else None
+    if count is None:
+        count = explain_row_estimate(queryset)
+    if count is None:
+        return queryset.count(), False
+    return max(count, ESTIMATE_THRESHOLD + 1), True
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator.
+
+    An unfiltered changelist of a large table shows the row estimate of the
+    database statistics; a filtered one counts at most ADMIN_COUNT_LIMIT rows,
+    so pages past that limit are not linked (narrow the filters instead).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = table_row_estimate(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return queryset.values('pk').order_by()[:ADMIN_COUNT_LIMIT].count()
+
+
+class ApproximatePage(Page):
+    """Page of a result whose count is estimated: whether a next page exists comes from the rows read."""
+
+    def __init__(self, object_list, number, paginator, next_exists):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = next_exists
+
+    def has_next(self):
+        return self.next_exists
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Counts exactly up to ESTIMATE_THRESHOLD rows (the count stops scanning
+    there). Larger results get estimate_count; a database estimate is cached
+    for COUNT_CACHE_SECONDS and sets ``count_is_approximate``.
+
+    An estimate is only displayed: pages past it are still served, and a page
+    reads one extra row to know whether there is a next one, so a low estimate
+    never hides rows.
+    """
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        key = count_cache_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.values('pk').order_by()[:ESTIMATE_THRESHOLD + 1].count()
+            if count <= ESTIMATE_THRESHOLD:
+                return count
+            count, approximate = estimate_count(queryset)
+            if not approximate:
+                return count
+            cache.set(key, count, settings.COUNT_CACHE_SECONDS)
+        self.count_is_approximate = True
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past an estimated last page there may still be rows; page() finds out
+            if self.count_is_approximate and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return ApproximatePage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """Page number pagination whose ``count`` is flagged ``count_is_approximate`` for large results."""
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_approximate': self.page.paginator.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {'type': 'boolean', 'example': False}
+        return response_schema
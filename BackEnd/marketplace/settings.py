@@ -157,10 +157,61 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'marketplace.pagination.ApproximateCountPagination',
     'PAGE_SIZE': 20,
 }
 
+# Currency that Listing.price_base is normalized to (see listings.ExchangeRate)
+BASE_CURRENCY = config('BASE_CURRENCY', default='AED')
+
+# How often each process rebuilds its in-memory make/model autocomplete index
+AUTOCOMPLETE_REFRESH_SECONDS = config('AUTOCOMPLETE_REFRESH_SECONDS', default=300, cast=int)
+
+# Similar-listings feature matrix (written by "manage.py build_similarity_index")
+SIMILARITY_INDEX_PATH = os.path.join(BASE_DIR, 'var', 'similarity.npz')
+SIMILARITY_REFRESH_SECONDS = config('SIMILARITY_REFRESH_SECONDS', default=900, cast=int)
+
+# Listing change feed: changes younger than the lag are held back so that a
+# transaction committing late cannot slip behind a client's token; superseded
+# changes older than the retention are compacted by "manage.py compact_listing_changes"
+CHANGE_FEED_LAG_SECONDS = config('CHANGE_FEED_LAG_SECONDS', default=5, cast=int)
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+
+# Listing sitemaps (written by "manage.py build_sitemaps", served as static files from SITEMAP_URL)
+SITE_URL = config('SITE_URL', default='http://localhost:8080')
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'var', 'sitemaps')
+SITEMAP_URL = '/sitemaps/'
+
+# Sold and rejected listings untouched for this long are moved to the archive tables
+# by "manage.py archive_listings" (still retrievable by their owner and admins)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Listing views are counted in process memory and written in batched UPDATEs every
+# VIEW_COUNT_FLUSH_SECONDS, or sooner once VIEW_COUNT_MAX_PENDING listings have pending views
+VIEW_COUNT_FLUSH_SECONDS = config('VIEW_COUNT_FLUSH_SECONDS', default=10, cast=int)
+VIEW_COUNT_MAX_PENDING = config('VIEW_COUNT_MAX_PENDING', default=10000, cast=int)
+
+# Featured star listings rotate through time slots of STAR_ROTATION_SLOT_SECONDS; each
+# process reloads the star listing ids every STAR_ROTATION_REFRESH_SECONDS (and after star listing writes)
+STAR_ROTATION_SLOT_SECONDS = config('STAR_ROTATION_SLOT_SECONDS', default=300, cast=int)
+STAR_ROTATION_REFRESH_SECONDS = config('STAR_ROTATION_REFRESH_SECONDS', default=300, cast=int)
+
+# Paginated results larger than marketplace.pagination.ESTIMATE_THRESHOLD get an approximate
+# count (flagged count_is_approximate), kept in the cache for COUNT_CACHE_SECONDS
+COUNT_CACHE_SECONDS = config('COUNT_CACHE_SECONDS', default=300, cast=int)
+
+# Public listing pages are cached for LIST_CACHE_SECONDS, then served stale for up to
+# LIST_CACHE_STALE_SECONDS while one request recomputes them; requests finding no value
+# wait up to LIST_CACHE_WAIT_SECONDS for the request computing it
+LIST_CACHE_SECONDS = config('LIST_CACHE_SECONDS', default=30, cast=int)
+LIST_CACHE_STALE_SECONDS = config('LIST_CACHE_STALE_SECONDS', default=300, cast=int)
+LIST_CACHE_WAIT_SECONDS = config('LIST_CACHE_WAIT_SECONDS', default=2, cast=float)
+
+# A LIST_SAMPLE_RATE fraction of the public list requests is counted per query string and written
+# every LIST_SAMPLE_FLUSH_SECONDS; "manage.py warm_list_cache" replays the most frequent ones
+LIST_SAMPLE_RATE = config('LIST_SAMPLE_RATE', default=0.05, cast=float)
+LIST_SAMPLE_FLUSH_SECONDS = config('LIST_SAMPLE_FLUSH_SECONDS', default=60, cast=int)
+
 # JWT Settings
 from datetime import timedelta
 
@@ -207,11 +258,12 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000  # Prevent DoS attacks
 
-# Cache configuration for rate limiting
+# Cache configuration for rate limiting, counts and listing pages; use a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) to share them between processes
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='unique-snowflake'),
     }
 }
 
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from marketplace import pagination
+
+User = get_user_model()
+
+
+class Pagination(pagination.ApproximateCountPagination):
+    page_size = 10
+
+
+@override_settings(COUNT_CACHE_SECONDS=0)
+@mock.patch.object(pagination, 'ESTIMATE_THRESHOLD', 5)
+class UnderestimatedCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([User(phone=f'+99100000{index:04d}', full_name='User') for index in range(35)])
+
+    def paginate(self, page):
+        request = Request(APIRequestFactory().get('/api/users/', {'page': page}))
+        paginator = Pagination()
+        # 35 rows, but the database estimate says 12
+        with mock.patch.object(pagination, 'estimate_count', return_value=(12, True)):
+            rows = paginator.paginate_queryset(User.objects.order_by('pk'), request)
+        return paginator, rows
+
+    def test_estimate_is_displayed_and_flagged(self):
+        paginator, rows = self.paginate(1)
+        response = paginator.get_paginated_response([]).data
+        self.assertEqual(response['count'], 12)
+        self.assertTrue(response['count_is_approximate'])
+        self.assertEqual(len(rows), 10)
+
+    def test_next_link_past_the_estimated_last_page(self):
+        paginator, rows = self.paginate(2)
+        self.assertEqual(len(rows), 10)
+        self.assertIn('page=3', paginator.get_next_link())
+
+    def test_pages_past_the_estimate_are_served(self):
+        paginator, rows = self.paginate(4)
+        self.assertEqual([user.phone for user in rows], [f'+99100000{index:04d}' for index in range(30, 35)])
+        self.assertIsNone(paginator.get_next_link())
+
+    def test_page_past_the_rows_is_not_found(self):
+        with self.assertRaises(NotFound):
+            self.paginate(5)
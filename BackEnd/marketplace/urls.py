@@ -15,7 +15,8 @@ urlpatterns = [
     path('api/listings/', include('listings.urls')),
 ]
 
-# Serve media files in development
+# Serve media files and sitemaps in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.SITEMAP_URL, document_root=settings.SITEMAP_ROOT)
 
@@ -1,11 +1,11 @@
 import { Link } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import ListingCard from '@/components/listings/ListingCard';
-import { useListings } from '@/hooks/useListings';
+import { useFeaturedListings } from '@/hooks/useListings';
 import { ArrowRight } from 'lucide-react';
 
 const FeaturedListings = () => {
-  const { listings, loading } = useListings({ adType: 'star', limit: 6 });
+  const { listings, loading } = useFeaturedListings(6);
 
   if (loading) {
     return (
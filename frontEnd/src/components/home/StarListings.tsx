@@ -1,11 +1,11 @@
 import { Link } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import ListingCard from '@/components/listings/ListingCard';
-import { useListings } from '@/hooks/useListings';
+import { useFeaturedListings } from '@/hooks/useListings';
 import { ArrowRight, Star } from 'lucide-react';
 
 const StarListings = () => {
-  const { listings, loading } = useListings({ adType: 'star', limit: 10 });
+  const { listings, loading } = useFeaturedListings(10);
 
   if (loading) {
     return (
@@ -35,4 +35,27 @@ export const useListings = (filters?: SearchFilters & { limit?: number }) => {
   return { listings, loading, error };
 };
 
+export const useFeaturedListings = (limit: number) => {
+  const [listings, setListings] = useState<Listing[]>([]);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    const fetchListings = async () => {
+      try {
+        setLoading(true);
+        setListings(await api.getFeaturedListings(limit));
+        setError(null);
+      } catch (err: any) {
+        setError(err.message || 'Erreur lors du chargement des annonces');
+        setListings([]);
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    fetchListings();
+  }, [limit]);
 
+  return { listings, loading, error };
+};
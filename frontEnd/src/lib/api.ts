@@ -249,22 +249,44 @@ class ApiClient {
     }
     const query = queryParams.toString();
     const endpoint = query ? `/listings/?${query}` : '/listings/';
-    const response = await this.request<{ results: any[]; count: number; next: string | null; previous: string | null }>(
-      endpoint
-    );
+    const response = await this.request<{
+      results: any[];
+      count: number;
+      count_is_approximate: boolean;
+      next: string | null;
+      previous: string | null;
+    }>(endpoint);
     
     // Transform API response to match frontend types
     return {
       results: response.results.map(this.transformListing),
       count: response.count,
+      // Large results only carry an estimated count
+      countIsApproximate: response.count_is_approximate,
     };
   }
 
+  async getFeaturedListings(limit: number = 10) {
+    // Star listings of the current rotation slot
+    const response = await this.request<{ results: any[]; slot: number; expires_in: number }>(
+      `/listings/featured/?limit=${limit}`
+    );
+    return response.results.map(this.transformListing);
+  }
+
   async getListing(id: string) {
     const listing = await this.request<any>(`/listings/${id}/`);
     return this.transformListing(listing);
   }
 
+  async getListingsByIds(ids: string[]) {
+    // One request for several listings, in the order of ids
+    const response = await this.request<{ results: any[]; missing: number[]; unauthorized: number[] }>(
+      `/listings/batch/?ids=${ids.map(encodeURIComponent).join(',')}`
+    );
+    return response.results.map(this.transformListing);
+  }
+
   async createListing(data: any) {
     const formData = new FormData();
     